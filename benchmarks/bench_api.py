@@ -0,0 +1,171 @@
+"""Throughput of the API, sync routes in the threadpool against async routes.
+
+    python -m benchmarks.bench_api [--clients 500] [--seconds 10] [--latency 0]
+
+Reads of periodic tasks and interval schedules, served by the async routes
+of ``src.api`` and by the sync routes they replaced, from a SQLite file of
+``benchmarks.dataset`` tasks.  ``--clients`` concurrent clients call them
+over httpx's ASGI transport for ``--seconds``, in the process and without
+a network.  ``--latency`` adds milliseconds to every statement in the
+thread running it, like the round trip to a database server: the sync
+routes wait in the threadpool threads, the async ones in the event loop.
+The async engine's pool is sized by ``SQLALCHEMY_ASYNC_POOL_SIZE`` and
+``SQLALCHEMY_ASYNC_MAX_OVERFLOW``.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, List
+
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI",
+    f"sqlite:///{tempfile.gettempdir()}/bench_api.sqlite3",
+)
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi import APIRouter, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from benchmarks.dataset import populate, reset  # noqa: E402
+from src import schemas  # noqa: E402
+from src.api.router import router  # noqa: E402
+from src.infra.async_session import AsyncDBSessionMiddleware  # noqa: E402
+from src.infra.async_session import async_engine  # noqa: E402
+from src.infra.repo.repo import (  # noqa: E402
+    interval_schedule_repo,
+    periodic_task_repo,
+)
+from src.infra.session import (  # noqa: E402
+    DBSessionMiddleware,
+    SessionLocal,
+    engine,
+    get_session,
+)
+
+sync_router = APIRouter()
+
+
+@sync_router.get("/periodic-tasks/", response_model=list[schemas.PeriodicTask])
+def list_periodic_task(skip: int = 0, limit: int = 100) -> Any:
+    with get_session().begin():
+        tasks = periodic_task_repo.get_multi(skip=skip, limit=limit)
+        return tasks
+
+
+@sync_router.get("/periodic-tasks/{id}", response_model=schemas.PeriodicTask)
+def get_period_task(id: int) -> Any:
+    with get_session().begin():
+        if not (task := periodic_task_repo.get(id)):
+            raise HTTPException(status_code=404, detail="Item not found")
+        return task
+
+
+@sync_router.get("/interval-schedules/{id}", response_model=schemas.IntervalSchedule)
+def get_interval_schedule(id: int) -> Any:
+    with get_session().begin():
+        if not (interval := interval_schedule_repo.get(id)):
+            raise HTTPException(status_code=404, detail="Item not found")
+        return interval
+
+
+def add_latency(bind: Engine, seconds: float) -> None:
+    """Sleep ``seconds`` before every statement, in the thread running it."""
+
+    def trace(statement: str) -> None:
+        time.sleep(seconds)
+
+    @event.listens_for(bind, "connect")
+    def connect(dbapi_connection: Any, connection_record: Any) -> None:
+        if hasattr(dbapi_connection, "await_"):
+            # aiosqlite runs the statements in a thread of the connection
+            dbapi_connection.await_(
+                dbapi_connection.driver_connection.set_trace_callback(trace)
+            )
+        else:
+            dbapi_connection.set_trace_callback(trace)
+
+
+def paths(tasks: int, intervals: int) -> List[Callable[[random.Random], str]]:
+    return [
+        lambda rng: f"/periodic-tasks/{rng.randint(1, tasks)}",
+        lambda rng: "/periodic-tasks/?limit=20",
+        lambda rng: f"/interval-schedules/{rng.randint(1, intervals)}",
+    ]
+
+
+async def load(
+    app: FastAPI,
+    clients: int,
+    seconds: float,
+    paths: List[Callable[[random.Random], str]],
+) -> List[float]:
+    """Latencies of the requests of ``clients`` looping for ``seconds``."""
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        deadline = time.perf_counter() + seconds
+
+        async def client(number: int) -> None:
+            rng = random.Random(number)
+            while (start := time.perf_counter()) < deadline:
+                response = await c.get(rng.choice(paths)(rng))
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(client(number) for number in range(clients)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0, help="ms")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    options = parser.parse_args()
+
+    reset()
+    populate(options.tasks)
+    with SessionLocal() as session:
+        intervals = interval_schedule_repo.count(session)
+    if options.latency:
+        add_latency(engine, options.latency / 1000)
+        add_latency(async_engine.sync_engine, options.latency / 1000)
+
+    # Like the async sessions.  Loading the expired objects again after the
+    # commit, in another thread than the one closing the session, fails on
+    # SQLite, and it would cost the sync routes a query more.
+    SessionLocal.configure(expire_on_commit=False)
+    sync_app = FastAPI()
+    sync_app.add_middleware(DBSessionMiddleware)
+    sync_app.include_router(sync_router)
+    async_app = FastAPI()
+    async_app.add_middleware(AsyncDBSessionMiddleware)
+    async_app.include_router(router)
+
+    async def run(app: FastAPI) -> List[float]:
+        try:
+            return await load(
+                app, options.clients, options.seconds, paths(options.tasks, intervals)
+            )
+        finally:
+            # in this loop, the pooled connections are bound to it
+            await async_engine.dispose()
+
+    print(f"{options.clients} clients, {options.latency:g} ms per statement")
+    for label, app in [("sync", sync_app), ("async", async_app)]:
+        latencies = np.array(asyncio.run(run(app)))
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(
+            f"{label:<6} {len(latencies) / options.seconds:>8.0f} req/s"
+            f"  p50 {p50:>7.1f} ms  p99 {p99:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
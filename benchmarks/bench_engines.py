@@ -0,0 +1,97 @@
+"""Schedule engines, Celery's binary heap against the hierarchical timer wheel.
+
+    python -m benchmarks.bench_engines [--sizes 10000 100000 1000000]
+
+Entries have intervals from one second to one day.  For every size the
+benchmark measures:
+
+* insert: pushing all the entries
+* fire: what ``DatabaseScheduler._tick`` does per fired entry, peek the top
+  and push it back one interval later, one in five is a 5 seconds recheck
+  (disabled entries, ``start_time`` delays)
+* change: removing and re-inserting random entries, like schedule changes
+
+No database needed.
+"""
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Tuple, Type
+
+from src.libs.heap import ScheduleHeap
+from src.libs.wheel import TimerWheel
+
+ENGINES: Dict[str, Type] = {"heap": ScheduleHeap, "wheel": TimerWheel}
+
+INTERVALS = [1, 5, 10, 30, 60, 300, 900, 3600, 6 * 3600, 24 * 3600]
+RECHECK_DELAY = 5.0
+
+
+def make_entries(n: int, now: float) -> List[Tuple[str, float, float]]:
+    rng = random.Random(n)
+    entries = []
+    for i in range(n):
+        interval = rng.choice(INTERVALS)
+        entries.append((f"task-{i}", now + rng.random() * interval, interval))
+    return entries
+
+
+def measure(fn: Callable[[], int]) -> Tuple[float, int]:
+    start = time.perf_counter()
+    ops = fn()
+    return time.perf_counter() - start, ops
+
+
+def bench(engine_type: Type, entries: List[Tuple[str, float, float]]) -> List[str]:
+    engine = engine_type()
+    intervals = {name: interval for name, _, interval in entries}
+    rng = random.Random(0)
+
+    def insert() -> int:
+        for name, when, _ in entries:
+            engine.push(name, when)
+        return len(entries)
+
+    def fire() -> int:
+        n = min(len(entries), 200_000)
+        for i in range(n):
+            when, name = engine.peek()
+            if i % 5:
+                engine.push(name, when + intervals[name])
+            else:
+                engine.push(name, when + RECHECK_DELAY)
+        return n
+
+    def change() -> int:
+        n = min(len(entries), 50_000)
+        names = [rng.choice(entries)[0] for _ in range(n)]
+        for name in names:
+            when = engine.when(name)
+            engine.remove(name)
+            engine.push(name, when + 1.0)
+        return n
+
+    results = []
+    for label, fn in (("insert", insert), ("fire", fire), ("change", change)):
+        elapsed, ops = measure(fn)
+        results.append(f"{label} {elapsed / ops * 1e6:6.2f} us/op")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    options = parser.parse_args()
+
+    now = time.time()
+    for size in options.sizes:
+        entries = make_entries(size, now)
+        for name, engine_type in ENGINES.items():
+            results = bench(engine_type, entries)
+            print(f"{size:>9,} {name:<6} " + "  ".join(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Throughput of ModelEntry construction, with and without the schedule cache.
+
+    python -m benchmarks.bench_entries [--tasks 20000] [--schedules 50]
+
+Tasks share ``--schedules`` crontab and interval rows, like in production
+where thousands of tasks use the same few schedules.  No database needed.
+"""
+import argparse
+import os
+import time
+from typing import Callable, List
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from celery import Celery  # noqa: E402
+
+from src import schedules  # noqa: E402
+from src.models.models import (  # noqa: E402
+    CrontabSchedule,
+    IntervalSchedule,
+    PeriodicTask,
+)
+from src.schedulers import ModelEntry  # noqa: E402
+from src.utils.timezone import utcnow  # noqa: E402
+
+TIMEZONES = ["UTC", "Asia/Shanghai", "Europe/Berlin", "America/New_York"]
+
+
+def make_tasks(n_tasks: int, n_schedules: int) -> List[PeriodicTask]:
+    crontabs = [
+        CrontabSchedule(
+            id=i,
+            minute=str(i % 60),
+            hour="*/2",
+            day_of_week="*",
+            day_of_month="*",
+            month_of_year="*",
+            timezone=TIMEZONES[i % len(TIMEZONES)],
+        )
+        for i in range(n_schedules)
+    ]
+    intervals = [
+        IntervalSchedule(id=i, every=i + 1, period="minutes")
+        for i in range(n_schedules)
+    ]
+    tasks = []
+    for i in range(n_tasks):
+        task = PeriodicTask(
+            id=i,
+            name=f"task-{i}",
+            task="src.tasks.test",
+            args="[1, 2]",
+            kwargs="{}",
+            headers="{}",
+            enabled=True,
+            one_off=False,
+            total_run_count=0,
+            last_run_at=utcnow(),
+        )
+        if i % 2:
+            task.crontab = crontabs[i % n_schedules]
+        else:
+            task.interval = intervals[i % n_schedules]
+        tasks.append(task)
+    return tasks
+
+
+def measure(label: str, n: int, fn: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {n / elapsed:>12,.0f} entries/s  ({elapsed:.3f}s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--schedules", type=int, default=50)
+    options = parser.parse_args()
+
+    app = Celery()
+    app.conf.timezone = "UTC"
+    tasks = make_tasks(options.tasks, options.schedules)
+
+    def construct() -> None:
+        for task in tasks:
+            ModelEntry(task, app=app)
+
+    cache = schedules.schedule_cache
+    maxsize = cache.maxsize
+    try:
+        cache.maxsize = 0
+        cache.clear()
+        measure("construction, no schedule cache", len(tasks), construct)
+    finally:
+        cache.maxsize = maxsize
+    cache.clear()
+    cache.hits = cache.misses = 0
+    measure("construction, schedule cache (cold)", len(tasks), construct)
+    measure("construction, schedule cache (warm)", len(tasks), construct)
+    print(f"cache: {len(cache)} schedules, {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
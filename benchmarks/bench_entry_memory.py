@@ -0,0 +1,104 @@
+"""Memory per ModelEntry, ORM-backed against the detached snapshot.
+
+    python -m benchmarks.bench_entry_memory [--tasks 50000] [--schedules 50]
+
+The tasks are loaded from an in-memory SQLite database like beat loads
+them, with their joined schedule rows, and turned into entries.  Measured
+with tracemalloc:
+
+* ORM-backed: the entries and the ``PeriodicTask`` models, what an entry
+  used to keep alive
+* snapshot: the entries alone, once the models are freed
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+from typing import List
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from celery import Celery  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from migrations.metadata import metadata  # noqa: E402
+from src.infra.repo.repo import periodic_task_repo  # noqa: E402
+from src.infra.session import engine  # noqa: E402
+from src.models.models import (  # noqa: E402
+    CrontabSchedule,
+    IntervalSchedule,
+    PeriodicTask,
+)
+from src.schedulers import ModelEntry, SessionLocal  # noqa: E402
+from src.utils.timezone import utcnow  # noqa: E402
+
+
+def populate(n_tasks: int, n_schedules: int) -> None:
+    metadata.create_all(engine)
+    now = utcnow()
+    with SessionLocal.begin() as session:
+        session.execute(
+            insert(CrontabSchedule),
+            [
+                {"id": i + 1, "minute": str(i % 60), "hour": "*/2", "timezone": "UTC"}
+                for i in range(n_schedules)
+            ],
+        )
+        session.execute(
+            insert(IntervalSchedule),
+            [
+                {"id": i + 1, "every": i + 1, "period": "minutes"}
+                for i in range(n_schedules)
+            ],
+        )
+        session.execute(
+            insert(PeriodicTask),
+            [
+                {
+                    "name": f"task-{i}",
+                    "task": "src.tasks.test",
+                    "args": "[1, 2]",
+                    "kwargs": '{"retry": true}',
+                    "headers": "{}",
+                    "queue": "celery",
+                    "last_run_at": now,
+                    "crontab_id": i % n_schedules + 1 if i % 2 else None,
+                    "interval_id": None if i % 2 else i % n_schedules + 1,
+                }
+                for i in range(n_tasks)
+            ],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--schedules", type=int, default=50)
+    options = parser.parse_args()
+
+    app = Celery()
+    app.conf.timezone = "UTC"
+    populate(options.tasks, options.schedules)
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    with SessionLocal.begin() as session:
+        models: List[PeriodicTask] = periodic_task_repo.get_enabled(db=session)
+        entries = [ModelEntry(model, app=app) for model in models]
+    gc.collect()
+    orm_backed = tracemalloc.get_traced_memory()[0] - baseline
+    del models, session
+    gc.collect()
+    snapshot = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    n = len(entries)
+    print(f"{n:,} entries, {options.schedules * 2} schedules")
+    print(f"{'ORM-backed':<16} {orm_backed / n:>10,.0f} bytes/entry")
+    print(f"{'snapshot':<16} {snapshot / n:>10,.0f} bytes/entry")
+    print(f"{'saved':<16} {1 - snapshot / orm_backed:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Dispatch load forecast of many tasks.
+
+    python -m benchmarks.bench_forecast [--tasks 50000] [--days 1]
+
+Tasks from ``benchmarks.dataset`` in an in-memory SQLite database, some of
+them with a jitter.  Times the forecast of their fires over ``--days`` in
+buckets of a minute, an hour and broken down by task, then a cached one.
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+from typing import Callable, TypeVar
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from sqlalchemy import update  # noqa: E402
+
+from benchmarks.dataset import populate, reset  # noqa: E402
+from src import forecast  # noqa: E402
+from src.infra.repo.repo import periodic_task_repo  # noqa: E402
+from src.infra.session import SessionLocal  # noqa: E402
+from src.models.models import PeriodicTask  # noqa: E402
+from src.upcoming import get_schedule_map  # noqa: E402
+from src.utils.timezone import utcnow  # noqa: E402
+
+T = TypeVar("T")
+
+
+def measure(label: str, func: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--days", type=float, default=1)
+    options = parser.parse_args()
+
+    reset()
+    print(populate(options.tasks, days=options.days))
+    with SessionLocal.begin() as session:
+        session.execute(
+            update(PeriodicTask).where(PeriodicTask.id % 3 == 0).values(jitter=600)
+        )
+    now = utcnow()
+    end = now + timedelta(days=options.days)
+    with SessionLocal.begin() as session:
+        tasks = measure(
+            "load tasks", lambda: periodic_task_repo.get_enabled_timings(db=session)
+        )
+        measure("load schedules", lambda: get_schedule_map(tasks, db=session))
+        for label, bucket, by in [
+            ("by minute", timedelta(minutes=1), None),
+            ("by hour", timedelta(hours=1), None),
+            ("by hour and task", timedelta(hours=1), "task"),
+            ("by hour, cached", timedelta(hours=1), None),
+        ]:
+            result = measure(
+                label,
+                lambda: forecast.get_forecast(now, end, bucket, by, now, db=session),
+            )
+        print(f"fires {sum(result['counts']):,}, peak {result['peak']:,}/hour")
+
+
+if __name__ == "__main__":
+    main()
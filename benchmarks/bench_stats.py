@@ -0,0 +1,117 @@
+"""Stats of the periodic tasks, from the rollups and from the raw runs.
+
+    python -m benchmarks.bench_stats [--tasks 200] [--runs 1000]
+
+Runs spread over the last week, ``--runs`` per task with log-normal
+runtimes and lags, are added in batches like the workers do, to the run
+history and to the rollups, in an in-memory SQLite database.  Times the
+stats of every window from the rollups, against loading the runs of the
+window and computing them exactly, and reports the error of the p95s.
+"""
+import argparse
+import os
+import time
+from datetime import timedelta
+from typing import Callable, TypeVar
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from benchmarks.dataset import reset  # noqa: E402
+from src.infra import rollup  # noqa: E402
+from src.infra.repo.repo import periodic_task_run_repo  # noqa: E402
+from src.infra.session import SessionLocal  # noqa: E402
+from src.models.models import PeriodicTaskRun  # noqa: E402
+from src.utils.timezone import utcnow  # noqa: E402
+
+T = TypeVar("T")
+
+BATCH_SIZE = 500
+
+
+def measure(label: str, func: Callable[[], T]) -> T:
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def exact_stats(since, db) -> dict:
+    """p95 runtime per task of the runs finished from ``since``, O(runs)."""
+    table = PeriodicTaskRun.__table__
+    rows = db.execute(
+        select(table.c.periodic_task_id, table.c.runtime).where(
+            table.c.finished_at >= since
+        )
+    ).all()
+    ids = np.array([row[0] for row in rows])
+    runtimes = np.array([row[1] for row in rows])
+    order = np.argsort(ids, kind="stable")
+    ids, runtimes = ids[order], runtimes[order]
+    firsts = np.flatnonzero(np.diff(ids, prepend=-1))
+    return {
+        int(ids[first]): float(np.percentile(group, 95))
+        for first, group in zip(firsts, np.split(runtimes, firsts[1:]))
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=1000)
+    options = parser.parse_args()
+
+    reset()
+    rng = np.random.default_rng(0)
+    now = utcnow()
+    count = options.tasks * options.runs
+    ids = rng.integers(1, options.tasks + 1, count)
+    ages = np.sort(rng.uniform(0, timedelta(weeks=1).total_seconds(), count))[::-1]
+    runtimes = rng.lognormal(np.log(0.5) + ids % 5, 0.5)
+    lags = rng.lognormal(np.log(0.05), 1.0, count)
+    runs = []
+    for i in range(count):
+        finished_at = now - timedelta(seconds=float(ages[i]))
+        started_at = finished_at - timedelta(seconds=float(runtimes[i]))
+        runs.append(
+            {
+                "periodic_task_id": int(ids[i]),
+                "task_id": str(i),
+                "worker": "bench",
+                "state": "SUCCESS" if i % 10 else "FAILURE",
+                "published_at": started_at - timedelta(seconds=float(lags[i])),
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "runtime": float(runtimes[i]),
+            }
+        )
+
+    def add() -> None:
+        for batch in np.array_split(runs, max(count // BATCH_SIZE, 1)):
+            batch = batch.tolist()
+            with SessionLocal.begin() as session:
+                periodic_task_run_repo.insert_many(batch, db=session)
+                rollup.add_runs(batch, db=session)
+
+    measure(f"add {count:,} runs", add)
+    with SessionLocal.begin() as session:
+        for window, (length, resolution) in rollup.WINDOWS.items():
+            stats = measure(
+                f"{window}, rollups",
+                lambda: rollup.get_stats(window, now=now, db=session),
+            )
+            since = rollup.period_start(now - length, resolution)
+            exact = measure(f"{window}, runs", lambda: exact_stats(since, session))
+            errors = [
+                abs(task["runtime_p95"] / exact[task["id"]] - 1) for task in stats
+            ]
+            print(
+                f"{len(stats):,} tasks, p95 error "
+                f"median {np.median(errors):.1%}, max {max(errors):.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Upcoming runs of many tasks, batched by schedule against one by one.
+
+    python -m benchmarks.bench_upcoming [--tasks 50000] [--n 24] [--sample 2000]
+
+Tasks from ``benchmarks.dataset`` in an in-memory SQLite database.  Times
+the preview of their next ``--n`` runs: loading them, computing the fire
+times in batches and formatting them.  The same computation task by task,
+on ``--sample`` tasks, gives the per-task cost without the batching.
+"""
+import argparse
+import os
+import time
+from typing import Callable, TypeVar
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from benchmarks.dataset import populate, reset  # noqa: E402
+from src.infra.repo.repo import periodic_task_repo  # noqa: E402
+from src.infra.session import SessionLocal  # noqa: E402
+from src.upcoming import (  # noqa: E402
+    get_schedule_map,
+    get_upcoming_runs,
+    isoformat,
+    upcoming_runs,
+)
+from src.utils.timezone import utcnow  # noqa: E402
+
+T = TypeVar("T")
+
+
+def measure(label: str, func: Callable[[], T], per: int) -> T:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed * 1000:>9.1f} ms {elapsed / per * 1e6:>9.2f} us/task")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--n", type=int, default=24)
+    parser.add_argument("--sample", type=int, default=2_000)
+    options = parser.parse_args()
+
+    reset()
+    print(populate(options.tasks))
+    now = utcnow()
+    ids = list(range(1, options.tasks + 1))
+    with SessionLocal.begin() as session:
+        measure(
+            "load and compute",
+            lambda: get_upcoming_runs(ids, options.n, now=now, db=session),
+            options.tasks,
+        )
+        tasks = measure(
+            "  load tasks",
+            lambda: periodic_task_repo.get_timings(ids, db=session),
+            options.tasks,
+        )
+        schedule_map = get_schedule_map(tasks, db=session)
+    runs = measure(
+        "  compute",
+        lambda: upcoming_runs(tasks, schedule_map, options.n, now),
+        options.tasks,
+    )
+    measure("format", lambda: isoformat(runs), options.tasks)
+    sample = tasks[: options.sample]
+    measure(
+        "one by one (sample)",
+        lambda: [upcoming_runs([t], schedule_map, options.n, now) for t in sample],
+        len(sample),
+    )
+
+
+if __name__ == "__main__":
+    main()
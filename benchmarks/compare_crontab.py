@@ -0,0 +1,156 @@
+"""Compiled ``tz_crontab`` against Celery's crontab, results and speed.
+
+    python -m benchmarks.compare_crontab [--cases 20000] [--seed 0]
+
+Random specs, timezones and ``(last_run_at, now)`` pairs, most of them
+around DST transitions.  ``is_due`` of the compiled schedule must be
+identical to Celery's ``crontab`` evaluated in the same ``zoneinfo``
+timezone, the process exits with 1 on any mismatch.  Celery's crontab
+given a ``pytz`` timezone, what ``tz_crontab`` used to do, is an hour off
+across DST transitions and is not compared.
+
+Then ``is_due`` of both is timed on a hot tick: many entries sharing a
+schedule, all fired at its last fire time.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+import pytz
+from celery.schedules import crontab, schedstate
+
+from src.schedules import tz_crontab
+
+FIELDS: Dict[str, List[str]] = {
+    "minute": ["*", "0", "*/5", "15,45", "7", "0-10", "*/17", "30", "59"],
+    "hour": ["*", "0", "1", "2", "*/2", "9-17", "1,13", "23"],
+    "day_of_week": ["*", "1", "3", "0,6", "1-5"],
+    "day_of_month": ["*", "1", "15", "29", "31", "1-7", "*/10"],
+    "month_of_year": ["*", "2", "12", "1,7", "*/3", "3,10,11"],
+}
+TIMEZONES = [
+    "UTC",
+    "Asia/Shanghai",
+    "Asia/Kolkata",
+    "Europe/Berlin",
+    "America/New_York",
+    # 30 minutes DST shift
+    "Australia/Lord_Howe",
+]
+DST_TRANSITIONS = [
+    datetime(2021, 3, 28, 1, tzinfo=timezone.utc),  # Europe/Berlin
+    datetime(2021, 10, 31, 1, tzinfo=timezone.utc),
+    datetime(2022, 3, 13, 7, tzinfo=timezone.utc),  # America/New_York
+    datetime(2022, 11, 6, 6, tzinfo=timezone.utc),
+    datetime(2022, 4, 2, 15, tzinfo=timezone.utc),  # Australia/Lord_Howe
+    datetime(2022, 10, 1, 15, 30, tzinfo=timezone.utc),
+]
+SPANS = [60, 600, 3600, 4000, 7200, 86400, 7 * 86400, 60 * 86400]
+
+Case = Tuple[Dict[str, str], str, datetime, datetime]
+
+
+def make_case(rng: random.Random) -> Case:
+    spec = {field: rng.choice(values) for field, values in FIELDS.items()}
+    if rng.random() < 0.7:
+        now = rng.choice(DST_TRANSITIONS)
+        now += timedelta(seconds=rng.randrange(-2 * 86400, 2 * 86400))
+    else:
+        now = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        now += timedelta(seconds=rng.randrange(0, 6 * 365 * 86400))
+    last_run_at = now - timedelta(seconds=rng.randrange(0, rng.choice(SPANS)))
+    return spec, rng.choice(TIMEZONES), last_run_at, now
+
+
+def reference_is_due(
+    spec: Dict[str, str], zone: str, last_run_at: datetime, now: datetime
+) -> schedstate:
+    """``tz_crontab.is_due`` as it was, on top of Celery's crontab."""
+    tz = ZoneInfo(zone)
+    cron = crontab(nowfun=lambda: now.astimezone(tz), **spec)
+    cron.tz = tz
+    rem = max(cron.remaining_estimate(last_run_at.astimezone(tz)).total_seconds(), 0)
+    due = rem == 0
+    if due:
+        rem = max(cron.remaining_estimate(cron.now()).total_seconds(), 0)
+    return schedstate(due, rem)
+
+
+def compiled_is_due(
+    spec: Dict[str, str], zone: str, last_run_at: datetime, now: datetime
+) -> schedstate:
+    cron = tz_crontab(tz=pytz.timezone(zone), **spec)
+    cron.nowfun = lambda: now
+    return cron.is_due(last_run_at)
+
+
+def compare(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = skipped = 0
+    for _ in range(cases):
+        spec, zone, last_run_at, now = make_case(rng)
+        try:
+            expected = reference_is_due(spec, zone, last_run_at, now)
+        except RuntimeError:
+            # never matching spec, e.g. February 31
+            skipped += 1
+            continue
+        result = compiled_is_due(spec, zone, last_run_at, now)
+        if expected.is_due != result.is_due or abs(expected.next - result.next) > 1e-6:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {spec} {zone} last_run_at={last_run_at} now={now}")
+                print(f"  expected {expected}, got {result}")
+    print(f"{cases:,} cases, {skipped:,} never matching, {mismatches:,} mismatches")
+    return mismatches
+
+
+def measure(label: str, n: int, fn: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {n / elapsed:>12,.0f} is_due/s  ({elapsed:.3f}s)")
+
+
+def bench(n: int) -> None:
+    spec = {"minute": "*/5", "hour": "9-17", "day_of_week": "1-5"}
+    tz = pytz.timezone("Europe/Berlin")
+    now = datetime(2022, 3, 2, 10, 7, 30, tzinfo=timezone.utc)
+    last_run_at = datetime(2022, 3, 2, 10, 5, tzinfo=timezone.utc)
+
+    celery_cron = crontab(nowfun=lambda: now.astimezone(tz), **spec)
+    celery_cron.tz = tz
+
+    def celery_is_due() -> None:
+        for _ in range(n):
+            celery_cron.is_due(last_run_at.astimezone(tz))
+
+    compiled = tz_crontab(tz=tz, **spec)
+    compiled.nowfun = lambda: now
+
+    def compiled_is_due() -> None:
+        for _ in range(n):
+            compiled.is_due(last_run_at)
+
+    measure("celery crontab (pytz)", n, celery_is_due)
+    measure("compiled tz_crontab", n, compiled_is_due)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bench", type=int, default=20_000)
+    options = parser.parse_args()
+
+    mismatches = compare(options.cases, options.seed)
+    bench(options.bench)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Precomputed solar event table against Celery's ``solar``, results and speed.
+
+    python -m benchmarks.compare_solar [--cases 5000] [--seed 0]
+
+Celery's ``solar`` needs ephem.  Random events, coordinates between 65° N
+and 65° S and ``last_run_at``: the next event of ``precomputed_solar`` must
+be within ``--tolerance`` seconds of ephem's, the process exits with 1 on
+any mismatch.  Cases without the event that day are skipped, Celery raises
+a TypeError computing when to check them again.  Then the vectorized fill
+of the table is timed, and ``is_due`` of both on a hot tick.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from celery.schedules import solar
+
+from src.schedules import SOLAR_EVENTS, SolarEventTable, precomputed_solar
+
+
+def compare(cases: int, seed: int, tolerance: float) -> int:
+    rng = random.Random(seed)
+    table = SolarEventTable()
+    mismatches = skipped = 0
+    worst = 0.0
+    for _ in range(cases):
+        event = rng.choice(sorted(SOLAR_EVENTS))
+        lat = round(rng.uniform(-65, 65), 6)
+        lon = round(rng.uniform(-180, 180), 6)
+        last_run_at = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(
+            seconds=rng.randrange(0, 6 * 365 * 86400)
+        )
+        now = last_run_at + timedelta(hours=1)
+        reference = solar(event, lat, lon, nowfun=lambda: now)
+        try:
+            expected = now + reference.remaining_estimate(last_run_at)
+        except TypeError:
+            # circumpolar, celery fails computing when to check again
+            skipped += 1
+            continue
+        computed = precomputed_solar(event, lat, lon, table=table, nowfun=lambda: now)
+        result = computed.next_event(last_run_at)
+        error = abs((result - expected).total_seconds())
+        worst = max(worst, error)
+        if error > tolerance:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {event} ({lat}, {lon}) last_run_at={last_run_at}")
+                print(f"  expected {expected}, got {result}")
+    print(
+        f"{cases:,} cases, {skipped:,} circumpolar, {mismatches:,} mismatches, "
+        f"worst error {worst:.0f}s"
+    )
+    return mismatches
+
+
+def measure(label: str, n: int, unit: str, fn: Callable[[], None]) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {n / elapsed:>12,.0f} {unit}/s  ({elapsed:.3f}s)")
+
+
+def bench(n: int, schedules: int) -> None:
+    rng = random.Random(0)
+    now = datetime(2022, 3, 2, 10, 7, 30, tzinfo=timezone.utc)
+    last_run_at = now - timedelta(hours=3)
+
+    table = SolarEventTable()
+    for _ in range(schedules):
+        event = rng.choice(sorted(SOLAR_EVENTS))
+        table.register(event, rng.uniform(-60, 60), rng.uniform(-180, 180))
+    measure(
+        f"fill {schedules:,} schedules x {table.days} days",
+        schedules * table.days,
+        "events",
+        lambda: table.fill(int(now.timestamp() // 86400)),
+    )
+
+    reference = solar("sunset", 48.85, 2.35, nowfun=lambda: now)
+    computed = precomputed_solar("sunset", 48.85, 2.35, nowfun=lambda: now)
+
+    def celery_is_due() -> None:
+        for _ in range(n):
+            reference.is_due(last_run_at)
+
+    def computed_is_due() -> None:
+        for _ in range(n):
+            computed.is_due(last_run_at)
+
+    measure("celery solar (ephem)", n, "is_due", celery_is_due)
+    measure("precomputed solar", n, "is_due", computed_is_due)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=120)
+    parser.add_argument("--bench", type=int, default=20_000)
+    parser.add_argument("--schedules", type=int, default=10_000)
+    options = parser.parse_args()
+
+    mismatches = compare(options.cases, options.seed, options.tolerance)
+    bench(options.bench, options.schedules)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
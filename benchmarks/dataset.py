@@ -0,0 +1,207 @@
+"""Synthetic periodic tasks for the benchmarks and simulations.
+
+    python -m benchmarks.dataset --tasks 10000 [--mix interval=5,crontab=3,...]
+        [--timezones UTC,Asia/Shanghai] [--schedules 100] [--seed 0] [--reset]
+
+This seeds the database of ``SQLALCHEMY_DATABASE_URI``. The same seed always
+gives the same tasks.  Each kind of task shares ``--schedules`` schedule rows,
+except clocked tasks, which are one-offs with a clocked row each, due at
+random over the next ``--days``.
+
+The rows are bulk inserted, bypassing the change log, only the last change
+time is updated.
+"""
+import argparse
+import os
+import random
+from datetime import timedelta
+from typing import Dict, List, Sequence
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from migrations.metadata import metadata  # noqa: E402
+from src.infra.repo.repo import periodic_tasks_change_repo  # noqa: E402
+from src.infra.session import SessionLocal, engine  # noqa: E402
+from src.models.models import (  # noqa: E402
+    SOLAR_EVENT_CHOICES,
+    ClockedSchedule,
+    CrontabSchedule,
+    IntervalSchedule,
+    PeriodicTask,
+    SolarSchedule,
+)
+from src.utils.timezone import utcnow  # noqa: E402
+
+KINDS = ("interval", "crontab", "clocked", "solar")
+DEFAULT_MIX = "interval=5,crontab=3,clocked=1,solar=1"
+TIMEZONES = ["UTC", "Asia/Shanghai", "Europe/Berlin", "America/New_York"]
+# seconds
+INTERVALS = (10, 30, 60, 300, 900, 3600)
+CRONTAB_HOURS = ("*", "*", "*/2", "*/6", "9", "0,12")
+CRONTAB_DAYS_OF_WEEK = ("*", "*", "mon-fri")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``"interval=5,crontab=3"`` -> the share of every kind of task."""
+    weights: Dict[str, float] = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind of task {kind!r}, one of {KINDS}")
+        weights[kind] = float(weight or 1)
+    total = sum(weights.values())
+    return {kind: weight / total for kind, weight in weights.items()}
+
+
+def reset(bind: Engine = engine) -> None:
+    metadata.drop_all(bind)
+    metadata.create_all(bind)
+
+
+def _insert(session: Session, model: type, rows: List[Dict]) -> List[int]:
+    """Bulk insert ``rows``, returns their ids."""
+    if not rows:
+        return []
+    first = session.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+    session.execute(insert(model), rows)
+    return list(
+        session.execute(
+            select(model.id).where(model.id > first).order_by(model.id)
+        ).scalars()
+    )
+
+
+def _split(tasks: int, mix: Dict[str, float]) -> Dict[str, int]:
+    counts = {kind: int(tasks * share) for kind, share in mix.items()}
+    # the rounding leftovers go to the largest share
+    counts[max(mix, key=mix.__getitem__)] += tasks - sum(counts.values())
+    return counts
+
+
+def populate(
+    tasks: int,
+    mix: str = DEFAULT_MIX,
+    timezones: Sequence[str] = TIMEZONES,
+    schedules: int = 100,
+    days: float = 1,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Insert ``tasks`` tasks named ``<kind>-<n>``, returns the count by kind.
+
+    The task of every row is ``bench.<kind>``.  The interval tasks have last
+    run at random points of their period, so they don't all fire at once.
+    """
+    rand = random.Random(seed)
+    now = utcnow()
+    span = timedelta(days=days).total_seconds()
+    counts = _split(tasks, parse_mix(mix))
+    with SessionLocal.begin() as session:
+        schedule_ids = {
+            "interval": _insert(
+                session,
+                IntervalSchedule,
+                [
+                    {"every": rand.choice(INTERVALS), "period": "seconds"}
+                    for _ in range(schedules if counts.get("interval") else 0)
+                ],
+            ),
+            "crontab": _insert(
+                session,
+                CrontabSchedule,
+                [
+                    {
+                        "minute": str(rand.randrange(60)),
+                        "hour": rand.choice(CRONTAB_HOURS),
+                        "day_of_week": rand.choice(CRONTAB_DAYS_OF_WEEK),
+                        "timezone": rand.choice(timezones),
+                    }
+                    for _ in range(schedules if counts.get("crontab") else 0)
+                ],
+            ),
+            "clocked": _insert(
+                session,
+                ClockedSchedule,
+                [
+                    {"clocked_time": now + timedelta(seconds=rand.uniform(0, span))}
+                    for _ in range(counts.get("clocked", 0))
+                ],
+            ),
+            "solar": _insert(
+                session,
+                SolarSchedule,
+                [
+                    {
+                        "event": rand.choice(list(SOLAR_EVENT_CHOICES)).value,
+                        # clear of the polar days and nights
+                        "latitude": round(rand.uniform(-60, 60), 6),
+                        "longitude": round(rand.uniform(-180, 180), 6),
+                    }
+                    for _ in range(schedules if counts.get("solar") else 0)
+                ],
+            ),
+        }
+        intervals = dict(
+            session.execute(
+                select(IntervalSchedule.id, IntervalSchedule.every)
+            ).all()
+        )
+        rows = []
+        for kind, count in counts.items():
+            ids = schedule_ids[kind]
+            for n in range(count):
+                schedule_id = ids[n] if kind == "clocked" else rand.choice(ids)
+                last_run_at = now
+                if kind == "interval":
+                    every = intervals[schedule_id]
+                    last_run_at = now - timedelta(seconds=rand.uniform(0, every))
+                row = {
+                    "name": f"{kind}-{n}",
+                    "task": f"bench.{kind}",
+                    "headers": "{}",
+                    "one_off": kind == "clocked",
+                    "last_run_at": last_run_at,
+                }
+                # executemany wants the same keys in every row
+                row.update({f"{other}_id": None for other in KINDS})
+                row[f"{kind}_id"] = schedule_id
+                rows.append(row)
+        session.execute(insert(PeriodicTask), rows)
+        # what the mapper events would have done
+        periodic_tasks_change_repo.update_or_create(db=session)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--timezones", default=",".join(TIMEZONES))
+    parser.add_argument("--schedules", type=int, default=100)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--reset", action="store_true", help="drop and recreate the tables first"
+    )
+    options = parser.parse_args()
+
+    if options.reset:
+        reset()
+    else:
+        metadata.create_all(engine)
+    counts = populate(
+        options.tasks,
+        options.mix,
+        options.timezones.split(","),
+        options.schedules,
+        options.days,
+        options.seed,
+    )
+    print(f"Inserted {counts} into {engine.url!r}")
+
+
+if __name__ == "__main__":
+    main()
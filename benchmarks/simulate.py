@@ -0,0 +1,233 @@
+"""Simulated days of DatabaseScheduler on a fake clock.
+
+    python -m benchmarks.simulate [--tasks 10000] [--days 1] [--mix ...]
+        [--timezones ...] [--seed 0] [--memory] [--json results.json]
+    python -m benchmarks.simulate --suite [--json results.json]
+
+The database is seeded with ``benchmarks.dataset``.  It is
+``SQLALCHEMY_DATABASE_URI``, in-memory SQLite by default, and its tables are
+dropped first (pass ``--reset`` to allow that outside SQLite).  Beat then
+ticks on a ``FakeClock``.  Each tick advances the clock by the interval the
+tick returned, as the beat service would sleep, so a simulated day takes
+only the time spent computing.  Due tasks go to an in-memory broker
+stand-in.
+
+Reported per run:
+* ticks per second of wall time, and the tick duration percentiles
+* database statements and transactions per tick
+* dispatches, in total and by kind of task
+* peak memory: traced by tracemalloc with ``--memory`` (slower), the peak
+  RSS of the process so far otherwise
+
+The same arguments and seed give the same schedule and the same dispatches,
+so runs compare across commits.  ``--suite`` runs the fixed ``SUITE``, each
+run over its own number of days.
+"""
+import argparse
+import json
+import os
+import resource
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite://")
+
+from celery import Celery  # noqa: E402
+
+from benchmarks.dataset import (  # noqa: E402
+    DEFAULT_MIX,
+    TIMEZONES,
+    populate,
+    reset,
+)
+from src.infra.session import engine  # noqa: E402
+from src.schedulers import DatabaseScheduler  # noqa: E402
+from src.utils.timezone import Clock, set_clock  # noqa: E402
+
+START = datetime(2026, 1, 5, tzinfo=timezone.utc)
+# Beat ticks again at once after a non-positive interval, e.g. the 10ms
+# celery's adjust() wakes it up early, the clock then moves on by about the
+# duration of a tick.
+MIN_ADVANCE = 1e-4
+
+# sized to dispatch about 10k-100k tasks each
+SUITE: List[Dict[str, Any]] = [
+    {"name": "interval-1k", "tasks": 1_000, "mix": "interval=1", "days": 0.05},
+    {"name": "crontab-10k", "tasks": 10_000, "mix": "crontab=1", "days": 1},
+    {"name": "solar-10k", "tasks": 10_000, "mix": "solar=1", "days": 2},
+    {"name": "clocked-10k", "tasks": 10_000, "mix": "clocked=1", "days": 1},
+    {"name": "mixed-10k", "tasks": 10_000, "mix": DEFAULT_MIX, "days": 0.01},
+    {"name": "mixed-50k", "tasks": 50_000, "mix": DEFAULT_MIX, "days": 0.002},
+]
+
+
+class FakeClock(Clock):
+    """Time standing still at ``start`` until advanced."""
+
+    def __init__(self, start: datetime = START) -> None:
+        self.start = start
+        self.elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def advance(self, seconds: float) -> None:
+        self.elapsed += seconds
+
+
+class Broker:
+    """In-memory stand-in of the broker, counts the messages by task."""
+
+    def __init__(self) -> None:
+        self.sent: Counter = Counter()
+
+    def send_task(self, name: str, *args: Any, **kwargs: Any) -> None:
+        self.sent[name] += 1
+
+
+class SimulatedScheduler(DatabaseScheduler):
+    # no connection to a broker
+    producer = None
+
+    def __init__(self, *args: Any, broker: Broker, **kwargs: Any) -> None:
+        self.broker = broker
+        super().__init__(*args, **kwargs)
+
+    def send_task(self, name: str, *args: Any, **kwargs: Any) -> None:
+        self.broker.send_task(name, *args, **kwargs)
+
+
+def simulate(
+    name: str = "",
+    tasks: int = 10_000,
+    days: float = 1,
+    mix: str = DEFAULT_MIX,
+    timezones: str = ",".join(TIMEZONES),
+    schedules: int = 100,
+    seed: int = 0,
+    memory: bool = False,
+) -> Dict[str, Any]:
+    clock = FakeClock()
+    previous = set_clock(clock)
+    try:
+        reset()
+        populate(tasks, mix, timezones.split(","), schedules, days, seed)
+        app = Celery(set_as_current=False)
+        app.conf.timezone = "UTC"
+        # no backend_cleanup entry
+        app.conf.result_expires = None
+        app.now = clock.now
+        broker = Broker()
+        if memory:
+            tracemalloc.start()
+        scheduler = SimulatedScheduler(app=app, broker=broker)
+        metrics = scheduler.metrics
+        statements = metrics.db_statements.labels().value
+        transactions = metrics.db_transactions.labels().value
+        end = timedelta(days=days).total_seconds()
+        ticks = 0
+        started = time.perf_counter()
+        while clock.monotonic() < end:
+            clock.advance(max(scheduler.tick(), MIN_ADVANCE))
+            ticks += 1
+        scheduler.sync()
+        wall = time.perf_counter() - started
+        statements = metrics.db_statements.labels().value - statements
+        transactions = metrics.db_transactions.labels().value - transactions
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            # kilobytes on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        tick_duration = metrics.tick_duration.labels()
+        scheduler.close()
+    finally:
+        set_clock(previous)
+    return {
+        "name": name or f"{tasks} tasks",
+        "tasks": tasks,
+        "days": days,
+        "ticks": ticks,
+        "wall": wall,
+        "ticks_per_second": ticks / wall,
+        "tick_p50": tick_duration.quantile(0.5),
+        "tick_p99": tick_duration.quantile(0.99),
+        "statements_per_tick": statements / ticks,
+        "transactions_per_tick": transactions / ticks,
+        "dispatched": sum(broker.sent.values()),
+        "dispatched_by_kind": {
+            task.split(".", 1)[1]: count for task, count in sorted(broker.sent.items())
+        },
+        "peak_memory": peak,
+        "peak_memory_traced": memory,
+    }
+
+
+HEADER = (
+    f"{'run':<16} {'ticks':>9} {'ticks/s':>8} {'p99 ms':>7} {'stmt/tick':>9}"
+    f" {'tx/tick':>7} {'dispatched':>10} {'peak MB':>8}"
+)
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(
+        f"{result['name']:<16} {result['ticks']:>9,} "
+        f"{result['ticks_per_second']:>8,.0f} "
+        f"{(result['tick_p99'] or 0) * 1000:>7.2f} "
+        f"{result['statements_per_tick']:>9.4f} "
+        f"{result['transactions_per_tick']:>7.4f} "
+        f"{result['dispatched']:>10,} "
+        f"{result['peak_memory'] / 2**20:>8.1f}"
+    )
+    print(f"{'':<16} {result['dispatched_by_kind']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suite", action="store_true", help="run SUITE")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--timezones", default=",".join(TIMEZONES))
+    parser.add_argument("--schedules", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="trace the memory")
+    parser.add_argument("--reset", action="store_true", help="allow dropping tables")
+    parser.add_argument("--json", help="write the results to this file")
+    options = parser.parse_args()
+
+    if engine.dialect.name != "sqlite" and not options.reset:
+        parser.error(f"the tables of {engine.url!r} would be dropped, pass --reset")
+    common = {"seed": options.seed, "memory": options.memory}
+    if options.suite:
+        runs = [dict(run, **common) for run in SUITE]
+    else:
+        runs = [
+            dict(
+                common,
+                tasks=options.tasks,
+                days=options.days,
+                mix=options.mix,
+                timezones=options.timezones,
+                schedules=options.schedules,
+            )
+        ]
+    print(HEADER)
+    results = []
+    for run in runs:
+        results.append(simulate(**run))
+        report(results[-1])
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
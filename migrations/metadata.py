@@ -2,10 +2,14 @@
 # provides target_metadata to Alembic
 from src.models.mapper import Base
 from src.models.models import (  # noqa: F401
+    BeatLease,
     ClockedSchedule,
     CrontabSchedule,
     IntervalSchedule,
     PeriodicTask,
+    PeriodicTaskChangeLog,
+    PeriodicTaskRollup,
+    PeriodicTaskRun,
     PeriodicTasksChange,
     SolarSchedule,
 )
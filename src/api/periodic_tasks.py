@@ -1,66 +1,136 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
 
-from src import schemas
-from src.infra.repo.repo import periodic_task_repo
+from src import schemas, upcoming
+from src.infra import rollup
+from src.infra.async_session import get_async_session
+from src.infra.repo.async_repo import async_periodic_task_repo
+from src.infra.repo.repo import periodic_task_run_repo
 from src.infra.session import get_session
 
 router = APIRouter()
 
+# The routes computing over many tasks stay sync, run in the threadpool, on
+# the event loop they would hold up every other request.
+
 
 @router.get("/", response_model=list[schemas.PeriodicTask])
-def list_periodic_task(
+async def list_periodic_task(
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
-    with get_session().begin():
-        tasks = periodic_task_repo.get_multi(skip=skip, limit=limit)
+    async with get_async_session().begin():
+        tasks = await async_periodic_task_repo.get_multi(skip=skip, limit=limit)
         return tasks
 
 
-@router.get("/{id}", response_model=schemas.PeriodicTask)
-def get_period_task(id: int) -> Any:
+@router.post("/upcoming", response_model=list[schemas.UpcomingRuns])
+def bulk_upcoming_runs(query: schemas.UpcomingRunsQuery) -> Any:
     with get_session().begin():
-        if not (task := periodic_task_repo.get(id)):
+        ids, runs = upcoming.get_upcoming_runs(query.ids, query.n)
+    if query.until is not None:
+        runs[runs > query.until.timestamp()] = np.nan
+    # Serialized here, validating the datetimes of thousands of tasks takes
+    # longer than computing them.
+    return JSONResponse(
+        [
+            {"id": id, "runs": times}
+            for id, times in zip(ids, upcoming.isoformat(runs))
+        ]
+    )
+
+
+@router.get("/stats", response_model=list[schemas.PeriodicTaskStats])
+def list_stats(window: schemas.StatsWindow = "day") -> Any:
+    """Stats of the tasks that ran in the last ``window``."""
+    with get_session().begin():
+        stats = rollup.get_stats(window)
+    # Serialized here like the upcoming runs, the stats are plain already.
+    return JSONResponse(stats)
+
+
+@router.get("/{id}", response_model=schemas.PeriodicTask)
+async def get_period_task(id: int) -> Any:
+    async with get_async_session().begin():
+        if not (task := await async_periodic_task_repo.get(id)):
             raise HTTPException(status_code=404, detail="Item not found")
         return task
 
 
 @router.post("/", response_model=schemas.PeriodicTask)
-def create_periodic_task(data: schemas.PeriodicTaskCreate) -> Any:
-    with get_session().begin():
-        task = periodic_task_repo.create(data)
+async def create_periodic_task(data: schemas.PeriodicTaskCreate) -> Any:
+    async with get_async_session().begin():
+        task = await async_periodic_task_repo.create(data)
     return task
 
 
 @router.put("/{id}", response_model=schemas.PeriodicTask)
-def update_periodic_task(id: int, data: schemas.PeriodicTaskUpdate) -> Any:
-    with get_session().begin():
-        if not (task := periodic_task_repo.get(id)):
+async def update_periodic_task(id: int, data: schemas.PeriodicTaskUpdate) -> Any:
+    async with get_async_session().begin():
+        if not (task := await async_periodic_task_repo.get(id)):
             raise HTTPException(status_code=404, detail="Item not found")
-        periodic_task_repo.update(task, data)
+        await async_periodic_task_repo.update(task, data)
         return task
 
 
 @router.delete("/{id}")
-def delete_periodic_task(id: int) -> Any:
-    with get_session().begin():
-        if not periodic_task_repo.delete(id=id):
+async def delete_periodic_task(id: int) -> Any:
+    async with get_async_session().begin():
+        if not await async_periodic_task_repo.delete(id=id):
             raise HTTPException(status_code=404, detail="Item not found")
 
 
 @router.get("/{id}/enable")
-def enable_task(id: int) -> Any:
-    with get_session().begin():
-        if not (task := periodic_task_repo.get(id)):
+async def enable_task(id: int) -> Any:
+    async with get_async_session().begin():
+        if not (task := await async_periodic_task_repo.get(id)):
             raise HTTPException(status_code=404, detail="Item not found")
         task.enable()
 
 
 @router.get("/{id}/disable")
-def disable_task(id: int) -> Any:
-    with get_session().begin():
-        if not (task := periodic_task_repo.get(id)):
+async def disable_task(id: int) -> Any:
+    async with get_async_session().begin():
+        if not (task := await async_periodic_task_repo.get(id)):
             raise HTTPException(status_code=404, detail="Item not found")
         task.disable()
+
+
+@router.get("/{id}/upcoming", response_model=schemas.UpcomingRuns)
+def get_upcoming_runs(id: int, n: int = Query(10, ge=1, le=1000)) -> Any:
+    with get_session().begin():
+        ids, runs = upcoming.get_upcoming_runs([id], n)
+    if not ids:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"id": id, "runs": upcoming.isoformat(runs)[0]}
+
+
+@router.get("/{id}/runs", response_model=list[schemas.PeriodicTaskRun])
+async def list_runs(
+    id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[int] = None,
+) -> Any:
+    """Runs newest first, pass the id of the last run as ``before`` to page."""
+    session = get_async_session()
+    async with session.begin():
+        if not await async_periodic_task_repo.get(id):
+            raise HTTPException(status_code=404, detail="Item not found")
+        return await session.run_sync(
+            lambda db: periodic_task_run_repo.get_by_task(
+                id, limit=limit, before=before, db=db
+            )
+        )
+
+
+@router.get("/{id}/stats", response_model=schemas.PeriodicTaskWindowStats)
+async def get_stats(id: int) -> Any:
+    session = get_async_session()
+    async with session.begin():
+        if not await async_periodic_task_repo.get(id):
+            raise HTTPException(status_code=404, detail="Item not found")
+        stats = await session.run_sync(lambda db: rollup.get_task_stats(id, db=db))
+    return {"id": id, **stats}
@@ -3,12 +3,14 @@ from typing import Optional
 
 from fastapi import APIRouter
 
+from src.infra.async_session import get_async_session
 from src.infra.repo.repo import periodic_tasks_change_repo
 
 from .clocked_schedules import router as clocked_schedules_router
 from .crontab_schedules import router as crontab_scheduler_router
 from .interval_schedules import router as interval_schedules_router
 from .periodic_tasks import router as periodic_task_router
+from .schedule import router as schedule_router
 from .solar_schedules import router as solar_schedules_router
 
 router = APIRouter()
@@ -44,10 +46,17 @@ router.include_router(
     tags=["Periodic Tasks"],
 )
 
+router.include_router(
+    schedule_router,
+    prefix="/schedule",
+    tags=["Schedule"],
+)
+
 
 @router.get("/last-update", response_model=datetime, tags=["Periodic Tasks"])
-def last_update() -> Optional[datetime]:
-    if (obj := periodic_tasks_change_repo.get()) is None:
+async def last_update() -> Optional[datetime]:
+    session = get_async_session()
+    if (obj := await session.run_sync(periodic_tasks_change_repo.get)) is None:
         return None
     else:
         return obj.last_update
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from celery.utils.time import maybe_make_aware
+from fastapi import APIRouter, HTTPException, Query
+
+from src import forecast, schemas
+from src.infra.session import get_session
+
+router = APIRouter()
+
+
+@router.get("/forecast", response_model=schemas.Forecast)
+def get_forecast(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    bucket: timedelta = Query(timedelta(minutes=1)),
+    by: Optional[schemas.ForecastBy] = None,
+) -> Any:
+    start, end = maybe_make_aware(start), maybe_make_aware(end)
+    if bucket <= timedelta(0) or end <= start:
+        raise HTTPException(
+            status_code=422, detail="bucket must be positive, to later than from"
+        )
+    if (end - start) / bucket > schemas.MAX_FORECAST_BUCKETS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {schemas.MAX_FORECAST_BUCKETS} buckets, use larger ones",
+        )
+    with get_session().begin():
+        try:
+            return forecast.get_forecast(start, end, bucket, by)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
@@ -2,11 +2,15 @@ import time
 import os
 from celery import Celery
 from src import celery_config
+from src.infra import run_history
 
 app = Celery(broker=os.environ["CELERY_BROKEY_URL"])
 
 app.config_from_object(celery_config)
 
+if app.conf.get("beat_run_history"):
+    run_history.install(app)
+
 
 @app.task
 def test() -> None:
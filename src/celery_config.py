@@ -1,2 +1,53 @@
 timezone = "Asia/Shanghai"
 imports = ("src.tasks",)
+
+# DatabaseScheduler, run state write-behind: the run states of the fired
+# tasks are flushed to the database every beat_run_state_flush_interval
+# seconds (3 minutes by default) or every beat_run_state_batch_size
+# fired tasks.  Set beat_run_state_journal to a local file to also journal
+# them, the unflushed ones are replayed after a crash instead of being lost.
+# beat_run_state_journal = "celerybeat-runstate.journal"
+# beat_run_state_flush_interval = 60  # seconds
+# beat_run_state_batch_size = 1000
+
+# "heap" or "wheel", see benchmarks/bench_engines.py
+beat_engine = "heap"
+
+# DatabaseScheduler, sharded mode: the tasks are split between all the beat
+# processes using the same number of partitions, each process needs its own
+# beat_run_state_journal if any.
+# beat_partitions = 64
+# beat_lease_ttl = 30  # seconds
+
+# DatabaseScheduler, leader election mode: run several replicas, only the
+# leader fires, the standbys take over once its lease expires.
+# beat_leader_election = True
+
+# DatabaseScheduler, publish the due tasks from a background thread, in
+# batches, retrying with backoff while the broker is unreachable.  Past the
+# queue size, or the retries, the tasks are dropped and queued again once
+# there is room.
+# beat_publisher = True
+# beat_publisher_queue_size = 10000
+# beat_publisher_batch_size = 100
+# beat_publisher_max_retries = 5
+
+# DatabaseScheduler, spread the due times of each task by a stable offset
+# within this window, overridden by PeriodicTask.jitter.
+# beat_jitter = 30  # seconds
+# Entries overdue by more than beat_misfire_grace_time after a downtime:
+# "fire_once", "skip" or "spread" over beat_misfire_spread seconds.
+# beat_misfire_policy = "spread"
+# beat_misfire_grace_time = 60  # seconds
+# beat_misfire_spread = 300  # seconds
+
+# DatabaseScheduler, serve Prometheus metrics on "host:port" or on
+# "unix:///path/to/socket".
+# beat_metrics_address = "127.0.0.1:9808"
+
+# Record the runs of the periodic tasks in celery_periodic_task_run, in beat
+# and in the workers, batched.  Beat prunes the runs older than the retention.
+# beat_run_history = True
+# beat_run_history_batch_size = 500
+# beat_run_history_flush_interval = 5  # seconds
+# beat_run_history_retention = 30  # days
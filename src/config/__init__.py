@@ -1,5 +1,6 @@
 from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -14,6 +15,12 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
 
     SQLALCHEMY_DATABASE_URI: str = f"sqlite:///{BASE_DIR.as_posix()}/db.sqlite3"
+    # Connections of the API's async engine, requests past them wait for one.
+    SQLALCHEMY_ASYNC_POOL_SIZE: int = 40
+    SQLALCHEMY_ASYNC_MAX_OVERFLOW: int = 10
+    # Push schedule changes to beat, e.g. "redis://localhost:6379/0",
+    # "postgresql://..." or "unix:///tmp/my-tasks".  Beat polls if unset.
+    SCHEDULE_NOTIFY_URL: Optional[str] = None
 
     class Config:
         case_sensitive = True
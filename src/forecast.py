@@ -0,0 +1,278 @@
+"""Fires of the enabled periodic tasks per time bucket, the dispatch load.
+
+Every task fires first at its next run, as previewed by ``src.upcoming``.
+One-off and clocked tasks stop there.  The later fires of the tasks sharing
+a schedule are the fire times of the schedule, computed once, shifted by
+the jitter offset of each task.  Interval tasks share a grid of ``every``
+seconds, shifted by their phase.  Tasks alike count once, with a weight.
+The fires of a group are either histogrammed one by one, or counted below
+every bucket edge with a binary search, whichever takes fewer steps.
+"""
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src import schedules
+from src.infra.repo.repo import periodic_task_repo, periodic_tasks_change_repo
+from src.upcoming import (
+    DEFAULT_JITTER,
+    SCHEDULE_REPOS,
+    ScheduleKey,
+    get_schedule_map,
+    task_offsets,
+    upcoming_runs,
+)
+
+# buckets times breakdown keys
+MAX_FORECAST_CELLS = 10_000_000
+# cells of the arrays computed at once, bounds their memory
+CHUNK_CELLS = 1_000_000
+# seconds, between the fire times of a same instant computed differently
+TOLERANCE = 1e-3
+CACHE_SIZE = 16
+
+
+def _histogram(
+    fires: np.ndarray,
+    weights: np.ndarray,
+    keys: np.ndarray,
+    start: float,
+    bucket: float,
+    shape: tuple,
+) -> np.ndarray:
+    """Sum of ``weights`` per breakdown key and bucket of ``fires``."""
+    index = np.floor((fires - start) / bucket)
+    inside = (index >= 0) & (index < shape[1])
+    flat = keys[inside] * shape[1] + index[inside].astype(np.int64)
+    counts = np.bincount(flat, weights[inside], minlength=shape[0] * shape[1])
+    # integers when there are no fires, whatever the weights
+    return counts.reshape(shape).astype(float, copy=False)
+
+
+def _chunks(rows: int, columns: int) -> List[slice]:
+    step = max(1, CHUNK_CELLS // max(columns, 1))
+    return [slice(i, i + step) for i in range(0, rows, step)]
+
+
+def _group_counts(
+    times: Optional[np.ndarray],
+    below: Callable[[np.ndarray], np.ndarray],
+    shifts: np.ndarray,
+    bounds: np.ndarray,
+    keys: np.ndarray,
+    weights: np.ndarray,
+    start: float,
+    bucket: float,
+    shape: tuple,
+) -> np.ndarray:
+    """Fires later than ``bounds`` of tasks firing at ``times`` + ``shifts``.
+
+    ``below(x)`` counts the times lower than ``x``, up to a constant.
+    ``times`` are given when there are fewer of them than buckets.
+    """
+    counts = np.zeros(shape)
+    if times is not None:
+        for chunk in _chunks(len(shifts), len(times)):
+            fires = times + shifts[chunk, None]
+            later = fires > bounds[chunk, None]
+            counts += _histogram(
+                fires[later],
+                np.broadcast_to(weights[chunk, None], fires.shape)[later],
+                np.broadcast_to(keys[chunk, None], fires.shape)[later],
+                start,
+                bucket,
+                shape,
+            )
+        return counts
+    edges = start + bucket * np.arange(shape[1] + 1)
+    for chunk in _chunks(len(shifts), len(edges)):
+        shift = shifts[chunk, None]
+        before = below(edges - shift) - below(bounds[chunk, None] - shift)
+        per_task = np.diff(np.maximum(before, 0), axis=1) * weights[chunk, None]
+        # summed per breakdown key
+        order = np.argsort(keys[chunk], kind="stable")
+        sorted_keys = keys[chunk][order]
+        firsts = np.flatnonzero(np.diff(sorted_keys, prepend=-1))
+        counts[sorted_keys[firsts]] += np.add.reduceat(per_task[order], firsts)
+    return counts
+
+
+def forecast(
+    tasks: Sequence[Mapping[str, Any]],
+    schedule_map: Mapping[ScheduleKey, schedules.BaseSchedule],
+    keys: np.ndarray,
+    start: float,
+    bucket: float,
+    buckets: int,
+    now: Optional[datetime] = None,
+    default_jitter: Optional[int] = None,
+) -> np.ndarray:
+    """Fires of ``tasks`` per breakdown key and bucket, ``(keys, buckets)``.
+
+    ``keys`` are the breakdown key of every task, numbered from 0.  The
+    buckets are ``bucket`` seconds from the timestamp ``start``.
+    """
+    end = start + bucket * buckets
+    shape = (int(keys.max(initial=0)) + 1, buckets)
+    firsts = upcoming_runs(tasks, schedule_map, 1, now, default_jitter)[:, 0]
+    fire = ~np.isnan(firsts)
+    counts = _histogram(
+        firsts[fire], np.ones(fire.sum()), keys[fire], start, bucket, shape
+    )
+    groups: Dict[ScheduleKey, List[int]] = defaultdict(list)
+    for row, task in enumerate(tasks):
+        if not fire[row] or firsts[row] >= end or task["one_off"]:
+            continue
+        for field in SCHEDULE_REPOS:
+            if (key := (field, task[field])) in schedule_map:
+                groups[key].append(row)
+                break
+    for key, rows in groups.items():
+        schedule = schedule_map[key]
+        if isinstance(schedule, schedules.clocked):
+            continue
+        first = firsts[rows]
+        if isinstance(schedule, schedules.schedule):
+            every = schedule.seconds
+            shifts = np.mod(first, every)
+            # halfway to the second run, clear of the rounding of the grid
+            bounds = first + every / 2
+        else:
+            shifts = task_offsets([tasks[row] for row in rows], default_jitter)
+            bounds = first + TOLERANCE
+        alike, weights = np.unique(
+            np.stack([shifts, bounds, keys[rows]], axis=1),
+            axis=0,
+            return_counts=True,
+        )
+        shifts, bounds = alike[:, 0], alike[:, 1]
+        # The times before the window are left out, below() counts up to a
+        # constant: a window years ahead costs like one starting now.
+        low = max(float((bounds - shifts).min()), start - float(shifts.max()))
+        high = end - float(shifts.min())
+        times: Optional[np.ndarray] = None
+        if isinstance(schedule, schedules.schedule):
+            if (high - low) / every <= buckets:
+                lowest = np.floor(low / every)
+                times = every * np.arange(lowest, np.ceil(high / every) + 1)
+
+            def below(x: np.ndarray) -> np.ndarray:
+                return np.ceil(x / every)
+
+        else:
+            # strictly later than the first argument
+            fire_times = schedule.fire_times(low - TOLERANCE, 1, until=high)
+
+            def below(x: np.ndarray) -> np.ndarray:
+                return np.searchsorted(fire_times, x)
+
+            if len(fire_times) <= buckets:
+                times = fire_times
+
+        counts += _group_counts(
+            times,
+            below,
+            shifts,
+            bounds,
+            alike[:, 2].astype(np.int64),
+            weights,
+            start,
+            bucket,
+            shape,
+        )
+    return counts.round().astype(np.int64)
+
+
+class ForecastCache:
+    """The last forecasts, as long as the tasks didn't change.
+
+    Keyed on ``PeriodicTasksChange.last_update``: a forecast is reused until
+    a task or schedule changes, while beat keeps running the tasks.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE) -> None:
+        self.size = size
+        self.last_update: Optional[datetime] = None
+        self.forecasts: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+
+    def get(
+        self, last_update: Optional[datetime], key: Hashable
+    ) -> Optional[Dict[str, Any]]:
+        if last_update != self.last_update:
+            self.last_update = last_update
+            self.forecasts.clear()
+            return None
+        if (result := self.forecasts.get(key)) is not None:
+            self.forecasts.move_to_end(key)
+        return result
+
+    def put(self, key: Hashable, result: Dict[str, Any]) -> None:
+        self.forecasts[key] = result
+        while len(self.forecasts) > self.size:
+            self.forecasts.popitem(last=False)
+
+
+cache = ForecastCache()
+
+
+def get_forecast(
+    start: datetime,
+    end: datetime,
+    bucket: timedelta,
+    by: Optional[str] = None,
+    now: Optional[datetime] = None,
+    default_jitter: Optional[int] = DEFAULT_JITTER,
+    db: Session = None,
+) -> Dict[str, Any]:
+    """Fires of the enabled tasks per bucket of ``bucket`` in ``[start, end)``.
+
+    ``by`` is ``"queue"`` or ``"task"``, to break the counts down by the
+    queue or the task name of the tasks, ``""`` for no queue.  Raises
+    ``ValueError`` when the breakdown would be too large.
+    """
+    change = periodic_tasks_change_repo.get(db=db)
+    last_update = change.last_update if change else None
+    key = (start, end, bucket, by)
+    if (result := cache.get(last_update, key)) is not None:
+        return result
+    buckets = int(np.ceil((end - start) / bucket))
+    tasks = periodic_task_repo.get_enabled_timings(db=db)
+    labels: List[str] = []
+    keys = np.zeros(len(tasks), dtype=np.int64)
+    if by is not None and tasks:
+        names, keys = np.unique(
+            [task[by] or "" for task in tasks], return_inverse=True
+        )
+        labels = names.tolist()
+        if len(labels) * buckets > MAX_FORECAST_CELLS:
+            raise ValueError(
+                f"{len(labels)} {by}s over {buckets} buckets, use larger buckets"
+            )
+    counts = forecast(
+        tasks,
+        get_schedule_map(tasks, db=db),
+        keys,
+        start.timestamp(),
+        bucket.total_seconds(),
+        buckets,
+        now,
+        default_jitter,
+    )
+    total = counts.sum(axis=0)
+    peak = int(np.argmax(total)) if total.any() else None
+    result = {
+        "start": start,
+        "bucket": bucket,
+        "counts": total.tolist(),
+        "peak": int(total.max(initial=0)),
+        "peak_at": None if peak is None else start + peak * bucket,
+        "by": by,
+        "breakdown": (
+            None if by is None else dict(zip(labels, counts[: len(labels)].tolist()))
+        ),
+    }
+    cache.put(key, result)
+    return result
@@ -0,0 +1,106 @@
+"""Async counterpart of ``src.infra.session``, for the ``async def`` routes.
+
+The engine uses the async driver of the configured database, aiosqlite or
+asyncpg.  Beat and the workers don't import this module, so they don't need
+the async drivers.  Sessions don't expire their objects on commit: the
+routes return them after the transaction, when loading an attribute again
+would need a round trip outside of an ``await``.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+    Response,
+)
+
+from src.config import settings
+from src.infra.session import SessionHolder, session_holder_var
+
+__all__ = (
+    "async_engine",
+    "get_async_session",
+    "AsyncDBSessionMiddleware",
+    "AsyncSessionHolder",
+)
+
+# by the backend of SQLALCHEMY_DATABASE_URI
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_url(url: str) -> URL:
+    """``url`` with the async driver of its database."""
+    sync_url = make_url(url)
+    backend = sync_url.get_backend_name()
+    return sync_url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def _pool_options(url: URL) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # a single connection
+            return options
+        # On a file, aiosqlite opens a connection and its thread per session
+        # by default, as many at once as there are requests.
+        options["poolclass"] = AsyncAdaptedQueuePool
+    # sized for the concurrent requests rather than for threads
+    options["pool_size"] = settings.SQLALCHEMY_ASYNC_POOL_SIZE
+    options["max_overflow"] = settings.SQLALCHEMY_ASYNC_MAX_OVERFLOW
+    return options
+
+
+_url = async_url(settings.SQLALCHEMY_DATABASE_URI)
+async_engine = create_async_engine(_url, **_pool_options(_url))
+
+async_session_holder_var: ContextVar["AsyncSessionHolder"] = ContextVar(
+    "async_session_holder"
+)
+
+AsyncSessionLocal = sessionmaker(  # type: ignore
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def get_async_session(session: AsyncSession = None) -> AsyncSession:
+    return session or async_session_holder_var.get().session
+
+
+class AsyncSessionHolder:
+    _session: Optional[AsyncSession] = None
+
+    @property
+    def is_set(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    async def cleanup(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncDBSessionMiddleware(BaseHTTPMiddleware):
+    """``DBSessionMiddleware`` with an ``AsyncSession`` too, both lazy."""
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        token = session_holder_var.set(SessionHolder())
+        async_token = async_session_holder_var.set(AsyncSessionHolder())
+        res = await call_next(request)
+        await async_session_holder_var.get().cleanup()
+        session_holder_var.get().cleanup()
+        async_session_holder_var.reset(async_token)
+        session_holder_var.reset(token)
+        return res
@@ -1,15 +1,23 @@
-from typing import TYPE_CHECKING, Union
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, Type, TypeVar, Union
 
 from sqlalchemy import insert, select, update
-from sqlalchemy.event import listen
+from sqlalchemy.event import contains, listen
+from sqlalchemy.orm import Session, object_session
 
+from src.config import settings
+from src.infra.notify import create_notifier
 from src.models.models import (
+    CHANGE_ACTIONS,
     ClockedSchedule,
     CrontabSchedule,
     IntervalSchedule,
     ModelSchedule,
     PeriodicTask,
+    PeriodicTaskChangeLog,
     PeriodicTasksChange,
+    SolarSchedule,
 )
 from src.utils.timezone import utcnow
 
@@ -17,6 +25,23 @@ if TYPE_CHECKING:
     from sqlalchemy.engine.base import Connection
     from sqlalchemy.orm import Mapper
 
+logger = logging.getLogger(__name__)
+
+SCHEDULE_CHANGED = "schedule_changed"
+
+notifier = create_notifier(settings.SCHEDULE_NOTIFY_URL)
+
+T = TypeVar("T", bound=Union[ModelSchedule, PeriodicTask])
+Listener = Callable[["Mapper", "Connection", T], None]
+
+SCHEDULE_FIELDS: Dict[Type[ModelSchedule], str] = {
+    IntervalSchedule: "interval_id",
+    CrontabSchedule: "crontab_id",
+    ClockedSchedule: "clocked_id",
+    SolarSchedule: "solar_id",
+}
+SCHEDULE_MODELS = tuple(SCHEDULE_FIELDS)
+
 
 # Schedule and Periodic tasks tasks change
 def update_changed(
@@ -30,21 +55,108 @@ def update_changed(
         connection.execute(update(PeriodicTasksChange).values(last_update=utcnow()))
 
 
-def changed(mapper: "Mapper", connection: "Connection", target: PeriodicTask) -> None:
-    if not target.no_changes:
+def log_changed(
+    connection: "Connection",
+    target: Union[ModelSchedule, PeriodicTask],
+    action: CHANGE_ACTIONS,
+) -> None:
+    # Called after update_changed: the single PeriodicTasksChange row is locked
+    # until commit, so change log ids are handed out in commit order.
+    connection.execute(
+        insert(PeriodicTaskChangeLog).values(
+            table=target.__tablename__,
+            object_id=target.id,
+            action=action.value,
+            changed_at=utcnow(),
+        )
+    )
+
+
+def reset_next_run_at(
+    connection: "Connection", target: Union[ModelSchedule, PeriodicTask]
+) -> None:
+    # next_run_at is derived from the task and its schedule, beat recomputes it
+    table = PeriodicTask.__table__
+    if isinstance(target, PeriodicTask):
+        where = table.c.id == target.id
+    else:
+        where = table.c[SCHEDULE_FIELDS[type(target)]] == target.id
+    connection.execute(update(table).where(where).values(next_run_at=None))
+
+
+def mark_changed(target: Union[ModelSchedule, PeriodicTask]) -> None:
+    # notify beat once the transaction is committed
+    if (session := object_session(target)) is not None:
+        session.info[SCHEDULE_CHANGED] = True
+
+
+def _notify() -> None:
+    assert notifier is not None
+    try:
+        notifier.notify()
+    except Exception as exc:
+        # beat still picks the change up on its next check
+        logger.warning("Failed to notify schedule change: %r", exc)
+
+
+def notify_changed(session: Session) -> None:
+    if session.info.pop(SCHEDULE_CHANGED, False) and notifier is not None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _notify()
+        else:
+            # committed by an AsyncSession, on the event loop
+            loop.run_in_executor(None, _notify)
+
+
+def discard_changed(session: Session) -> None:
+    session.info.pop(SCHEDULE_CHANGED, None)
+
+
+def schedule_listener(action: CHANGE_ACTIONS) -> Listener[ModelSchedule]:
+    def listener(
+        mapper: "Mapper", connection: "Connection", target: ModelSchedule
+    ) -> None:
         update_changed(mapper, connection, target)
+        log_changed(connection, target, action)
+        if action == CHANGE_ACTIONS.UPDATE:
+            reset_next_run_at(connection, target)
+        mark_changed(target)
+
+    return listener
+
+
+def task_listener(action: CHANGE_ACTIONS) -> Listener[PeriodicTask]:
+    def listener(
+        mapper: "Mapper", connection: "Connection", target: PeriodicTask
+    ) -> None:
+        if not target.no_changes:
+            update_changed(mapper, connection, target)
+            log_changed(connection, target, action)
+            if action == CHANGE_ACTIONS.UPDATE:
+                reset_next_run_at(connection, target)
+            mark_changed(target)
+
+    return listener
+
+
+task_listeners = {action: task_listener(action) for action in CHANGE_ACTIONS}
+schedule_listeners = {action: schedule_listener(action) for action in CHANGE_ACTIONS}
 
 
 def listen_db() -> None:
-    listen(PeriodicTask, "after_delete", changed)
-    listen(PeriodicTask, "after_insert", changed)
-    listen(PeriodicTask, "after_update", changed)
-    listen(IntervalSchedule, "after_insert", update_changed)
-    listen(IntervalSchedule, "after_delete", update_changed)
-    listen(IntervalSchedule, "after_update", update_changed)
-    listen(CrontabSchedule, "after_insert", update_changed)
-    listen(CrontabSchedule, "after_delete", update_changed)
-    listen(CrontabSchedule, "after_update", update_changed)
-    listen(ClockedSchedule, "after_insert", update_changed)
-    listen(ClockedSchedule, "after_delete", update_changed)
-    listen(ClockedSchedule, "after_update", update_changed)
+    # Both the API and beat call this, make sure the rows are only logged once.
+    if contains(PeriodicTask, "after_insert", task_listeners[CHANGE_ACTIONS.INSERT]):
+        return
+    for event, action in (
+        ("after_insert", CHANGE_ACTIONS.INSERT),
+        ("after_update", CHANGE_ACTIONS.UPDATE),
+        ("after_delete", CHANGE_ACTIONS.DELETE),
+    ):
+        listen(PeriodicTask, event, task_listeners[action])
+        for model in SCHEDULE_MODELS:
+            listen(model, event, schedule_listeners[action])
+    if notifier is not None:
+        listen(Session, "after_commit", notify_changed)
+        listen(Session, "after_rollback", discard_changed)
@@ -0,0 +1,78 @@
+"""Append-only local journal of beat's run state."""
+import json
+import os
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, List, Optional
+
+RunState = Dict[str, Any]
+
+
+class RunStateJournal:
+    """Run state of the fired entries not written to the database yet.
+
+    One JSON line per fire, flushed to the OS right away so the lines survive
+    a crash of beat.  The journal is rewritten with only the still unsaved
+    states after every sync, and replayed by a restarted scheduler.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[IO[str]] = None
+
+    @property
+    def file(self) -> IO[str]:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    @staticmethod
+    def _dumps(state: RunState) -> str:
+        next_run_at = state.get("next_run_at")
+        return json.dumps(
+            {
+                "id": state["id"],
+                "last_run_at": state["last_run_at"].isoformat(),
+                "total_run_count": state["total_run_count"],
+                "next_run_at": next_run_at and next_run_at.isoformat(),
+            }
+        )
+
+    def append(self, state: RunState) -> None:
+        self.file.write(self._dumps(state) + "\n")
+        self.file.flush()
+
+    def read(self) -> List[RunState]:
+        """Return the latest state of each task in the journal."""
+        states: Dict[int, RunState] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        # torn write of the last line
+                        continue
+                    for field in ("last_run_at", "next_run_at"):
+                        if value := data.get(field):
+                            data[field] = datetime.fromisoformat(value)
+                    data.setdefault("next_run_at", None)
+                    states[data["id"]] = data
+        except FileNotFoundError:
+            pass
+        return list(states.values())
+
+    def rewrite(self, states: Iterable[RunState]) -> None:
+        """Atomically replace the journal content with ``states``."""
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for state in states:
+                f.write(self._dumps(state) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
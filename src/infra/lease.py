@@ -0,0 +1,225 @@
+"""Leases shared by the beat instances through the database."""
+
+import hashlib
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy.orm import Session
+
+from src.infra.repo.repo import beat_lease_repo
+from src.infra.session import SessionLocal
+from src.utils.timezone import utcnow
+
+__all__ = (
+    "DEFAULT_LEASE_TTL",
+    "LeaderLease",
+    "LeaseLost",
+    "PartitionLeases",
+    "default_holder",
+)
+
+DEFAULT_LEASE_TTL = 30  # seconds
+
+LEADER_LEASE = "leader"
+INSTANCE_PREFIX = "instance:"
+PARTITION_PREFIX = "partition:"
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder() -> str:
+    """Name unique to this process, even after a restart with the same pid."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+
+
+class LeaseLost(Exception):
+    """The lease was taken over by another instance."""
+
+
+class LeaderLease:
+    """Leadership among the beat instances sharing the database.
+
+    ``token`` is the fencing token of the current term, None while standing
+    by.  The leader checks it with ``fence`` in the transaction of its
+    writes, so they are rejected once another instance took the lease over.
+    """
+
+    def __init__(
+        self,
+        holder: Optional[str] = None,
+        ttl: float = DEFAULT_LEASE_TTL,
+        name: str = LEADER_LEASE,
+    ) -> None:
+        self.name = name
+        self.holder = holder or default_holder()
+        self.ttl = timedelta(seconds=ttl)
+        self.token: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    def heartbeat(self) -> bool:
+        """Renew or try to take the lease, return whether this is the leader."""
+        with SessionLocal.begin() as session:
+            token = beat_lease_repo.acquire(
+                self.name, self.holder, self.ttl, db=session
+            )
+        if token != self.token:
+            if token is None:
+                logger.warning("Lost the leader lease of term %s", self.token)
+            else:
+                logger.info("Elected leader, term %s", token)
+        self.token = token
+        return token is not None
+
+    def fence(self, db: Session) -> None:
+        """Raise ``LeaseLost`` unless still the leader, as part of ``db``."""
+        if self.token is None or not beat_lease_repo.fence(
+            self.name, self.holder, self.token, self.ttl, db=db
+        ):
+            term, self.token = self.token, None
+            raise LeaseLost(f"Leader lease of term {term} lost")
+
+    def close(self) -> None:
+        """Step down, a standby takes over without waiting for the expiry."""
+        if self.token is None:
+            return
+        self.token = None
+        with SessionLocal.begin() as session:
+            beat_lease_repo.release([self.name], self.holder, db=session)
+
+
+class PartitionLeases:
+    """Hash partitions of the periodic tasks, owned by the beat instances.
+
+    A task belongs to partition ``id % count``.  Every instance keeps a lease
+    named ``instance:<holder>`` alive, the live instances agree on the owner
+    of each partition by rendezvous hashing, so only the partitions of a
+    joining or dead instance move.  A partition is taken over only once its
+    previous owner released it or its lease expired, an instance stops using
+    a partition as soon as it fails to renew the lease.  All the instances
+    must use the same ``count``.
+    """
+
+    def __init__(
+        self,
+        count: int,
+        holder: Optional[str] = None,
+        ttl: float = DEFAULT_LEASE_TTL,
+    ) -> None:
+        if count < 1:
+            raise ValueError(f"Invalid partition count: {count!r}")
+        self.count = count
+        self.holder = holder or default_holder()
+        self.ttl = timedelta(seconds=ttl)
+        self.owned: Set[int] = set()
+
+    @property
+    def instance_lease(self) -> str:
+        return INSTANCE_PREFIX + self.holder
+
+    @staticmethod
+    def partition_lease(partition: int) -> str:
+        return f"{PARTITION_PREFIX}{partition}"
+
+    def partition_of(self, task_id: int) -> int:
+        return task_id % self.count
+
+    def owns(self, task_id: int) -> bool:
+        return task_id % self.count in self.owned
+
+    def fence(self, partitions: Iterable[int], db: Session) -> Set[int]:
+        """Renew the leases of ``partitions`` as part of ``db``, return the held.
+
+        The writes to the other partitions are to be dropped, another instance
+        may own them now.  Those are no longer owned either.
+        """
+        partitions = set(partitions)
+        held = beat_lease_repo.renew(
+            map(self.partition_lease, partitions), self.holder, self.ttl, db=db
+        )
+        lost = {p for p in partitions if self.partition_lease(p) not in held}
+        if lost:
+            logger.warning("Lost the lease of partitions %s", sorted(lost))
+            self.owned -= lost
+        return partitions - lost
+
+    def owner_of(self, partition: int, holders: Iterable[str]) -> Optional[str]:
+        # a real hash, not hash() which differs between processes, nor crc32
+        # which ranks the holders the same way for every partition
+        return max(
+            holders,
+            key=lambda holder: hashlib.blake2b(
+                f"{partition}:{holder}".encode(), digest_size=8
+            ).digest(),
+            default=None,
+        )
+
+    def heartbeat(self) -> Tuple[Set[int], Set[int]]:
+        """Renew the leases and rebalance the partitions.
+
+        Return the newly acquired partitions and the dropped ones: lost to
+        another instance, or to be handed over.  The caller saves the state
+        of the dropped partitions, then ``release`` them.
+        """
+        with SessionLocal.begin() as session:
+            beat_lease_repo.acquire(
+                self.instance_lease, self.holder, self.ttl, db=session
+            )
+            held = beat_lease_repo.renew(
+                map(self.partition_lease, self.owned),
+                self.holder,
+                self.ttl,
+                db=session,
+            )
+            lost = {p for p in self.owned if self.partition_lease(p) not in held}
+            holders = beat_lease_repo.get_holders(INSTANCE_PREFIX, db=session)
+            holders[self.instance_lease] = self.holder
+            wanted = {
+                partition
+                for partition in range(self.count)
+                if self.owner_of(partition, holders.values()) == self.holder
+            }
+            kept = self.owned - lost
+            acquired = {
+                partition
+                for partition in wanted - kept
+                if beat_lease_repo.acquire(
+                    self.partition_lease(partition), self.holder, self.ttl, db=session
+                )
+                is not None
+            }
+            beat_lease_repo.delete_expired(
+                INSTANCE_PREFIX, utcnow() - self.ttl, db=session
+            )
+        dropped = lost | (kept - wanted)
+        self.owned = (kept - dropped) | acquired
+        if lost:
+            logger.warning("Lost the lease of partitions %s", sorted(lost))
+        if acquired or dropped:
+            logger.info(
+                "Partitions acquired: %s, dropped: %s, owned: %d/%d",
+                sorted(acquired),
+                sorted(dropped),
+                len(self.owned),
+                self.count,
+            )
+        return acquired, dropped
+
+    def release(self, partitions: Iterable[int]) -> None:
+        names: List[str] = [self.partition_lease(p) for p in partitions]
+        with SessionLocal.begin() as session:
+            beat_lease_repo.release(names, self.holder, db=session)
+
+    def close(self) -> None:
+        """Leave the group, the other instances take the partitions over."""
+        names = [self.partition_lease(p) for p in self.owned]
+        names.append(self.instance_lease)
+        self.owned = set()
+        with SessionLocal.begin() as session:
+            beat_lease_repo.release(names, self.holder, db=session)
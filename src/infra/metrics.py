@@ -0,0 +1,403 @@
+"""Metrics of beat in the Prometheus text format, served over HTTP."""
+
+import logging
+import os
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from src.libs.histogram import DEFAULT_BUCKETS, Histogram as Buckets
+
+__all__ = (
+    "BeatMetrics",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsServer",
+    "Registry",
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # exposed before the first observation
+            self.labels()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        try:
+            return self._children[key]
+        except KeyError:
+            with self._lock:
+                return self._children.setdefault(key, self._new_child())
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """``(name, formatted labels, value)`` of every sample."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(
+            f"{name}{labels} {_format_value(value)}"
+            for name, labels, value in self.samples()
+        )
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    """A total incremented by the code, or read from ``function`` at every scrape."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self.function is not None:
+            yield self.name, "", self.function()
+            return
+        for key, child in list(self._children.items()):
+            yield self.name, _format_labels(self.labelnames, key), child.value
+
+
+class Gauge(Metric):
+    """A value set by the code, or read from ``function`` at every scrape.
+
+    ``function`` returns the value, or a mapping of label values to values.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Union[float, Dict[Labels, float]]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self.function is None:
+            values = {key: child.value for key, child in list(self._children.items())}
+        elif isinstance(result := self.function(), dict):
+            values = result
+        else:
+            values = {(): result}
+        for key, value in values.items():
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> Buckets:
+        return Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def attach(self, buckets: Buckets, *values: Any) -> None:
+        """Expose a histogram kept by other code."""
+        with self._lock:
+            self._children[tuple(str(value) for value in values)] = buckets
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, child in list(self._children.items()):
+            bounds = [*child.bounds, float("inf")]
+            for bound, count in zip(bounds, child.cumulative()):
+                labels = _format_labels(
+                    (*self.labelnames, "le"), (*key, _format_value(bound))
+                )
+                yield f"{self.name}_bucket", labels, count
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as exc:
+                logger.warning("Failed to collect %s: %r", metric.name, exc)
+        return "\n".join(lines) + "\n"
+
+
+# fast operations, in seconds
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class BeatMetrics(Registry):
+    """The metrics of ``DatabaseScheduler``, the gauges are set by it."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.tick_duration = self.register(
+            Histogram(
+                "beat_tick_duration_seconds",
+                "Time spent in one tick of beat, sleeps excluded.",
+                buckets=FAST_BUCKETS,
+            )
+        )
+        self.due_entries = self.register(
+            Histogram(
+                "beat_due_entries",
+                "Entries fired per wake-up of beat.",
+                buckets=COUNT_BUCKETS,
+            )
+        )
+        self.dispatch_drift = self.register(
+            Histogram(
+                "beat_dispatch_drift_seconds",
+                "Time an entry was fired after it was due.",
+            )
+        )
+        self.dispatched = self.register(
+            Counter("beat_dispatched_total", "Entries fired.")
+        )
+        self.schedule_changed_duration = self.register(
+            Histogram(
+                "beat_schedule_changed_duration_seconds",
+                "Time spent checking the database for schedule changes.",
+                buckets=FAST_BUCKETS,
+            )
+        )
+        self.all_as_schedule_duration = self.register(
+            Histogram(
+                "beat_all_as_schedule_duration_seconds",
+                "Time spent loading the whole schedule.",
+            )
+        )
+        self.sync_duration = self.register(
+            Histogram(
+                "beat_sync_duration_seconds",
+                "Time spent writing the run state.",
+            )
+        )
+        self.sync_batch_size = self.register(
+            Histogram(
+                "beat_sync_batch_size",
+                "Run states written per sync.",
+                buckets=COUNT_BUCKETS,
+            )
+        )
+        self.sync_failures = self.register(
+            Counter("beat_sync_failures_total", "Syncs failed with a database error.")
+        )
+        self.db_statements = self.register(
+            Counter(
+                "beat_db_statements_total",
+                "Statements executed on the database, i.e. round trips.",
+            )
+        )
+        self.db_transactions = self.register(
+            Counter("beat_db_transactions_total", "Database transactions begun.")
+        )
+        self.entries = self.register(
+            Gauge(
+                "beat_entries",
+                "Entries in the in-memory schedule, by schedule type.",
+                ["schedule"],
+            )
+        )
+        self.is_leader = self.register(
+            Gauge("beat_is_leader", "1 while firing, 0 while standing by.")
+        )
+        self.partitions = self.register(
+            Gauge("beat_owned_partitions", "Partitions owned in sharded mode.")
+        )
+        self.publish_latency = self.register(
+            Histogram(
+                "beat_publish_latency_seconds",
+                "Time from firing an entry to publishing its message.",
+            )
+        )
+        self.publish_pending = self.register(
+            Gauge("beat_publish_pending", "Messages waiting to be published.")
+        )
+        self.publish_dropped = self.register(
+            Counter(
+                "beat_publish_dropped_total",
+                "Messages dropped from a full queue or after the last retry.",
+            )
+        )
+        self.publish_requeued = self.register(
+            Counter(
+                "beat_publish_requeued_total",
+                "Dropped messages queued again, their runs are recorded.",
+            )
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry
+
+    def do_GET(self) -> None:
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # the client address of a UNIX socket is empty, and scrapes are noise
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer:
+    """Serves ``registry`` on ``host:port``, or on ``unix:///path``."""
+
+    def __init__(self, address: str, registry: Registry) -> None:
+        self.address = address
+        handler: Type[_Handler] = type(
+            "MetricsHandler", (_Handler,), {"registry": registry}
+        )
+        self._path: Optional[str] = None
+        self._server: socketserver.BaseServer
+        if address.startswith("unix://"):
+            self._path = address.split("unix://", 1)[1]
+            if os.path.exists(self._path):
+                # left over by a previous beat
+                os.unlink(self._path)
+            self._server = _UnixHTTPServer(self._path, handler)
+        else:
+            host, _, port = address.rpartition(":")
+            host = host or "127.0.0.1"
+            self._server = ThreadingHTTPServer((host, int(port)), handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="beat-metrics", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+        logger.info("Serving beat metrics on %s", self.address)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._path is not None and os.path.exists(self._path):
+            os.unlink(self._path)
@@ -0,0 +1,234 @@
+"""Push notification of schedule changes to beat.
+
+The API side calls ``Notifier.notify`` after committing a change to the
+periodic tasks, beat blocks in ``Notifier.wait`` instead of polling the
+``celery_periodic_tasks_change`` table.  Beat calls ``Notifier.listen``
+before reading the schedule, so no change committed after the read is
+missed.
+"""
+import logging
+import os
+import select
+import socket
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import func
+from sqlalchemy import select as sa_select
+
+from src.infra.session import engine
+
+__all__ = (
+    "Notifier",
+    "PostgresNotifier",
+    "RedisNotifier",
+    "SocketNotifier",
+    "create_notifier",
+)
+
+CHANNEL = "celery_periodic_tasks_change"
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier:
+    def notify(self) -> None:
+        raise NotImplementedError
+
+    def listen(self) -> None:
+        """Subscribe to the notifications, if not subscribed yet.
+
+        Connection errors are logged, ``wait`` subscribes again.
+        """
+        raise NotImplementedError
+
+    def wait(self, timeout: float) -> bool:
+        """Block until a change is notified or ``timeout`` seconds passed.
+
+        Return whether the schedule may have changed.  Connection errors
+        return True as well, a notification may have been missed, and so
+        does the first call after subscribing again.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PostgresNotifier(Notifier):
+    """LISTEN/NOTIFY on the Postgres database."""
+
+    def __init__(self, url: str, channel: str = CHANNEL) -> None:
+        # libpq doesn't understand SQLAlchemy's "+driver" suffix
+        _, _, rest = url.partition("://")
+        self.dsn = "postgresql://" + rest
+        self.channel = channel
+        self._conn: Any = None
+
+    def notify(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(sa_select(func.pg_notify(self.channel, "")))
+
+    def _connect(self) -> Any:
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def listen(self) -> None:
+        if self._conn is None:
+            try:
+                self._conn = self._connect()
+            except Exception as exc:
+                logger.warning("Postgres notifier connection error: %r", exc)
+
+    def wait(self, timeout: float) -> bool:
+        if self._conn is None:
+            # the changes of the meantime weren't notified
+            self.listen()
+            return True
+        try:
+            if select.select([self._conn], [], [], timeout) == ([], [], []):
+                return False
+            self._conn.poll()
+            notified = bool(self._conn.notifies)
+            self._conn.notifies.clear()
+            return notified
+        except Exception as exc:
+            logger.warning("Postgres notifier connection error: %r", exc)
+            self.close()
+            return True
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            finally:
+                self._conn = None
+
+
+class RedisNotifier(Notifier):
+    """Redis pub/sub."""
+
+    def __init__(self, url: str, channel: str = CHANNEL) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._pubsub: Any = None
+
+    def notify(self) -> None:
+        self.client.publish(self.channel, b"")
+
+    def listen(self) -> None:
+        if self._pubsub is None:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+            except Exception as exc:
+                logger.warning("Redis notifier connection error: %r", exc)
+                pubsub.close()
+            else:
+                self._pubsub = pubsub
+
+    def wait(self, timeout: float) -> bool:
+        if self._pubsub is None:
+            # the changes of the meantime weren't notified
+            self.listen()
+            return True
+        try:
+            message = self._pubsub.get_message(timeout=timeout)
+            notified = message is not None
+            # drain the notifications that piled up
+            while self._pubsub.get_message(timeout=0) is not None:
+                pass
+            return notified
+        except Exception as exc:
+            logger.warning("Redis notifier connection error: %r", exc)
+            self.close()
+            return True
+
+    def close(self) -> None:
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            finally:
+                self._pubsub = None
+
+
+class SocketNotifier(Notifier):
+    """UNIX datagram sockets in a local directory, e.g. for SQLite.
+
+    Every waiting beat binds its own socket in the directory, ``notify``
+    sends a datagram to all of them.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._sock: Optional[socket.socket] = None
+
+    def notify(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            for sock_path in self.path.glob("*.sock"):
+                try:
+                    sock.sendto(b"", str(sock_path))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # stale socket of a dead process
+                    sock_path.unlink(missing_ok=True)
+                except BlockingIOError:
+                    # the receiver already has notifications pending
+                    pass
+        finally:
+            sock.close()
+
+    def listen(self) -> None:
+        if self._sock is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock_path = self.path / f"beat-{os.getpid()}.sock"
+            sock_path.unlink(missing_ok=True)
+            self._sock.bind(str(sock_path))
+            self._sock.setblocking(False)
+
+    def wait(self, timeout: float) -> bool:
+        if self._sock is None:
+            # the changes of the meantime weren't notified
+            self.listen()
+            return True
+        if not select.select([self._sock], [], [], timeout)[0]:
+            return False
+        try:
+            while True:
+                self._sock.recv(1)
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        if self._sock is not None:
+            sock_path = self._sock.getsockname()
+            self._sock.close()
+            self._sock = None
+            Path(sock_path).unlink(missing_ok=True)
+
+
+def create_notifier(url: Optional[str]) -> Optional[Notifier]:
+    """Notifier for ``url``, None for plain polling.
+
+    ``postgresql://...``, ``redis://...`` or ``unix:///path/to/directory``.
+    """
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme.split("+")[0]
+    if scheme in ("postgresql", "postgres"):
+        return PostgresNotifier(url)
+    if scheme in ("redis", "rediss"):
+        return RedisNotifier(url)
+    if scheme == "unix":
+        return SocketNotifier(urlsplit(url).path)
+    raise ValueError(f"Unsupported schedule notifier url: {url!r}")
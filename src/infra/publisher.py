@@ -0,0 +1,288 @@
+"""Publishing of beat's due tasks from a background thread."""
+
+import heapq
+import logging
+import queue
+import threading
+import time
+from itertools import count
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from celery import Celery
+
+from src.libs.histogram import Histogram
+
+__all__ = ("Message", "Publisher")
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+DEFAULT_RETRY_BACKOFF_MAX = 30  # seconds
+
+# kombu reconnects the pooled connection once, the publisher backs off for
+# longer outages
+RECONNECT_POLICY = {
+    "max_retries": 1,
+    "interval_start": 0,
+    "interval_step": 0,
+    "interval_max": 0,
+}
+
+logger = logging.getLogger(__name__)
+
+
+class Message(NamedTuple):
+    name: str  # of the entry
+    task: str
+    args: Any
+    kwargs: Dict[str, Any]
+    options: Dict[str, Any]
+    # monotonic time of the submission
+    submitted_at: float
+    attempt: int = 0
+
+
+class Publisher:
+    """Publishes the due tasks on a dedicated thread.
+
+    ``submit`` only enqueues, so a slow or unreachable broker doesn't stall
+    beat's tick.  The thread takes up to ``batch_size`` messages at a time
+    and publishes them back to back on one producer of the app's pool.
+    Failed publishes are retried with exponential backoff, up to
+    ``max_retries`` times, while the other messages keep flowing.  The queue
+    is bounded: once the broker is ``maxsize`` messages behind, ``submit``
+    drops the oldest queued message to make room, counted in ``dropped``.
+    The run of a dropped message is already recorded, so the last dropped
+    message of each entry is kept aside and queued again by
+    ``requeue_dropped`` once there is room.
+
+    ``latency`` is the histogram of the time from submission to publication
+    in seconds.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        app: Celery,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        retry_backoff_max: float = DEFAULT_RETRY_BACKOFF_MAX,
+    ) -> None:
+        self.app = app
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.latency = Histogram()
+        self.published = self.retried = self.dropped = self.requeued = 0
+        # by the name of the entry, dropped by both the caller's thread and
+        # the publishing one
+        self._dropped: Dict[str, Message] = {}
+        self._dropped_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        # (monotonic time, sequence, message) of the publishes to retry
+        self._retries: List[Tuple[float, int, Message]] = []
+        self._counter = count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._full = False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries) + len(self._dropped)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="beat-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(
+        self,
+        name: str,
+        task: str,
+        args: Any,
+        kwargs: Dict[str, Any],
+        options: Dict[str, Any],
+    ) -> None:
+        self.start()
+        message = Message(name, task, args, kwargs, options, time.monotonic())
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            if not self._full:
+                logger.warning("Publish queue full, dropping the oldest tasks.")
+                self._full = True
+            self._drop_oldest()
+            self._queue.put_nowait(message)
+        else:
+            self._full = False
+
+    def _drop_oldest(self) -> None:
+        try:
+            oldest = self._queue.get_nowait()
+        except queue.Empty:
+            # taken by the thread in the meantime
+            return
+        self._drop(oldest)
+        logger.debug("Dropped scheduled task %s", oldest.name)
+
+    def _drop(self, message: Message) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+            # an older dropped run of the entry is superseded
+            self._dropped[message.name] = message
+
+    def requeue_dropped(self) -> int:
+        """Queue the dropped messages again, as far as there is room.
+
+        Return how many were queued.
+        """
+        if not self._dropped or self._stopping:
+            return 0
+        room = self._queue.maxsize - self._queue.qsize()
+        with self._dropped_lock:
+            names = list(self._dropped)
+            if self._queue.maxsize > 0:
+                names = names[:room] if room > 0 else []
+            messages = [self._dropped.pop(name) for name in names]
+        requeued = 0
+        for message in messages:
+            try:
+                self._queue.put_nowait(message._replace(attempt=0))
+            except queue.Full:
+                # filled by submit in the meantime, kept for the next time
+                with self._dropped_lock:
+                    self._dropped.setdefault(message.name, message)
+            else:
+                requeued += 1
+        if requeued:
+            self.start()
+            self.requeued += requeued
+            logger.info("Requeued %d dropped scheduled tasks", requeued)
+        return requeued
+
+    def close(self, timeout: float = 10) -> None:
+        """Publish what is queued, waiting at most ``timeout`` seconds."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        # a last chance for the dropped ones
+        self.requeue_dropped()
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            # the broker is still down, what is queued is dropped
+            self._stopping = True
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        if self._thread.is_alive() or self._dropped:
+            logger.warning("Publisher stopped with %d pending messages", self.pending)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "requeued": self.requeued,
+            "pending": self.pending,
+            "latency_p50": self.latency.quantile(0.5),
+            "latency_p99": self.latency.quantile(0.99),
+        }
+
+    def _run(self) -> None:
+        while not self._stopping or self._retries:
+            batch = self._next_batch()
+            if batch:
+                self._publish_batch(batch)
+
+    def _next_batch(self) -> List[Message]:
+        now = time.monotonic()
+        batch: List[Message] = []
+        while self._retries and (self._stopping or self._retries[0][0] <= now):
+            batch.append(heapq.heappop(self._retries)[2])
+        if self._stopping:
+            return batch
+        if batch:
+            timeout: Optional[float] = 0
+        elif self._retries:
+            timeout = self._retries[0][0] - now
+        else:
+            timeout = None
+        try:
+            # block until the next retry is due, forever without retries
+            item = self._queue.get(block=timeout != 0, timeout=timeout)
+            while True:
+                if item is self._STOP:
+                    self._stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        return batch
+
+    def _publish_batch(self, batch: List[Message]) -> None:
+        handled = 0
+        try:
+            with self.app.producer_pool.acquire(block=True) as producer:
+                for message in batch:
+                    try:
+                        self._publish(producer, message)
+                    except Exception as exc:
+                        self._failed(message, exc)
+                    handled += 1
+        except Exception as exc:
+            # no producer, the rest of the batch wasn't published
+            for message in batch[handled:]:
+                self._failed(message, exc)
+
+    def _publish(self, producer: Any, message: Message) -> None:
+        options = dict(message.options, retry=True, retry_policy=RECONNECT_POLICY)
+        if task := self.app.tasks.get(message.task):
+            task.apply_async(message.args, message.kwargs, producer=producer, **options)
+        else:
+            self.app.send_task(
+                message.task,
+                message.args,
+                message.kwargs,
+                producer=producer,
+                **options,
+            )
+        self.published += 1
+        self.latency.observe(time.monotonic() - message.submitted_at)
+
+    def _failed(self, message: Message, exc: Exception) -> None:
+        if self._stopping or message.attempt >= self.max_retries:
+            self._drop(message)
+            logger.error(
+                "Couldn't publish scheduled task %s after %d attempts: %r",
+                message.name,
+                message.attempt + 1,
+                exc,
+            )
+            return
+        delay = min(self.retry_backoff * 2**message.attempt, self.retry_backoff_max)
+        logger.warning(
+            "Couldn't publish scheduled task %s: %r, retrying in %.1fs",
+            message.name,
+            exc,
+            delay,
+        )
+        self.retried += 1
+        heapq.heappush(
+            self._retries,
+            (
+                time.monotonic() + delay,
+                next(self._counter),
+                message._replace(attempt=message.attempt + 1),
+            ),
+        )
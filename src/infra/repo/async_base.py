@@ -0,0 +1,85 @@
+from typing import Any, Generic, Iterable, Optional, Type, Union
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.infra.async_session import get_async_session
+
+from .base import IN_CHUNK_SIZE, CreateSchemaT, ModelT, UpdateSchemaT
+
+
+class AsyncCRUDBase(Generic[ModelT, CreateSchemaT, UpdateSchemaT]):
+    """The ``CRUDBase`` methods the routes use, on an ``AsyncSession``."""
+
+    def __init__(self, model: Type[ModelT]) -> None:
+        self.model = model
+
+    async def count(self, db: AsyncSession) -> int:
+        return (await db.execute(select(func.count(self.model.id)))).scalars().one()
+
+    async def get(self, id: Any, db: AsyncSession = None) -> Optional[ModelT]:
+        return (
+            await get_async_session(db).execute(select(self.model).filter_by(id=id))
+        ).scalar()
+
+    async def get_many(
+        self, ids: Iterable[Any], db: AsyncSession = None
+    ) -> list[ModelT]:
+        """In chunks, for the limit on bound parameters of some databases."""
+        session = get_async_session(db)
+        ids = list(ids)
+        models: list[ModelT] = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            end = start + IN_CHUNK_SIZE
+            stmt = select(self.model).where(self.model.id.in_(ids[start:end]))
+            models.extend((await session.execute(stmt)).scalars())
+        return models
+
+    async def get_multi(
+        self, *, skip: int = 0, limit: int = 100, db: AsyncSession = None
+    ) -> list[ModelT]:
+        return (
+            (
+                await get_async_session(db).execute(
+                    select(self.model)
+                    .order_by(self.model.id.desc())
+                    .offset(skip)
+                    .limit(limit)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    async def create(self, obj_in: CreateSchemaT, db: AsyncSession = None) -> ModelT:
+        return await self._add(self.model(**obj_in.dict()), db=db)
+
+    async def _add(self, db_obj: ModelT, db: AsyncSession = None) -> ModelT:
+        (db := get_async_session(db)).add(db_obj)
+        await db.flush((db_obj,))
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def update(
+        self,
+        db_obj: ModelT,
+        obj_in: Union[UpdateSchemaT, dict[str, Any]],
+        db: AsyncSession = None,
+    ) -> ModelT:
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        return await self._add(db_obj, db=db)
+
+    async def delete(self, id: int, db: AsyncSession = None) -> bool:
+        db_obj = await self.get(id=id, db=(db := get_async_session(db)))
+        if db_obj is None:
+            return False
+        await db.delete(db_obj)
+        return True
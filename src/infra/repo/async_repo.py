@@ -0,0 +1,88 @@
+from typing import Any, Union
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import schemas
+from src.models.models import (
+    ClockedSchedule,
+    CrontabSchedule,
+    IntervalSchedule,
+    PeriodicTask,
+    SolarSchedule,
+)
+
+from .async_base import AsyncCRUDBase
+from .base import UpdateSchemaT
+from .repo import PeriodicTaskRepo
+
+
+class AsyncIntervalScheduleRepo(
+    AsyncCRUDBase[
+        IntervalSchedule, schemas.IntervalScheduleCreate, schemas.IntervalScheduleUpdate
+    ]
+):
+    pass
+
+
+class AsyncClockedScheduleRepo(
+    AsyncCRUDBase[
+        ClockedSchedule,
+        schemas.ClockedScheduleCreate,
+        schemas.ClockedScheduleUpdate,
+    ]
+):
+    pass
+
+
+class AsyncSolarScheduleRepo(
+    AsyncCRUDBase[
+        SolarSchedule,
+        schemas.SolarScheduleCreate,
+        schemas.SolarScheduleUpdate,
+    ]
+):
+    pass
+
+
+class AsyncCrontabScheduleRepo(
+    AsyncCRUDBase[
+        CrontabSchedule, schemas.CrontabScheduleCreate, schemas.CrontabScheduleUpdate
+    ]
+):
+    pass
+
+
+class AsyncPeriodicTaskRepo(
+    AsyncCRUDBase[PeriodicTask, schemas.PeriodicTaskCreate, schemas.PeriodicTaskUpdate]
+):
+    async def create(
+        self, obj_in: schemas.PeriodicTaskCreate, db: AsyncSession = None
+    ) -> PeriodicTask:
+        obj_in_data = obj_in.dict()
+        PeriodicTaskRepo._json2str(obj_in_data)
+        return await self._add(self.model(**obj_in_data), db=db)
+
+    async def update(
+        self,
+        db_obj: PeriodicTask,
+        obj_in: Union[UpdateSchemaT, dict[str, Any]],
+        db: AsyncSession = None,
+    ) -> PeriodicTask:
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        PeriodicTaskRepo._json2str(obj_data)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        return await self._add(db_obj, db=db)
+
+
+async_interval_schedule_repo = AsyncIntervalScheduleRepo(IntervalSchedule)
+async_crontab_schedule_repo = AsyncCrontabScheduleRepo(CrontabSchedule)
+async_clocked_schedule_repo = AsyncClockedScheduleRepo(ClockedSchedule)
+async_solar_schedule_repo = AsyncSolarScheduleRepo(SolarSchedule)
+async_periodic_task_repo = AsyncPeriodicTaskRepo(PeriodicTask)
@@ -1,4 +1,4 @@
-from typing import Any, Generic, Optional, Protocol, Type, TypeVar, Union
+from typing import Any, Generic, Iterable, Optional, Protocol, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
@@ -9,6 +9,9 @@ from src.infra.session import get_session
 
 # XXX For some partial updates, need to validate here.
 
+# ids per IN clause, SQLite allows 32766 bound parameters
+IN_CHUNK_SIZE = 10_000
+
 
 class ModelBase(Protocol):
     id: Any
@@ -31,6 +34,17 @@ class CRUDBase(Generic[ModelT, CreateSchemaT, UpdateSchemaT]):
             (db or get_session()).execute(select(self.model).filter_by(id=id)).scalar()
         )
 
+    def get_many(self, ids: Iterable[Any], db: Session = None) -> list[ModelT]:
+        """In chunks, for the limit on bound parameters of some databases."""
+        session = db or get_session()
+        ids = list(ids)
+        models: list[ModelT] = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            end = start + IN_CHUNK_SIZE
+            stmt = select(self.model).where(self.model.id.in_(ids[start:end]))
+            models.extend(session.execute(stmt).scalars())
+        return models
+
     def get_multi(
         self, *, skip: int = 0, limit: int = 100, db: Session = None
     ) -> list[ModelT]:
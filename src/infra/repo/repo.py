@@ -1,25 +1,40 @@
 import json
-from typing import Any, Optional, Type, Union
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional, Type, Union, cast
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import and_, bindparam, case, delete, func, insert, or_, select, update
+from sqlalchemy.engine import CursorResult, Result
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.session import Session
+from sqlalchemy.sql import Select
 
 from src import schedules, schemas
-from .base import CRUDBase, ModelT, UpdateSchemaT
+from .base import IN_CHUNK_SIZE, CRUDBase, ModelT, UpdateSchemaT
 from src.infra.session import get_session
 from src.models.models import (
+    CHANGE_ACTIONS,
     PERIOD_CHOICES,
+    BeatLease,
     ClockedSchedule,
     CrontabSchedule,
     IntervalSchedule,
     PeriodicTask,
+    PeriodicTaskChangeLog,
+    PeriodicTaskRollup,
+    PeriodicTaskRun,
     PeriodicTasksChange,
     SolarSchedule,
 )
 from src.utils.timezone import utcnow
 
 
+def _rowcount(result: Result) -> int:
+    """Rows matched by an UPDATE or a DELETE, executed by a ``Session``."""
+    return cast(CursorResult, result).rowcount
+
+
 class IntervalScheduleRepo(
     CRUDBase[
         IntervalSchedule, schemas.IntervalScheduleCreate, schemas.IntervalScheduleUpdate
@@ -151,14 +166,173 @@ class PeriodicTaskRepo(
             .scalar()
         )
 
-    def get_enabled(self, db: Session = None) -> list[PeriodicTask]:
-        return (
-            (db or get_session())
-            .execute(
-                select(self.model)
-                .filter_by(enabled=True)
-                .order_by(self.model.id.desc())
+    def get_enabled(
+        self,
+        ids: Iterable[int] = None,
+        since: datetime = None,
+        until: datetime = None,
+        partitions: tuple[int, Iterable[int]] = None,
+        db: Session = None,
+    ) -> list[PeriodicTask]:
+        """Enabled tasks, optionally only the ones due in ``(since, until]``.
+
+        Tasks without a computed ``next_run_at`` are always included.
+        ``partitions`` is ``(count, numbers)``, only the tasks whose id modulo
+        ``count`` is one of ``numbers`` are returned.  ``ids`` are read in
+        chunks, for the limit on bound parameters of some databases.
+        """
+        stmt = select(self.model).filter_by(enabled=True)
+        if partitions is not None:
+            count, numbers = partitions
+            stmt = stmt.where((self.model.id % count).in_(list(numbers)))
+        if since is not None or until is not None:
+            window = []
+            if since is not None:
+                window.append(self.model.next_run_at > since)
+            if until is not None:
+                window.append(self.model.next_run_at <= until)
+            stmt = stmt.where(or_(self.model.next_run_at.is_(None), and_(*window)))
+        stmt = stmt.order_by(self.model.id.desc())
+        session = db or get_session()
+        if ids is None:
+            return session.execute(stmt).scalars().all()
+        # sorted like the rows, so the chunks follow each other
+        ids = sorted(ids, reverse=True)
+        tasks: list[PeriodicTask] = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            end = start + IN_CHUNK_SIZE
+            chunk = stmt.where(self.model.id.in_(ids[start:end]))
+            tasks.extend(session.execute(chunk).scalars())
+        return tasks
+
+    def update_run_states(
+        self, run_states: list[dict[str, Any]], db: Session = None
+    ) -> None:
+        """Write the run state of many tasks with one executemany UPDATE.
+
+        Each item has the task ``id``, ``last_run_at``, ``total_run_count`` and
+        ``next_run_at``.
+        Core statement, so the mapper events don't log it as a change.  Rows
+        with a higher run count in the database are left alone, a replayed or
+        late state never moves the run state backwards.
+        """
+        if not run_states:
+            return
+        table = self.model.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.id == bindparam("_id"),
+                table.c.total_run_count <= bindparam("_total_run_count"),
+            )
+            .values(
+                last_run_at=bindparam("_last_run_at"),
+                total_run_count=bindparam("_total_run_count"),
+                next_run_at=bindparam("_next_run_at"),
             )
+        )
+        (db or get_session()).execute(
+            stmt, [{f"_{k}": v for k, v in state.items()} for state in run_states]
+        )
+
+    def disable(self, ids: Iterable[int], db: Session = None) -> int:
+        """Disable many tasks with one UPDATE, return how many were enabled.
+
+        Core statement, the caller logs the change.
+        """
+        table = self.model.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(list(ids)), table.c.enabled)
+            .values(enabled=False, next_run_at=None)
+        )
+        return _rowcount((db or get_session()).execute(stmt))
+
+    def get_run_states(
+        self, ids: Iterable[int], db: Session = None
+    ) -> list[dict[str, Any]]:
+        """Run state of the tasks, without loading the models.
+
+        In chunks, for the limit on bound parameters of some databases.
+        """
+        table = self.model.__table__
+        columns = select(
+            table.c.id,
+            table.c.last_run_at,
+            table.c.total_run_count,
+            table.c.next_run_at,
+        )
+        session = db or get_session()
+        ids = list(ids)
+        run_states: list[dict[str, Any]] = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            end = start + IN_CHUNK_SIZE
+            stmt = columns.where(table.c.id.in_(ids[start:end]))
+            run_states.extend(dict(row) for row in session.execute(stmt).mappings())
+        return run_states
+
+    def _timings(self) -> Select:
+        """What the fire times of the tasks depend on, without the models."""
+        table = self.model.__table__
+        return select(
+            table.c.id,
+            table.c.name,
+            table.c.task,
+            table.c.queue,
+            table.c.enabled,
+            table.c.one_off,
+            table.c.start_time,
+            table.c.jitter,
+            table.c.last_run_at,
+            table.c.total_run_count,
+            table.c.interval_id,
+            table.c.crontab_id,
+            table.c.clocked_id,
+            table.c.solar_id,
+        )
+
+    def get_timings(
+        self, ids: Iterable[int], db: Session = None
+    ) -> list[dict[str, Any]]:
+        """Timings of the tasks, see ``_timings``.
+
+        In chunks, for the limit on bound parameters of some databases.
+        """
+        table = self.model.__table__
+        columns = self._timings()
+        session = db or get_session()
+        ids = list(ids)
+        timings: list[dict[str, Any]] = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            end = start + IN_CHUNK_SIZE
+            stmt = columns.where(table.c.id.in_(ids[start:end]))
+            timings.extend(dict(row) for row in session.execute(stmt).mappings())
+        return timings
+
+    def get_enabled_timings(self, db: Session = None) -> list[dict[str, Any]]:
+        """Timings of all the enabled tasks, see ``_timings``."""
+        stmt = self._timings().filter_by(enabled=True)
+        return [dict(row) for row in (db or get_session()).execute(stmt).mappings()]
+
+    def get_ids_by_schedules(
+        self, schedule_ids: dict[str, set[int]], db: Session = None
+    ) -> set[int]:
+        """Ids of the tasks using any of the schedules.
+
+        ``schedule_ids`` maps a schedule table name to the schedule ids.
+        """
+        fields = {
+            IntervalSchedule.__tablename__: self.model.interval_id,
+            CrontabSchedule.__tablename__: self.model.crontab_id,
+            ClockedSchedule.__tablename__: self.model.clocked_id,
+            SolarSchedule.__tablename__: self.model.solar_id,
+        }
+        clauses = [fields[table].in_(ids) for table, ids in schedule_ids.items() if ids]
+        if not clauses:
+            return set()
+        return set(
+            (db or get_session())
+            .execute(select(self.model.id).where(or_(*clauses)))
             .scalars()
             .all()
         )
@@ -181,9 +355,296 @@ class PeriodicTasksChangeRepo:
         return db_obj
 
 
+class PeriodicTaskChangeLogRepo:
+    def __init__(self, model: Type[PeriodicTaskChangeLog]) -> None:
+        self.model = model
+
+    def get_last_id(self, db: Session = None) -> int:
+        return get_session(db).execute(select(func.max(self.model.id))).scalar() or 0
+
+    def get_first_id(self, db: Session = None) -> Optional[int]:
+        return get_session(db).execute(select(func.min(self.model.id))).scalar()
+
+    def get_since(self, id: int, db: Session = None) -> list[PeriodicTaskChangeLog]:
+        return (
+            get_session(db)
+            .execute(
+                select(self.model).where(self.model.id > id).order_by(self.model.id)
+            )
+            .scalars()
+            .all()
+        )
+
+    def log(
+        self,
+        table: str,
+        ids: Iterable[int],
+        action: CHANGE_ACTIONS,
+        db: Session = None,
+    ) -> None:
+        """Log a change of many rows, for the changes made by core statements."""
+        changed_at = utcnow()
+        rows = [
+            {
+                "table": table,
+                "object_id": object_id,
+                "action": action.value,
+                "changed_at": changed_at,
+            }
+            for object_id in ids
+        ]
+        if rows:
+            get_session(db).execute(insert(self.model), rows)
+
+    def delete_before(self, changed_at: datetime, db: Session = None) -> int:
+        stmt = delete(self.model).where(self.model.changed_at < changed_at)
+        return _rowcount(get_session(db).execute(stmt))
+
+
+class PeriodicTaskRunRepo:
+    def __init__(self, model: Type[PeriodicTaskRun]) -> None:
+        self.model = model
+
+    def insert_many(self, runs: list[dict[str, Any]], db: Session = None) -> None:
+        if runs:
+            get_session(db).execute(insert(self.model), runs)
+
+    def get_by_task(
+        self,
+        periodic_task_id: int,
+        limit: int = 100,
+        before: Optional[int] = None,
+        db: Session = None,
+    ) -> list[dict[str, Any]]:
+        """Runs of a task newest first, only the ones older than run ``before``.
+
+        The id of the last run of a page is the ``before`` of the next one.
+        """
+        table = self.model.__table__
+        stmt = select(table).where(table.c.periodic_task_id == periodic_task_id)
+        if before is not None:
+            stmt = stmt.where(table.c.id < before)
+        stmt = stmt.order_by(table.c.id.desc()).limit(limit)
+        return [dict(row) for row in get_session(db).execute(stmt).mappings()]
+
+    def delete_before(self, finished_at: datetime, db: Session = None) -> int:
+        stmt = delete(self.model).where(self.model.finished_at < finished_at)
+        return _rowcount(get_session(db).execute(stmt))
+
+
+class PeriodicTaskRollupRepo:
+    """Rollups of the run history, core statements only.
+
+    A rollup is keyed by ``(periodic_task_id, resolution, period_start)``.
+    """
+
+    def __init__(self, model: Type[PeriodicTaskRollup]) -> None:
+        self.model = model
+
+    def get_for_update(
+        self, keys: Iterable[tuple[int, int, datetime]], db: Session = None
+    ) -> dict[tuple[int, int, datetime], dict[str, Any]]:
+        """The existing rollups of ``keys``, locked until the commit."""
+        if not (keys := set(keys)):
+            return {}
+        table = self.model.__table__
+        starts: dict[int, list[datetime]] = defaultdict(list)
+        for _, resolution, period_start in keys:
+            starts[resolution].append(period_start)
+        stmt = (
+            select(table)
+            .where(
+                table.c.periodic_task_id.in_({key[0] for key in keys}),
+                or_(
+                    *(
+                        and_(
+                            table.c.resolution == resolution,
+                            table.c.period_start.between(min(times), max(times)),
+                        )
+                        for resolution, times in starts.items()
+                    )
+                ),
+            )
+            .with_for_update()
+        )
+        rollups = {}
+        for row in get_session(db).execute(stmt).mappings():
+            key = (row["periodic_task_id"], row["resolution"], row["period_start"])
+            if key in keys:
+                rollups[key] = dict(row)
+        return rollups
+
+    def insert_many(self, rollups: list[dict[str, Any]], db: Session = None) -> None:
+        if rollups:
+            get_session(db).execute(insert(self.model), rollups)
+
+    def update_many(self, rollups: list[dict[str, Any]], db: Session = None) -> None:
+        """Write the counters of many rollups by ``id``, one executemany UPDATE."""
+        if not rollups:
+            return
+        table = self.model.__table__
+        columns = [column for column in rollups[0] if column != "id"]
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values({column: bindparam(f"_{column}") for column in columns})
+        )
+        get_session(db).execute(
+            stmt, [{f"_{k}": v for k, v in rollup.items()} for rollup in rollups]
+        )
+
+    def get_since(
+        self,
+        resolution: int,
+        since: datetime,
+        periodic_task_id: Optional[int] = None,
+        db: Session = None,
+    ) -> list[dict[str, Any]]:
+        """The task and counters of the rollups of the periods from ``since``
+        on, of one or all tasks.
+        """
+        table = self.model.__table__
+        keys = ("id", "resolution", "period_start")
+        stmt = select(*(c for c in table.c if c.name not in keys)).where(
+            table.c.resolution == resolution, table.c.period_start >= since
+        )
+        if periodic_task_id is not None:
+            stmt = stmt.where(table.c.periodic_task_id == periodic_task_id)
+        return [dict(row) for row in get_session(db).execute(stmt).mappings()]
+
+    def delete_before(
+        self, resolution: int, period_start: datetime, db: Session = None
+    ) -> int:
+        table = self.model.__table__
+        stmt = delete(table).where(
+            table.c.resolution == resolution, table.c.period_start < period_start
+        )
+        return _rowcount(get_session(db).execute(stmt))
+
+
+class BeatLeaseRepo:
+    """Leases of beat instances, core statements only.
+
+    Lease times come from the clock of the beat instances, which are assumed
+    to be synchronized far better than the lease TTL.
+    """
+
+    def __init__(self, model: Type[BeatLease]) -> None:
+        self.model = model
+
+    def acquire(
+        self, name: str, holder: str, ttl: timedelta, db: Session = None
+    ) -> Optional[int]:
+        """Take or renew the lease, return its token or None if held by another."""
+        session = get_session(db)
+        table = self.model.__table__
+        now = utcnow()
+        stmt = (
+            update(table).where(
+                table.c.name == name,
+                or_(table.c.holder == holder, table.c.expires_at <= now),
+            )
+            # token first, MySQL evaluates the assignments left to right
+            .ordered_values(
+                (
+                    table.c.token,
+                    case(
+                        (table.c.holder == holder, table.c.token),
+                        else_=table.c.token + 1,
+                    ),
+                ),
+                (table.c.holder, holder),
+                (table.c.expires_at, now + ttl),
+            )
+        )
+        if _rowcount(session.execute(stmt)) == 0:
+            if session.execute(select(table.c.name).filter_by(name=name)).first():
+                return None
+            try:
+                with session.begin_nested():
+                    session.execute(
+                        insert(table).values(
+                            name=name, holder=holder, token=1, expires_at=now + ttl
+                        )
+                    )
+            except IntegrityError:
+                # another instance created it first
+                return None
+        return session.execute(select(table.c.token).filter_by(name=name)).scalar()
+
+    def renew(
+        self, names: Iterable[str], holder: str, ttl: timedelta, db: Session = None
+    ) -> set[str]:
+        """Extend the leases still held by ``holder``, return their names."""
+        names = list(names)
+        if not names:
+            return set()
+        session = get_session(db)
+        table = self.model.__table__
+        held = table.c.name.in_(names), table.c.holder == holder
+        session.execute(update(table).where(*held).values(expires_at=utcnow() + ttl))
+        return set(session.execute(select(table.c.name).where(*held)).scalars())
+
+    def fence(
+        self, name: str, holder: str, token: int, ttl: timedelta, db: Session = None
+    ) -> bool:
+        """Renew the lease if still held with ``token``, return whether it is.
+
+        The renewed row stays locked until the end of the transaction, an
+        instance taking the lease over waits for it and sees it renewed.
+        """
+        table = self.model.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.name == name,
+                table.c.holder == holder,
+                table.c.token == token,
+            )
+            .values(expires_at=utcnow() + ttl)
+        )
+        return _rowcount(get_session(db).execute(stmt)) == 1
+
+    def release(self, names: Iterable[str], holder: str, db: Session = None) -> None:
+        """Expire the leases held by ``holder``.
+
+        The rows are kept, the token of a lease keeps increasing across terms.
+        """
+        names = list(names)
+        if not names:
+            return
+        table = self.model.__table__
+        get_session(db).execute(
+            update(table)
+            .where(table.c.name.in_(names), table.c.holder == holder)
+            .values(expires_at=utcnow())
+        )
+
+    def get_holders(self, prefix: str, db: Session = None) -> dict[str, str]:
+        """Holder of each live lease whose name starts with ``prefix``."""
+        table = self.model.__table__
+        stmt = select(table.c.name, table.c.holder).where(
+            table.c.name.startswith(prefix, autoescape=True),
+            table.c.expires_at > utcnow(),
+        )
+        return {name: holder for name, holder in get_session(db).execute(stmt)}
+
+    def delete_expired(self, prefix: str, before: datetime, db: Session = None) -> int:
+        table = self.model.__table__
+        stmt = delete(table).where(
+            table.c.name.startswith(prefix, autoescape=True),
+            table.c.expires_at < before,
+        )
+        return _rowcount(get_session(db).execute(stmt))
+
+
 interval_schedule_repo = IntervalScheduleRepo(IntervalSchedule)
 crontab_schedule_repo = CrontabScheduleRepo(CrontabSchedule)
 clocked_schedule_repo = ClockedScheduleRepo(ClockedSchedule)
 solar_schedule_repo = SolarScheduleRepo(SolarSchedule)
 periodic_tasks_change_repo = PeriodicTasksChangeRepo(PeriodicTasksChange)
 periodic_task_repo = PeriodicTaskRepo(PeriodicTask)
+periodic_task_change_log_repo = PeriodicTaskChangeLogRepo(PeriodicTaskChangeLog)
+periodic_task_run_repo = PeriodicTaskRunRepo(PeriodicTaskRun)
+periodic_task_rollup_repo = PeriodicTaskRollupRepo(PeriodicTaskRollup)
+beat_lease_repo = BeatLeaseRepo(BeatLease)
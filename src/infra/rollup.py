@@ -0,0 +1,236 @@
+"""Rollups of the run history, the stats of the periodic tasks over windows.
+
+Every batch of finished runs is summed per task and period, at the
+resolution of each window, and added to the rollups of those periods in the
+transaction of the batch.  A rollup holds the outcome counters and compact
+histograms of the runtime and of the dispatch lag, from the publish by beat
+to the start.  The stats of a window sum the rollups of the periods it
+overlaps, at most ``length / resolution + 1`` per task however many runs
+there were.  A window so starts at the beginning of a period: the last hour,
+in periods of 5 minutes, spans 60 to 65 minutes.
+"""
+import bisect
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from celery import states
+from sqlalchemy.orm import Session
+
+from src.infra.repo.repo import periodic_task_rollup_repo
+from src.libs.histogram import log_linear_bounds, quantiles
+from src.utils.timezone import utcnow
+
+__all__ = ("WINDOWS", "add_runs", "get_stats", "get_task_stats", "prune_rollups")
+
+# seconds, 1 ms to a day and more, changing them invalidates the rollups
+BUCKETS = log_linear_bounds(-3, 5, steps=18)
+COUNTS_DTYPE = np.dtype("<i4")
+# name: length, resolution in seconds
+WINDOWS: Dict[str, Tuple[timedelta, int]] = {
+    "hour": (timedelta(hours=1), 5 * 60),
+    "day": (timedelta(days=1), 2 * 60 * 60),
+    "week": (timedelta(weeks=1), 24 * 60 * 60),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+Key = Tuple[int, int, datetime]
+
+
+def period_start(when: datetime, resolution: int) -> datetime:
+    timestamp = when.timestamp()
+    return datetime.fromtimestamp(timestamp - timestamp % resolution, timezone.utc)
+
+
+class Rollup:
+    """Counters of runs, summed."""
+
+    __slots__ = (
+        "runs",
+        "successes",
+        "failures",
+        "runtime_sum",
+        "runtime_counts",
+        "lag_sum",
+        "lag_counts",
+    )
+
+    def __init__(self) -> None:
+        self.runs = self.successes = self.failures = 0
+        self.runtime_sum = self.lag_sum = 0.0
+        self.runtime_counts = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+        self.lag_counts = np.zeros(len(BUCKETS) + 1, dtype=np.int64)
+
+    def add(self, run: Mapping[str, Any]) -> None:
+        """Add a run, a row of the run history."""
+        self.runs += 1
+        self.successes += run["state"] == states.SUCCESS
+        self.failures += run["state"] == states.FAILURE
+        self.runtime_sum += run["runtime"]
+        self.runtime_counts[bisect.bisect_left(BUCKETS, run["runtime"])] += 1
+        if run["published_at"] is not None:
+            lag = (run["started_at"] - run["published_at"]).total_seconds()
+            self.lag_sum += lag
+            self.lag_counts[bisect.bisect_left(BUCKETS, lag)] += 1
+
+    def merge(self, other: "Rollup") -> None:
+        self.runs += other.runs
+        self.successes += other.successes
+        self.failures += other.failures
+        self.runtime_sum += other.runtime_sum
+        self.runtime_counts += other.runtime_counts
+        self.lag_sum += other.lag_sum
+        self.lag_counts += other.lag_counts
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Rollup":
+        rollup = cls()
+        for field in ("runs", "successes", "failures", "runtime_sum", "lag_sum"):
+            setattr(rollup, field, row[field])
+        rollup.runtime_counts = _unpack(row["runtime_counts"])
+        rollup.lag_counts = _unpack(row["lag_counts"])
+        return rollup
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "successes": self.successes,
+            "failures": self.failures,
+            "runtime_sum": self.runtime_sum,
+            "runtime_counts": self.runtime_counts.astype(COUNTS_DTYPE).tobytes(),
+            "lag_sum": self.lag_sum,
+            "lag_counts": self.lag_counts.astype(COUNTS_DTYPE).tobytes(),
+        }
+
+
+def _unpack(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, COUNTS_DTYPE).astype(np.int64)
+
+
+def add_runs(runs: Sequence[Mapping[str, Any]], db: Session = None) -> None:
+    """Add finished runs, rows of the run history, to their rollups.
+
+    The rollups are locked until the commit, so concurrent batches don't
+    lose each other's counts.
+    """
+    rollups: Dict[Key, Rollup] = defaultdict(Rollup)
+    for run in runs:
+        for _, resolution in WINDOWS.values():
+            start = period_start(run["finished_at"], resolution)
+            rollups[run["periodic_task_id"], resolution, start].add(run)
+    existing = periodic_task_rollup_repo.get_for_update(rollups, db=db)
+    inserts, updates = [], []
+    for key, rollup in rollups.items():
+        if (row := existing.get(key)) is not None:
+            rollup.merge(Rollup.from_row(row))
+            updates.append({"id": row["id"], **rollup.to_row()})
+        else:
+            periodic_task_id, resolution, start = key
+            inserts.append(
+                {
+                    "periodic_task_id": periodic_task_id,
+                    "resolution": resolution,
+                    "period_start": start,
+                    **rollup.to_row(),
+                }
+            )
+    periodic_task_rollup_repo.update_many(updates, db=db)
+    periodic_task_rollup_repo.insert_many(inserts, db=db)
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def summarize(rows: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Stats per task of rollups, computed on arrays of all the tasks."""
+    if not rows:
+        return []
+    ids = np.array([row["periodic_task_id"] for row in rows])
+    order = np.argsort(ids, kind="stable")
+    firsts = np.flatnonzero(np.diff(ids[order], prepend=-1))
+
+    def total(column: str) -> np.ndarray:
+        values = np.array([row[column] for row in rows], dtype=float)
+        return np.add.reduceat(values[order], firsts)
+
+    def counts(column: str) -> np.ndarray:
+        packed = b"".join(row[column] for row in rows)
+        values = np.frombuffer(packed, COUNTS_DTYPE).reshape(len(rows), -1)
+        return np.add.reduceat(values[order].astype(np.int64), firsts)
+
+    runs, successes, failures = total("runs"), total("successes"), total("failures")
+    runtime_counts, lag_counts = counts("runtime_counts"), counts("lag_counts")
+    runtime_quantiles = quantiles(BUCKETS, runtime_counts, QUANTILES)
+    lag_quantiles = quantiles(BUCKETS, lag_counts, QUANTILES)
+    lags = lag_counts.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        success_rates = successes / runs
+        runtime_means = total("runtime_sum") / runs
+        lag_means = total("lag_sum") / lags
+    return [
+        {
+            "id": int(id),
+            "runs": int(runs[i]),
+            "successes": int(successes[i]),
+            "failures": int(failures[i]),
+            "success_rate": _optional(success_rates[i]),
+            "runtime_mean": _optional(runtime_means[i]),
+            **{
+                f"runtime_p{round(q * 100)}": _optional(runtime_quantiles[i, j])
+                for j, q in enumerate(QUANTILES)
+            },
+            "lag_mean": _optional(lag_means[i]),
+            **{
+                f"lag_p{round(q * 100)}": _optional(lag_quantiles[i, j])
+                for j, q in enumerate(QUANTILES)
+            },
+        }
+        for i, id in enumerate(ids[order][firsts])
+    ]
+
+
+def _empty_stats(periodic_task_id: int) -> Dict[str, Any]:
+    stats: Dict[str, Any] = dict.fromkeys(
+        ["success_rate", "runtime_mean", "lag_mean"]
+        + [f"runtime_p{round(q * 100)}" for q in QUANTILES]
+        + [f"lag_p{round(q * 100)}" for q in QUANTILES]
+    )
+    return {"id": periodic_task_id, "runs": 0, "successes": 0, "failures": 0, **stats}
+
+
+def get_stats(
+    window: str,
+    periodic_task_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+    db: Session = None,
+) -> List[Dict[str, Any]]:
+    """Stats over ``window`` of one task, or of all the tasks that ran."""
+    length, resolution = WINDOWS[window]
+    since = period_start((now or utcnow()) - length, resolution)
+    return summarize(
+        periodic_task_rollup_repo.get_since(resolution, since, periodic_task_id, db=db)
+    )
+
+
+def get_task_stats(
+    periodic_task_id: int, now: Optional[datetime] = None, db: Session = None
+) -> Dict[str, Dict[str, Any]]:
+    """Stats of a task over every window, with no runs if it didn't run."""
+    result = {}
+    for window in WINDOWS:
+        stats = get_stats(window, periodic_task_id, now, db=db)
+        result[window] = stats[0] if stats else _empty_stats(periodic_task_id)
+    return result
+
+
+def prune_rollups(now: Optional[datetime] = None, db: Session = None) -> int:
+    """Delete the rollups out of every window, returns how many."""
+    now = now or utcnow()
+    return sum(
+        periodic_task_rollup_repo.delete_before(
+            resolution, period_start(now - length, resolution), db=db
+        )
+        for length, resolution in WINDOWS.values()
+    )
@@ -0,0 +1,186 @@
+"""History of the runs of the periodic tasks, recorded from Celery signals.
+
+Beat tags the messages of the periodic tasks with ``PERIODIC_TASK_HEADER``,
+the id of the task.  In the publishing process, ``before_task_publish``
+adds the publish time.  In the worker, ``task_prerun`` notes the start and
+``task_postrun`` completes the run, which waits in a ``RunHistoryBuffer``
+until it is bulk inserted, and added to the rollups of ``src.infra.rollup``
+in the same transaction.  The rows are only inserted, once, when the run
+finishes, so the processes never update each other's rows.  A run stopped
+before ``task_postrun``, e.g. by a hard time limit, isn't recorded.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from celery import Celery, signals
+
+from src.infra.repo.repo import periodic_task_run_repo
+from src.infra.rollup import add_runs
+from src.infra.session import SessionLocal
+from src.utils.timezone import utcnow
+
+__all__ = ("PERIODIC_TASK_HEADER", "RunHistoryBuffer", "install")
+
+PERIODIC_TASK_HEADER = "periodic_task_id"
+PUBLISHED_HEADER = "periodic_task_published_at"
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 5  # seconds
+# runs kept while the database is unreachable, the newer ones are dropped
+DEFAULT_MAX_BUFFERED = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+class RunHistoryBuffer:
+    """Finished runs, bulk inserted from a background thread.
+
+    The thread inserts every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` runs are waiting.  Failed inserts are retried with the
+    next batch.  Every process has its own thread, started by the first
+    ``add`` after a fork.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_buffered: int = DEFAULT_MAX_BUFFERED,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.inserted = self.dropped = 0
+        self._pid: Optional[int] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        # a forked child gets neither the parent's thread nor its runs
+        self._runs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._runs)
+
+    def start(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._reset()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="run-history", daemon=True
+            )
+            self._thread.start()
+
+    def add(self, run: Dict[str, Any]) -> None:
+        self.start()
+        with self._lock:
+            if len(self._runs) >= self.max_buffered:
+                self.dropped += 1
+                return
+            self._runs.append(run)
+            full = len(self._runs) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Insert the waiting runs, returns how many."""
+        with self._lock:
+            runs, self._runs = self._runs, []
+        if not runs:
+            return 0
+        try:
+            with SessionLocal.begin() as session:
+                periodic_task_run_repo.insert_many(runs, db=session)
+                add_runs(runs, db=session)
+        except Exception as exc:
+            logger.warning("Run history insert of %d runs failed: %r", len(runs), exc)
+            with self._lock:
+                room = max(self.max_buffered - len(self._runs), 0)
+                self._runs[:0] = runs[:room]
+                self.dropped += max(len(runs) - room, 0)
+            return 0
+        self.inserted += len(runs)
+        return len(runs)
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the thread and insert what is waiting."""
+        if self._thread is not None and self._pid == os.getpid():
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+buffer = RunHistoryBuffer()
+# task id -> start time and perf_counter() of the runs in progress
+_started: Dict[str, Tuple[datetime, float]] = {}
+
+
+def on_before_task_publish(headers: Dict[str, Any] = None, **kwargs: Any) -> None:
+    if headers is not None and PERIODIC_TASK_HEADER in headers:
+        headers[PUBLISHED_HEADER] = utcnow().timestamp()
+
+
+def on_task_prerun(task_id: str, task: Any, **kwargs: Any) -> None:
+    if getattr(task.request, PERIODIC_TASK_HEADER, None) is not None:
+        _started[task_id] = (utcnow(), time.perf_counter())
+
+
+def on_task_postrun(task_id: str, task: Any, state: str = None, **kwargs: Any) -> None:
+    if (start := _started.pop(task_id, None)) is None:
+        return
+    started_at, started = start
+    published = getattr(task.request, PUBLISHED_HEADER, None)
+    buffer.add(
+        {
+            "periodic_task_id": getattr(task.request, PERIODIC_TASK_HEADER),
+            "task_id": task_id,
+            "worker": task.request.hostname,
+            "state": state or "",
+            "published_at": (
+                None
+                if published is None
+                else datetime.fromtimestamp(published, timezone.utc)
+            ),
+            "started_at": started_at,
+            "finished_at": utcnow(),
+            "runtime": time.perf_counter() - started,
+        }
+    )
+
+
+def on_shutdown(**kwargs: Any) -> None:
+    buffer.close()
+
+
+def install(app: Celery) -> None:
+    """Record the runs of the periodic tasks, in every process of ``app``."""
+    buffer.batch_size = (
+        app.conf.get("beat_run_history_batch_size") or DEFAULT_BATCH_SIZE
+    )
+    buffer.flush_interval = (
+        app.conf.get("beat_run_history_flush_interval") or DEFAULT_FLUSH_INTERVAL
+    )
+    signals.before_task_publish.connect(on_before_task_publish, weak=False)
+    signals.task_prerun.connect(on_task_prerun, weak=False)
+    signals.task_postrun.connect(on_task_postrun, weak=False)
+    # prefork children, then the main process of the other pools
+    signals.worker_process_shutdown.connect(on_shutdown, weak=False)
+    signals.worker_shutdown.connect(on_shutdown, weak=False)
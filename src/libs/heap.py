@@ -0,0 +1,62 @@
+import heapq
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Event = Tuple[float, int, str]
+
+
+class ScheduleHeap:
+    """Binary heap of ``(time, name)`` events, one per name.
+
+    Unlike a plain ``heapq`` list it supports targeted ``push`` (insert or
+    reschedule) and ``remove`` by name in O(log N).  Removed and rescheduled
+    events are dropped lazily when they reach the top, the heap is compacted
+    once the stale events outnumber the live ones.
+    """
+
+    def __init__(self, events: Iterable[Tuple[float, str]] = ()) -> None:
+        self._counter = count()
+        self._events: Dict[str, Event] = {}
+        for when, name in events:
+            self._events[name] = (when, next(self._counter), name)
+        self._heap: List[Event] = list(self._events.values())
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._events
+
+    def when(self, name: str) -> Optional[float]:
+        event = self._events.get(name)
+        return None if event is None else event[0]
+
+    def push(self, name: str, when: float) -> None:
+        """Insert ``name`` at ``when``, or move it there if already present."""
+        event = (when, next(self._counter), name)
+        self._events[name] = event
+        heapq.heappush(self._heap, event)
+        self._maybe_compact()
+
+    def remove(self, name: str) -> None:
+        if self._events.pop(name, None) is not None:
+            self._maybe_compact()
+
+    def peek(self) -> Optional[Tuple[float, str]]:
+        """The earliest event, without removing it."""
+        heap = self._heap
+        while heap and self._events.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+        return (heap[0][0], heap[0][2]) if heap else None
+
+    def pop(self) -> Optional[Tuple[float, str]]:
+        if (event := self.peek()) is not None:
+            heapq.heappop(self._heap)
+            del self._events[event[1]]
+        return event
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 2 * len(self._events) + 64:
+            self._heap = list(self._events.values())
+            heapq.heapify(self._heap)
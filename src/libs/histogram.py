@@ -0,0 +1,96 @@
+import bisect
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# seconds, Prometheus' default buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def log_linear_bounds(low: int, high: int, steps: int = 9) -> Tuple[float, ...]:
+    """``steps`` linear bounds per power of ten from ``10**low`` to ``10**high``.
+
+    With 9 steps, 1 to 9 times every power of ten, the buckets are 11% to
+    100% wide, with 18 steps, 1 to 9.5 by 0.5, 5% to 50% wide.
+    """
+    mantissas = [1 + 9 * step / steps for step in range(steps)]
+    return tuple(
+        float(f"{m!r}e{e}") for e in range(low, high) for m in mantissas
+    ) + (float(f"1e{high}"),)
+
+
+def quantiles(
+    bounds: Sequence[float], counts: np.ndarray, qs: Sequence[float]
+) -> np.ndarray:
+    """``Histogram.quantile`` of every row of ``counts``, ``(rows, len(qs))``.
+
+    ``counts`` are bucket counts like ``Histogram.counts``, NaN for the rows
+    without values.
+    """
+    edges = np.asarray(bounds, dtype=float)
+    # the values above all the bounds are reported as the last bound
+    upper = np.append(edges, edges[-1])
+    lower = np.concatenate([[0.0], edges])
+    cumulative = counts.cumsum(axis=1)
+    total = cumulative[:, -1]
+    rows = np.arange(len(counts))
+    result = np.full((len(counts), len(qs)), np.nan)
+    for j, q in enumerate(qs):
+        rank = q * total
+        index = np.minimum((cumulative < rank[:, None]).sum(axis=1), len(bounds))
+        below = np.where(index > 0, cumulative[rows, index - 1], 0)
+        count = np.maximum(counts[rows, index], 1)
+        width = upper[index] - lower[index]
+        values = lower[index] + width * (rank - below) / count
+        values[index == len(bounds)] = bounds[-1]
+        result[:, j] = np.where(total > 0, values, np.nan)
+    return result
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, plus their sum.
+
+    ``counts[i]`` is the number of values ``<= bounds[i]``, not cumulative,
+    the last count is for the values above all the bounds.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(sorted(bounds))
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[int]:
+        """Number of values ``<=`` each bound, then the total."""
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate, interpolated within the bucket, None without values."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        below = 0
+        for i, count in enumerate(self.counts):
+            if count and below + count >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1] if self.bounds else None
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - below) / count
+            below += count
+        return self.bounds[-1] if self.bounds else None
+
+    def merge(self, other: "Histogram") -> None:
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
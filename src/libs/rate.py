@@ -0,0 +1,43 @@
+import math
+import time
+from typing import List, Optional
+
+
+class RateCounter:
+    """Events per second over the last ``window`` seconds.
+
+    A ring of one-second buckets, ``add`` and the queries are O(1) and
+    O(window).
+    """
+
+    def __init__(self, window: int = 60) -> None:
+        self.window = window
+        self.total = 0
+        self._buckets: List[int] = [0] * window
+        self._second: Optional[int] = None
+
+    def _advance(self, now: Optional[float]) -> int:
+        second = math.floor(time.monotonic() if now is None else now)
+        if self._second is None:
+            self._second = second
+        elif second > self._second:
+            start = max(self._second + 1, second - self.window + 1)
+            for passed in range(start, second + 1):
+                self._buckets[passed % self.window] = 0
+            self._second = second
+        return second
+
+    def add(self, n: int = 1, now: Optional[float] = None) -> None:
+        second = self._advance(now)
+        self._buckets[second % self.window] += n
+        self.total += n
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Average per second over the window."""
+        self._advance(now)
+        return sum(self._buckets) / self.window
+
+    def peak(self, now: Optional[float] = None) -> int:
+        """Most events within one second of the window."""
+        self._advance(now)
+        return max(self._buckets)
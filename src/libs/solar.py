@@ -0,0 +1,84 @@
+"""Vectorized times of solar events, NOAA's approximation of the sun position.
+
+Accurate to about a minute between latitudes 72° N and 72° S, no refraction.
+"""
+import numpy as np
+from numpy.typing import ArrayLike
+
+RISING = -1
+TRANSIT = 0
+SETTING = 1
+
+DAY = 24 * 60 * 60
+# Julian date of the Unix epoch
+EPOCH_JD = 2440587.5
+
+
+def _sun(jd: np.ndarray) -> "tuple[np.ndarray, np.ndarray]":
+    """Declination (radians) and equation of time (minutes) at Julian date ``jd``."""
+    t = (jd - 2451545.0) / 36525.0
+    l0 = np.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+    m = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    center = (
+        np.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + np.sin(2 * m) * (0.019993 - 0.000101 * t)
+        + np.sin(3 * m) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * t)
+    longitude = np.radians(
+        np.degrees(l0) + center - 0.00569 - 0.00478 * np.sin(omega)
+    )
+    seconds = 21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))
+    obliquity = np.radians(
+        23 + (26 + seconds / 60) / 60 + 0.00256 * np.cos(omega)
+    )
+    declination = np.arcsin(np.sin(obliquity) * np.sin(longitude))
+    y = np.tan(obliquity / 2) ** 2
+    equation_of_time = 4 * np.degrees(
+        y * np.sin(2 * l0)
+        - 2 * e * np.sin(m)
+        + 4 * e * y * np.sin(m) * np.cos(2 * l0)
+        - 0.5 * y * y * np.sin(4 * l0)
+        - 1.25 * e * e * np.sin(2 * m)
+    )
+    return declination, equation_of_time
+
+
+def event_times(
+    latitudes: ArrayLike,
+    longitudes: ArrayLike,
+    altitudes: ArrayLike,
+    kinds: ArrayLike,
+    first_day: int,
+    days: int,
+    iterations: int = 2,
+) -> np.ndarray:
+    """Unix timestamps of the events of every observer on every day.
+
+    The observers are given by the 1-d arrays: position in degrees, altitude
+    of the sun's center at the event in degrees, and ``RISING``, ``TRANSIT``
+    or ``SETTING``.  Days are counted from the epoch.  Return an array of
+    shape ``(observers, days)``, NaN where the sun doesn't reach the altitude
+    that day.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))[:, None]
+    lon = np.asarray(longitudes, dtype=float)[:, None]
+    sin_altitude = np.sin(np.radians(np.asarray(altitudes, dtype=float)))[:, None]
+    kind = np.asarray(kinds, dtype=float)[:, None]
+    midnight = (first_day + np.arange(days, dtype=float))[None, :] * DAY
+
+    # start from the local solar noon, then refine at the event time
+    when = midnight + (0.5 - lon / 360) * DAY
+    for _ in range(iterations):
+        declination, equation_of_time = _sun(when / DAY + EPOCH_JD)
+        transit = midnight + (720 - 4 * lon - equation_of_time) * 60
+        with np.errstate(invalid="ignore"):
+            hour_angle = np.arccos(
+                (sin_altitude - np.sin(lat) * np.sin(declination))
+                / (np.cos(lat) * np.cos(declination))
+            )
+        when = transit + kind * np.degrees(hour_angle) * 4 * 60
+        # transits always happen
+        when = np.where(kind == TRANSIT, transit, when)
+    return when
@@ -0,0 +1,8 @@
+import hashlib
+from datetime import timedelta
+
+
+def spread(name: str, seconds: float) -> timedelta:
+    """Offset within ``seconds``, the same for ``name`` in every process."""
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return timedelta(seconds=seconds * int.from_bytes(digest, "big") / 2**64)
@@ -0,0 +1,178 @@
+import heapq
+import math
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .heap import ScheduleHeap
+
+Event = Tuple[float, int, str]
+
+# (slot width in seconds, number of slots) of each level
+LEVELS = ((1, 60), (60, 60), (60 * 60, 24), (24 * 60 * 60, 512))
+
+READY = -1
+OVERFLOW = -2
+
+
+class TimerWheel:
+    """Hierarchical timer wheel of ``(time, name)`` events, one per name.
+
+    Drop-in replacement of ``ScheduleHeap``.  Events are hashed into second,
+    minute, hour and day slots relative to a cursor, which makes ``push`` and
+    ``remove`` O(1).  When the cursor reaches a slot its events cascade down
+    one level, or into a small heap of ready events once their second came,
+    so each event is moved a constant number of times.  Events beyond the
+    last level wait in an overflow heap.
+
+    The cursor is virtual time: ``peek`` moves it forward to the next event,
+    events pushed at or before it go straight to the ready heap.
+    """
+
+    def __init__(self, events: Iterable[Tuple[float, str]] = ()) -> None:
+        self._counter = count()
+        self._events: Dict[str, Event] = {}
+        # name -> level index, READY or OVERFLOW
+        self._levels: Dict[str, int] = {}
+        self._slots: List[List[Dict[str, Event]]] = [
+            [{} for _ in range(size)] for _, size in LEVELS
+        ]
+        self._sizes = [0] * len(LEVELS)
+        self._ready: List[Event] = []
+        self._overflow = ScheduleHeap()
+        self._cursor: Optional[int] = None
+        self._bases: List[int] = []
+        for when, name in events:
+            self.push(name, when)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._events
+
+    def when(self, name: str) -> Optional[float]:
+        event = self._events.get(name)
+        return None if event is None else event[0]
+
+    def push(self, name: str, when: float) -> None:
+        """Insert ``name`` at ``when``, or move it there if already present."""
+        if name in self._events:
+            self.remove(name)
+        event = (when, next(self._counter), name)
+        self._events[name] = event
+        if self._cursor is None:
+            self._move_cursor(math.floor(when) - 1)
+        self._place(event)
+
+    def remove(self, name: str) -> None:
+        event = self._events.pop(name, None)
+        if event is None:
+            return
+        level = self._levels.pop(name)
+        if level >= 0:
+            width, size = LEVELS[level]
+            del self._slots[level][math.floor(event[0]) // width % size][name]
+            self._sizes[level] -= 1
+        elif level == OVERFLOW:
+            self._overflow.remove(name)
+        else:
+            # ready events are dropped lazily, like in ScheduleHeap
+            self._maybe_compact()
+
+    def peek(self) -> Optional[Tuple[float, str]]:
+        """The earliest event, without removing it."""
+        ready = self._ready
+        while True:
+            while ready and self._events.get(ready[0][2]) is not ready[0]:
+                heapq.heappop(ready)
+            if ready:
+                return ready[0][0], ready[0][2]
+            if not self._advance():
+                return None
+
+    def pop(self) -> Optional[Tuple[float, str]]:
+        if (event := self.peek()) is not None:
+            heapq.heappop(self._ready)
+            del self._events[event[1]]
+            del self._levels[event[1]]
+        return event
+
+    def _move_cursor(self, cursor: int) -> None:
+        self._cursor = cursor
+        # slot number of the cursor in each level
+        self._bases = [cursor // width for width, _ in LEVELS]
+
+    def _place(self, event: Event) -> None:
+        when, _, name = event
+        tick = math.floor(when)
+        if tick <= self._bases[0]:
+            self._levels[name] = READY
+            heapq.heappush(self._ready, event)
+            return
+        for level, (width, size) in enumerate(LEVELS):
+            slot = tick // width
+            if slot - self._bases[level] < size:
+                self._levels[name] = level
+                self._slots[level][slot % size][name] = event
+                self._sizes[level] += 1
+                return
+        self._levels[name] = OVERFLOW
+        self._overflow.push(name, when)
+
+    def _cascade(self, level: int) -> None:
+        """Move the events of the slot the cursor entered one level down."""
+        assert self._cursor is not None
+        width, size = LEVELS[level]
+        slot = self._slots[level][self._cursor // width % size]
+        if not slot:
+            return
+        events = list(slot.values())
+        slot.clear()
+        self._sizes[level] -= len(events)
+        for event in events:
+            self._place(event)
+
+    def _advance(self) -> bool:
+        """Move the cursor to the next slot with events, False if there is none."""
+        if self._cursor is None:
+            return False
+        day = LEVELS[-1][0]
+        while not self._ready:
+            # skip to the next slot of the lowest level with events
+            for level, (width, _) in enumerate(LEVELS):
+                if self._sizes[level]:
+                    self._move_cursor((self._cursor // width + 1) * width)
+                    break
+            else:
+                event = self._overflow.peek()
+                if event is None:
+                    return False
+                # first day the event fits into the last level
+                first_day = math.floor(event[0]) // day - LEVELS[-1][1] + 1
+                self._move_cursor(max(first_day, self._cursor // day + 1) * day)
+            if self._cursor % day == 0:
+                self._pull_overflow()
+            for level in range(len(LEVELS) - 1, 0, -1):
+                if self._cursor % LEVELS[level][0] == 0:
+                    self._cascade(level)
+            self._cascade(0)
+        return True
+
+    def _pull_overflow(self) -> None:
+        assert self._cursor is not None
+        day, size = LEVELS[-1]
+        while (event := self._overflow.peek()) is not None:
+            when, name = event
+            if math.floor(when) // day - self._cursor // day >= size:
+                break
+            self._overflow.pop()
+            self._place(self._events[name])
+
+    def _maybe_compact(self) -> None:
+        if len(self._ready) > 2 * len(self._events) + 64:
+            self._ready = [
+                event
+                for name, event in self._events.items()
+                if self._levels[name] == READY
+            ]
+            heapq.heapify(self._ready)
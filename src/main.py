@@ -3,11 +3,11 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.router import router
 from src.infra.db_listen import listen_db
-from src.infra.session import DBSessionMiddleware
+from src.infra.async_session import AsyncDBSessionMiddleware, async_engine
 
 app = FastAPI(title="My Tasks")
 
-app.add_middleware(DBSessionMiddleware)
+app.add_middleware(AsyncDBSessionMiddleware)
 listen_db()
 
 origins = [
@@ -25,3 +25,9 @@ app.add_middleware(
 )
 
 app.include_router(router)
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine() -> None:
+    # the pooled aiosqlite connections hold threads that keep the process up
+    await async_engine.dispose()
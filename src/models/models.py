@@ -1,5 +1,6 @@
 import enum
 from datetime import timedelta
+from decimal import Decimal
 from typing import Any, Optional, Union
 
 import pytz
@@ -7,8 +8,11 @@ from sqlalchemy import (
     Boolean,
     Column,
     Enum,
+    Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -16,7 +20,6 @@ from sqlalchemy import (
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql.sqltypes import Interval
 
 from src import schedules
 from src.libs.sa.timezone import TZDateTime
@@ -57,6 +60,11 @@ class IntervalSchedule(Base):
 
     @property
     def schedule(self) -> schedules.schedule:
+        return schedules.schedule_cache.get(
+            (self.__tablename__, self.id, self.every, self.period), self._schedule
+        )
+
+    def _schedule(self) -> schedules.schedule:
         return schedules.schedule(timedelta(**{self.period: self.every}), nowfun=utcnow)
 
     def __str__(self) -> str:
@@ -106,6 +114,19 @@ class CrontabSchedule(Base):
 
     @property
     def schedule(self) -> schedules.tz_crontab:
+        key = (
+            self.__tablename__,
+            self.id,
+            self.minute,
+            self.hour,
+            self.day_of_week,
+            self.day_of_month,
+            self.month_of_year,
+            self.timezone,
+        )
+        return schedules.schedule_cache.get(key, self._schedule)
+
+    def _schedule(self) -> schedules.tz_crontab:
         # enable tz aware
         return schedules.tz_crontab(
             minute=self.minute,
@@ -154,7 +175,12 @@ class ClockedSchedule(Base):
 
     @property
     def schedule(self) -> schedules.clocked:
-        return schedules.clocked(clocked_time=self.clocked_time)
+        return schedules.schedule_cache.get(
+            (self.__tablename__, self.id, self.clocked_time), self._schedule
+        )
+
+    def _schedule(self) -> schedules.clocked:
+        return schedules.clocked(clocked_time=self.clocked_time, nowfun=utcnow)
 
     @classmethod
     def from_celery_schedule(cls, schedule: schedules.clocked) -> "ClockedSchedule":
@@ -169,15 +195,21 @@ class SolarSchedule(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     # event ≤ 24
-    event = Column(String(24), Enum(PERIOD_CHOICES), nullable=False)
+    event: str = Column(String(24), Enum(PERIOD_CHOICES), nullable=False)
     # -90 ≤ latitude ≤ 90
-    latitude = Column(Numeric(precision=9, scale=6), nullable=False)
+    latitude: Decimal = Column(Numeric(precision=9, scale=6), nullable=False)
     # -180 ≤ longitude ≤ 180
-    longitude = Column(Numeric(precision=9, scale=6), nullable=False)
+    longitude: Decimal = Column(Numeric(precision=9, scale=6), nullable=False)
 
     @property
     def schedule(self) -> schedules.solar:
-        return schedules.solar(self.event, self.latitude, self.longitude, nowfun=utcnow)
+        key = (self.__tablename__, self.id, self.event, self.latitude, self.longitude)
+        return schedules.schedule_cache.get(key, self._schedule)
+
+    def _schedule(self) -> schedules.solar:
+        return schedules.precomputed_solar(
+            self.event, self.latitude, self.longitude, nowfun=utcnow
+        )
 
     def __str__(self) -> str:
         return "{0} ({1}, {2})".format(self.event, self.latitude, self.longitude)
@@ -206,14 +238,55 @@ class PeriodicTasksChange(Base):
     last_update = Column(TZDateTime, primary_key=True, nullable=False)
 
 
+class CHANGE_ACTIONS(str, enum.Enum):
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class PeriodicTaskChangeLog(Base):
+    """Per-row change log of periodic tasks and schedules.
+
+    Written next to ``PeriodicTasksChange`` by the same mapper events, one row
+    per inserted/updated/deleted object.  ``id`` is the monotonically increasing
+    sequence the scheduler uses to fetch only the changes it hasn't seen yet.
+    """
+
+    __tablename__ = "celery_periodic_task_change_log"
+
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
+    # table name of the changed row, e.g. "celery_crontab_schedule"
+    table: str = Column(String(63), nullable=False)
+    object_id: int = Column(Integer, nullable=False)
+    action = Column(String(8), Enum(CHANGE_ACTIONS), nullable=False)
+    changed_at = Column(TZDateTime, nullable=False, default=utcnow, index=True)
+
+
+class BeatLease(Base):
+    """Time limited ownership of a named resource by one beat instance.
+
+    A lease is held until ``expires_at`` unless renewed by its holder, any
+    instance may take it over afterwards.  ``token`` is incremented every time
+    the lease changes hands.
+    """
+
+    __tablename__ = "celery_beat_lease"
+
+    # e.g. "partition:3" or "instance:<holder>"
+    name = Column(String(200), primary_key=True)
+    holder = Column(String(200), nullable=False)
+    token = Column(Integer, nullable=False, default=1)
+    expires_at = Column(TZDateTime, nullable=False, index=True)
+
+
 class PeriodicTask(Base):
 
     __tablename__ = "celery_periodic_task"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id: int = Column(Integer, primary_key=True, autoincrement=True)
 
-    name = Column(String(200), unique=True)
-    task = Column(String(200))
+    name: str = Column(String(200), unique=True)
+    task: str = Column(String(200))
 
     interval_id = Column(Integer, ForeignKey(IntervalSchedule.id))
     interval: Optional[IntervalSchedule] = relationship(IntervalSchedule, lazy="joined")
@@ -246,13 +319,17 @@ class PeriodicTask(Base):
     expires = Column(TZDateTime, default=None)
 
     expire_seconds = Column(Integer, default=None)  # 0 ≤ expire_seconds
-    one_off = Column(Boolean, nullable=False, default=False)
+    one_off: bool = Column(Boolean, nullable=False, default=False)
     start_time = Column(TZDateTime, default=None)
-    enabled = Column(Boolean, nullable=False, default=True)
+    # 0 ≤ jitter, seconds the due times are spread over, beat_jitter if NULL
+    jitter = Column(Integer, default=None)
+    enabled: bool = Column(Boolean, nullable=False, default=True)
 
     last_run_at = Column(TZDateTime, default=None)  # non editable
+    # computed by beat, reset to NULL whenever the task or its schedule changes
+    next_run_at = Column(TZDateTime, default=None, index=True)  # non editable
 
-    total_run_count = Column(Integer, nullable=False, default=0)  # non editable
+    total_run_count: int = Column(Integer, nullable=False, default=0)  # non editable
     # Datetime that this PeriodicTask was last modified
     date_changed = Column(TZDateTime, default=utcnow, onupdate=utcnow)  # auto change
     description = Column(Text, nullable=False, default="")
@@ -313,4 +390,61 @@ class PeriodicTask(Base):
         return fmt.format(self)
 
 
-ModelSchedule = Union[Interval, CrontabSchedule, ClockedSchedule, SolarSchedule]
+class PeriodicTaskRun(Base):
+    """One run of a periodic task on a worker.
+
+    Written in batches by ``src.infra.run_history`` when the run finishes,
+    pruned after ``beat_run_history_retention`` days.
+    """
+
+    __tablename__ = "celery_periodic_task_run"
+    __table_args__ = (
+        # the runs of a task, newest first
+        Index("ix_celery_periodic_task_run_periodic_task_id", "periodic_task_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # no foreign key, the runs of a deleted task are kept until pruned
+    periodic_task_id = Column(Integer, nullable=False)
+    task_id = Column(String(255), nullable=False)  # celery's
+    worker = Column(String(255), default=None)  # hostname
+    # celery's, e.g. SUCCESS, FAILURE or RETRY
+    state = Column(String(16), nullable=False)
+    # by beat, NULL if its process doesn't record the run history
+    published_at = Column(TZDateTime, default=None)
+    started_at = Column(TZDateTime, nullable=False)
+    finished_at = Column(TZDateTime, nullable=False, index=True)
+    runtime = Column(Float, nullable=False)  # seconds
+
+
+class PeriodicTaskRollup(Base):
+    """The runs of a periodic task finished in a period, summed.
+
+    Maintained by ``src.infra.rollup`` from the batches of the run history,
+    at the resolution of every stats window.  The histograms are the counts
+    of ``src.infra.rollup.BUCKETS``, packed as little-endian int32.
+    """
+
+    __tablename__ = "celery_periodic_task_rollup"
+    __table_args__ = (
+        UniqueConstraint("periodic_task_id", "resolution", "period_start"),
+        # the rollups of all the tasks over a window
+        Index("ix_celery_periodic_task_rollup_period", "resolution", "period_start"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    periodic_task_id = Column(Integer, nullable=False)
+    resolution = Column(Integer, nullable=False)  # seconds, the period length
+    period_start = Column(TZDateTime, nullable=False)
+    runs = Column(Integer, nullable=False, default=0)
+    successes = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    # seconds
+    runtime_sum = Column(Float, nullable=False, default=0)
+    runtime_counts = Column(LargeBinary, nullable=False)
+    # from the publish by beat to the start, seconds
+    lag_sum = Column(Float, nullable=False, default=0)
+    lag_counts = Column(LargeBinary, nullable=False)
+
+
+ModelSchedule = Union[IntervalSchedule, CrontabSchedule, ClockedSchedule, SolarSchedule]
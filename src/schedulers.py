@@ -1,35 +1,121 @@
 import logging
 import math
-from datetime import datetime
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
 from multiprocessing.util import Finalize
-from typing import Any, Dict, List, Optional, Tuple, Type
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type, Union
 
 from celery import Celery, current_app
-from celery.beat import ScheduleEntry, Scheduler
+from celery.beat import (
+    ScheduleEntry,
+    Scheduler,
+    _evaluate_entry_args,
+    _evaluate_entry_kwargs,
+)
 from celery.utils.log import get_logger
 from celery.utils.time import maybe_make_aware
 from kombu.utils.encoding import safe_repr, safe_str
 from kombu.utils.json import dumps, loads
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
 
 from src import schedules
-from src.infra.db_listen import listen_db
+from src.infra.db_listen import SCHEDULE_CHANGED, listen_db
+from src.infra.journal import RunStateJournal
+from src.infra.lease import (
+    DEFAULT_LEASE_TTL,
+    LeaderLease,
+    LeaseLost,
+    PartitionLeases,
+)
+from src.infra.metrics import BeatMetrics, MetricsServer
+from src.infra.notify import create_notifier
+from src.infra.publisher import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_QUEUE_SIZE,
+    Publisher,
+)
 from src.infra.repo.repo import (
     clocked_schedule_repo,
     crontab_schedule_repo,
     interval_schedule_repo,
+    periodic_task_change_log_repo,
     periodic_task_repo,
+    periodic_task_run_repo,
     periodic_tasks_change_repo,
     solar_schedule_repo,
 )
+from src.infra.rollup import prune_rollups
+from src.infra.run_history import PERIODIC_TASK_HEADER
+from src.config import settings
 from src.infra.session import engine
-from src.models.models import ModelSchedule, PeriodicTask, PeriodicTasksChange
+from src.libs.heap import ScheduleHeap
+from src.libs.rate import RateCounter
+from src.libs.spread import spread
+from src.libs.wheel import TimerWheel
+from src.models.models import (
+    CHANGE_ACTIONS,
+    ModelSchedule,
+    PeriodicTask,
+    PeriodicTasksChange,
+)
 from src.utils import NEVER_CHECK_TIMEOUT
+from src.utils.timezone import monotonic, utcnow
+
+# Changes older than this are pruned, a scheduler that hasn't read the
+# change log for that long reloads the whole schedule.
+CHANGE_LOG_RETENTION = timedelta(days=1)
+
+# Only the entries due within this window are kept in memory, the window
+# slides forward every quarter of it.
+DEFAULT_SCHEDULE_WINDOW = 60 * 60  # seconds
+
+# Runs older than this many days are pruned from the run history, at most
+# once per interval.
+DEFAULT_RUN_HISTORY_RETENTION = 30
+RUN_HISTORY_PRUNE_INTERVAL = 60 * 60  # seconds
+
+# Check the database for external changes at most once per this interval.
+DEFAULT_CHANGE_CHECK_INTERVAL = 1  # seconds
+
+# Maximum number of run states written by one UPDATE statement, a sync is
+# also forced once this many entries have fired since the last one.
+DEFAULT_SYNC_BATCH_SIZE = 1000
 
 # This scheduler must wake up more frequently than the
 # regular of 5 minutes because it needs to take external
 # changes to the schedule into account.
 DEFAULT_MAX_INTERVAL = 5  # seconds
+# Unless the changes are pushed by a notifier, then it sleeps until the next
+# due entry like the regular scheduler.
+NOTIFIED_MAX_INTERVAL = 5 * 60  # seconds
+
+# Standbys check whether the leader lease expired this often.
+STANDBY_POLL_INTERVAL = 1  # seconds
+
+# Engines ordering the entries by due time, selected with beat_engine.  The
+# timer wheel has O(1) push and remove, compare them on your schedule sizes
+# with benchmarks/bench_engines.py.
+Engine = Union[ScheduleHeap, TimerWheel]
+ENGINES: Dict[str, Type[Engine]] = {"heap": ScheduleHeap, "wheel": TimerWheel}
+
+# What to do with the entries overdue by more than beat_misfire_grace_time,
+# after a downtime: fire them once, skip to their next due time, or fire them
+# spread over beat_misfire_spread seconds.
+MISFIRE_FIRE_ONCE = "fire_once"
+MISFIRE_SKIP = "skip"
+MISFIRE_SPREAD = "spread"
+MISFIRE_POLICIES = (MISFIRE_FIRE_ONCE, MISFIRE_SKIP, MISFIRE_SPREAD)
+DEFAULT_MISFIRE_GRACE_TIME = 60  # seconds
+DEFAULT_MISFIRE_SPREAD = 5 * 60  # seconds
+
+# The schedules compute the time remaining on their own clock read, so the
+# next_run_at computed from it moves by the time until the next read.  A saved
+# next_run_at this close to the computed one is up to date.
+NEXT_RUN_AT_TOLERANCE = timedelta(seconds=1)
 
 ADD_ENTRY_ERROR = """\
 Cannot add entry %r to database schedule: %r. Contents: %r
@@ -45,6 +131,66 @@ SessionLocal = sessionmaker(
 )
 
 
+class TimingPolicy(NamedTuple):
+    """Jitter and misfire settings of beat, shared by all the entries."""
+
+    jitter: float
+    misfire_policy: str
+    misfire_grace_time: float
+    misfire_spread: float
+
+    @staticmethod
+    def of(app: Celery) -> "TimingPolicy":
+        """The settings of ``app``, read once by the scheduler."""
+
+        def get(key: str, default: Any) -> Any:
+            # 0 is a valid setting
+            value = app.conf.get(key)
+            return default if value is None else value
+
+        policy = get("beat_misfire_policy", MISFIRE_FIRE_ONCE)
+        if policy not in MISFIRE_POLICIES:
+            raise ValueError(f"Invalid beat_misfire_policy: {policy!r}")
+        return TimingPolicy(
+            jitter=get("beat_jitter", 0),
+            misfire_policy=policy,
+            misfire_grace_time=get(
+                "beat_misfire_grace_time", DEFAULT_MISFIRE_GRACE_TIME
+            ),
+            misfire_spread=get("beat_misfire_spread", DEFAULT_MISFIRE_SPREAD),
+        )
+
+
+class TaskSnapshot:
+    """The fields of a ``PeriodicTask`` beat still reads after loading it.
+
+    Detached from the ORM, so the model, its instance state and its joined
+    schedule rows are freed once the entry is built.
+    """
+
+    __slots__ = (
+        "id",
+        "enabled",
+        "one_off",
+        "start_time",
+        "last_run_at",
+        "next_run_at",
+        "total_run_count",
+    )
+
+    def __init__(self, model_task: PeriodicTask) -> None:
+        self.id: int = model_task.id
+        self.enabled: bool = model_task.enabled
+        self.one_off: bool = model_task.one_off
+        self.start_time: Optional[datetime] = model_task.start_time
+        self.last_run_at: Optional[datetime] = model_task.last_run_at
+        self.next_run_at: Optional[datetime] = model_task.next_run_at
+        self.total_run_count: int = model_task.total_run_count
+
+    def __repr__(self) -> str:
+        return f"<TaskSnapshot: {self.id}>"
+
+
 class ModelEntry(ScheduleEntry):
 
     model_schedules = (
@@ -54,14 +200,21 @@ class ModelEntry(ScheduleEntry):
         (schedules.solar, solar_schedule_repo, "solar_id"),
         (schedules.clocked, clocked_schedule_repo, "clocked_id"),
     )
-    save_fields = ["last_run_at", "total_run_count", "no_changes"]
+    save_fields = ["last_run_at", "total_run_count"]
 
-    def __init__(self, model_task: PeriodicTask, app: Celery = None):
+    def __init__(
+        self,
+        model_task: PeriodicTask,
+        app: Celery = None,
+        timing: Optional[TimingPolicy] = None,
+    ):
         self.app = app or current_app
         self.name = model_task.name
-        self.task = model_task.task
+        # a few task names are shared by many entries
+        self.task = model_task.task and sys.intern(model_task.task)
+        # shared with the other entries of the schedule row
         self.schedule = model_task.schedule
-        self.model = model_task
+        self.model = TaskSnapshot(model_task)
 
         try:
             self.args = loads(model_task.args or "[]")
@@ -72,7 +225,8 @@ class ModelEntry(ScheduleEntry):
                 self.name,
                 exc,
             )
-            self._disable(model_task)
+            self.args, self.kwargs = [], {}
+            self._disable()
 
         self.options = {}
         for option in ("queue", "exchange", "routing_key", "priority"):
@@ -85,19 +239,33 @@ class ModelEntry(ScheduleEntry):
             self.options["expires"] = getattr(model_task, "expires_")
 
         self.options["headers"] = loads(model_task.headers or "{}")
+        # tells the workers which task ran, for the run history
+        self.options["headers"][PERIODIC_TASK_HEADER] = model_task.id
 
         self.total_run_count = model_task.total_run_count
 
-        if not model_task.last_run_at:
-            model_task.last_run_at = self._default_now()
+        if not self.model.last_run_at:
+            # run state only, written by the next sync
+            self.model.last_run_at = self._default_now()
+
+        self.last_run_at = self.model.last_run_at
 
-        self.last_run_at = model_task.last_run_at
+        # Due times are shifted by a stable offset within the jitter window,
+        # so the entries of one crontab don't all fire at the same instant.
+        # Clocked times are kept as they are.
+        self.timing = timing or TimingPolicy.of(self.app)
+        jitter = self.timing.jitter if model_task.jitter is None else model_task.jitter
+        self.offset = timedelta(0)
+        if jitter and not isinstance(self.schedule, schedules.clocked):
+            self.offset = spread(self.name, jitter)
+        # when an overdue entry fires with the spread misfire policy
+        self.misfire_at: Optional[datetime] = None
 
-    def _disable(self, model_task: PeriodicTask) -> None:
+    def _disable(self) -> None:
         # task filed error, don't trigger the change
-        with SessionLocal().begin() as session:
-            session.add(model_task)
-            model_task.disable_error_task()
+        self.model.enabled = False
+        with SessionLocal.begin() as session:
+            periodic_task_repo.disable([self.model.id], db=session)
 
     def is_due(self) -> schedules.schedstate:
         # 供 scheduler.is_due(entry) 调用
@@ -115,36 +283,96 @@ class ModelEntry(ScheduleEntry):
                 delay = math.ceil((self.model.start_time - now).total_seconds())
                 return schedules.schedstate(False, delay)
 
-        # ONE OFF TASK: Disable one off tasks after they've ran once
-        if self.model.one_off and self.model.enabled and self.model.total_run_count > 0:
-            with SessionLocal.begin() as session:
-                # No reset total_run_count, unlike django-celery-count
-                self.model.disable()
-                session.add(self.model)
-            # Don't recheck
+        # ONE OFF TASK: the scheduler disables one off tasks after they've
+        # ran once, don't recheck
+        if self.one_off_done:
             return schedules.schedstate(False, NEVER_CHECK_TIMEOUT)
 
         # CAUTION: make_aware assumes settings.TIME_ZONE for naive datetimes,
         # while maybe_make_aware assumes utc for naive datetimes
         tz = self.app.timezone
         last_run_at_in_tz = maybe_make_aware(self.last_run_at).astimezone(tz)
-        return self.schedule.is_due(last_run_at_in_tz)
+        if not self.offset and self.timing.misfire_policy == MISFIRE_FIRE_ONCE:
+            return self.schedule.is_due(last_run_at_in_tz)
+
+        # The schedule is evaluated on the clock shifted back by the offset.
+        remaining = self._remaining(last_run_at_in_tz).total_seconds()
+        if remaining > 0:
+            return schedules.schedstate(False, remaining)
+        now = maybe_make_aware(self._default_now())
+        if (
+            -remaining > self.timing.misfire_grace_time
+            and not self.model.one_off
+            and self.timing.misfire_policy != MISFIRE_FIRE_ONCE
+        ):
+            if self.timing.misfire_policy == MISFIRE_SKIP:
+                # run state only, not a run
+                self.model.last_run_at = self.last_run_at = now
+                return schedules.schedstate(
+                    False, self._remaining(now).total_seconds()
+                )
+            if self.misfire_at is None:
+                self.misfire_at = now + spread(self.name, self.timing.misfire_spread)
+            if now < self.misfire_at:
+                return schedules.schedstate(
+                    False, (self.misfire_at - now).total_seconds()
+                )
+        return schedules.schedstate(
+            True, max(self._remaining(now).total_seconds(), 0)
+        )
+
+    def _remaining(self, last_run_at: datetime) -> timedelta:
+        """Time until due after ``last_run_at``, shifted by the offset."""
+        remaining = self.schedule.remaining_estimate(last_run_at - self.offset)
+        return remaining + self.offset
 
     def __next__(self, last_run_at: datetime = None) -> "ModelEntry":
-        self.model.last_run_at = last_run_at or self._default_now()
+        # Advance the run state in place, the payload and the schedule are
+        # only decoded when the model changes and a new entry is built.
+        self.model.last_run_at = self.last_run_at = last_run_at or self._default_now()
         self.model.total_run_count += 1
-        self.model.no_changes = True
-        return self.__class__(self.model)
+        self.total_run_count = self.model.total_run_count
+        self.misfire_at = None
+        return self
+
+    next = __next__
+
+    @property
+    def one_off_done(self) -> bool:
+        return self.model.one_off and self.model.total_run_count > 0
+
+    def next_run_at(self) -> Optional[datetime]:
+        """When the entry is due next, None if it will never be."""
+        if self.one_off_done:
+            return None
+        if self.misfire_at is not None:
+            return self.misfire_at
+        tz = self.app.timezone
+        last_run_at_in_tz = maybe_make_aware(self.last_run_at).astimezone(tz)
+        remaining = self._remaining(last_run_at_in_tz)
+        next_run_at = maybe_make_aware(self.default_now()) + remaining
+        if self.model.start_time is not None:
+            next_run_at = max(next_run_at, self.model.start_time)
+        return next_run_at
+
+    def next_run_at_changed(self) -> bool:
+        """Whether the saved ``next_run_at`` is not the one computed now."""
+        next_run_at, saved = self.next_run_at(), self.model.next_run_at
+        if next_run_at is None or saved is None:
+            return next_run_at is not saved
+        return abs(next_run_at - saved) > NEXT_RUN_AT_TOLERANCE
+
+    def run_state(self) -> Dict[str, Any]:
+        state = {field: getattr(self.model, field) for field in self.save_fields}
+        state["id"] = self.model.id
+        state["next_run_at"] = self.next_run_at()
+        return state
 
     def save(self) -> None:
         # Object may not be synchronized, so only
         # change the fields we care about.
         with SessionLocal.begin() as session:
-            # TODO self.sync_fields
-            # FIXME ModelEntry.save
-            for field in self.save_fields:
-                setattr(self.model, field, getattr(self.model, field))
-            session.add(self.model)
+            periodic_task_repo.update_run_states([self.run_state()], db=session)
 
     @classmethod
     def to_model_schedule(
@@ -160,14 +388,18 @@ class ModelEntry(ScheduleEntry):
 
     @classmethod
     def from_entry(
-        cls, name: str, app: Celery = None, **entry_fields: Any
+        cls,
+        name: str,
+        app: Celery = None,
+        timing: Optional[TimingPolicy] = None,
+        **entry_fields: Any
     ) -> "ModelEntry":
         # XXX Sessions connect too frequently
         with SessionLocal.begin() as session:
             model_task = periodic_task_repo.update_or_create(
                 name=name, defaults=cls._unpack_fields(**entry_fields), db=session
             )
-            return cls(model_task, app=app)
+            return cls(model_task, app=app, timing=timing)
 
     @classmethod
     def _unpack_fields(
@@ -227,22 +459,156 @@ class DatabaseScheduler(Scheduler):
     Model: Type[PeriodicTask] = PeriodicTask
     Changes: Type[PeriodicTasksChange] = PeriodicTasksChange
 
+    # Scheduler's, in seconds and in fired tasks
+    sync_every: float
+    sync_every_tasks: Optional[int]
+
     _schedule: ScheduleData = {}
     _last_timestamp: Optional[datetime] = None
+    _last_change_id: int = 0
+    _read_changes_at: datetime
     _initial_read: bool = True
-    _heap_invalidated: bool = False
+    _notified: bool = False
+    _last_change_check: float = 0.0
+    # tasks due up to this time are loaded
+    _loaded_until: datetime
 
-    _heap: list
+    # None until populated from the whole schedule
+    _heap: Optional[Engine]
+    # monotonic times of the next lease heartbeat and of the last successful one
+    _next_heartbeat: float = 0.0
+    _leases_renewed_at: float = 0.0
+    _next_runs_prune: float = 0.0
 
-    def __init__(self, *args: List[Any], **kwargs: Dict[str, Any]) -> None:
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
         self._dirty: set = set()
+        # task id -> entry name, to find the entries of changed rows
+        self._task_names: Dict[int, str] = {}
+        # task id -> final run state of the fired one off tasks, disabled by
+        # the next sync
+        self._disabling: Dict[int, Dict[str, Any]] = {}
+        app: Celery = kwargs.get("app") or args[0]
+        # shared by the entries, fails at startup rather than per entry
+        self.timing = TimingPolicy.of(app)
+        # Write-behind of the run state: fired entries are journaled locally
+        # and flushed to the database by sync() in batches.
+        self.sync_every = (
+            app.conf.get("beat_run_state_flush_interval") or self.sync_every
+        )
+        self.sync_batch_size = (
+            app.conf.get("beat_run_state_batch_size") or DEFAULT_SYNC_BATCH_SIZE
+        )
+        self.schedule_window = timedelta(
+            seconds=app.conf.get("beat_schedule_window") or DEFAULT_SCHEDULE_WINDOW
+        )
+        self.engine = ENGINES[app.conf.get("beat_engine") or "heap"]
+        self._journal: Optional[RunStateJournal] = None
+        if journal_path := app.conf.get("beat_run_state_journal"):
+            self._journal = RunStateJournal(journal_path)
+        # Sharded mode: every instance only loads, fires and syncs the tasks of
+        # the partitions it holds the lease of.
+        self.partitions: Optional[PartitionLeases] = None
+        if partition_count := app.conf.get("beat_partitions"):
+            self.partitions = PartitionLeases(
+                partition_count,
+                holder=app.conf.get("beat_instance_id"),
+                ttl=app.conf.get("beat_lease_ttl") or DEFAULT_LEASE_TTL,
+            )
+        # Leader election mode: only the leader fires, the standbys keep their
+        # schedule up to date to take over without a full read.
+        self.leader: Optional[LeaderLease] = None
+        if app.conf.get("beat_leader_election"):
+            if self.partitions is not None:
+                raise ValueError(
+                    "beat_leader_election and beat_partitions are exclusive"
+                )
+            self.leader = LeaderLease(
+                holder=app.conf.get("beat_instance_id"),
+                ttl=app.conf.get("beat_lease_ttl") or DEFAULT_LEASE_TTL,
+            )
+            # a new leader re-fires what was fired since the last sync
+            self.sync_every = min(
+                self.sync_every, self.leader.ttl.total_seconds() / 3
+            )
+        # Publish from a background thread instead of the tick.
+        self.publisher: Optional[Publisher] = None
+        if app.conf.get("beat_publisher"):
+            self.publisher = Publisher(
+                app,
+                maxsize=app.conf.get("beat_publisher_queue_size")
+                or DEFAULT_QUEUE_SIZE,
+                batch_size=app.conf.get("beat_publisher_batch_size")
+                or DEFAULT_BATCH_SIZE,
+                max_retries=app.conf.get("beat_publisher_max_retries")
+                or DEFAULT_MAX_RETRIES,
+            )
+        # The runs recorded by src.infra.run_history are pruned by beat.
+        self.run_history_retention: Optional[timedelta] = None
+        if app.conf.get("beat_run_history"):
+            self.run_history_retention = timedelta(
+                days=app.conf.get("beat_run_history_retention")
+                or DEFAULT_RUN_HISTORY_RETENTION
+            )
+        self.metrics = BeatMetrics()
+        # entries fired since beat last slept
+        self._fired = 0
+        # listening before the schedule is read by Scheduler.__init__
+        self.notifier = create_notifier(settings.SCHEDULE_NOTIFY_URL)
         super().__init__(*args, **kwargs)
+        self.sync_every_tasks = self.sync_every_tasks or self.sync_batch_size
         self._finalize = Finalize(self, self.sync, exitpriority=5)
         self.max_interval = (
             kwargs.get("max_interval")
             or self.app.conf.beat_max_loop_interval
-            or DEFAULT_MAX_INTERVAL
+            or (NOTIFIED_MAX_INTERVAL if self.notifier else DEFAULT_MAX_INTERVAL)
+        )
+        self.change_check_interval = (
+            self.app.conf.get("beat_change_check_interval")
+            or DEFAULT_CHANGE_CHECK_INTERVAL
+        )
+        # number of change checks that reached the database
+        self.change_checks = 0
+        # fired entries per second
+        self.dispatch_rate = RateCounter()
+        self._setup_metrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        if address := self.app.conf.get("beat_metrics_address"):
+            self.metrics_server = MetricsServer(address, self.metrics)
+            self.metrics_server.start()
+
+    def _setup_metrics(self) -> None:
+        metrics = self.metrics
+
+        def count_entries() -> Dict[Tuple[str, ...], float]:
+            counts: Dict[Tuple[str, ...], float] = defaultdict(int)
+            # a copy, the schedule changes under the scrape
+            for entry in list(self._schedule.values()):
+                for schedule_type, _, model_field in self.Entry.model_schedules:
+                    if isinstance(entry.schedule, schedule_type):
+                        counts[(model_field.removesuffix("_id"),)] += 1
+                        break
+                else:
+                    counts[("other",)] += 1
+            return counts
+
+        metrics.entries.function = count_entries
+        metrics.is_leader.function = lambda: 0 if self.standby else 1
+        metrics.partitions.function = lambda: (
+            0 if self.partitions is None else len(self.partitions.owned)
         )
+        if (publisher := self.publisher) is not None:
+            metrics.publish_latency.attach(publisher.latency)
+            metrics.publish_pending.function = lambda: publisher.pending
+            metrics.publish_dropped.function = lambda: publisher.dropped
+            metrics.publish_requeued.function = lambda: publisher.requeued
+        event.listen(engine, "before_cursor_execute", self._count_statement)
+        event.listen(engine, "begin", self._count_transaction)
+
+    def _count_statement(self, *args: Any) -> None:
+        self.metrics.db_statements.inc()
+
+    def _count_transaction(self, *args: Any) -> None:
+        self.metrics.db_transactions.inc()
 
     def setup_schedule(self) -> None:
         self.install_default_entries(self.schedule)
@@ -250,19 +616,402 @@ class DatabaseScheduler(Scheduler):
 
     def all_as_schedule(self) -> ScheduleData:
         debug("DatabaseScheduler: Fetching database schedule")
-        s = {}
-        with SessionLocal.begin() as session:
-            model_tasks = periodic_task_repo.get_enabled(db=session)
+        with (
+            self.metrics.all_as_schedule_duration.time(),
+            SessionLocal.begin() as session,
+        ):
+            model_tasks = periodic_task_repo.get_enabled(
+                until=self._loaded_until, partitions=self._partitions(), db=session
+            )
             # session.expunge_all()  # 分离，持久化
-            for model_task in model_tasks:
-                try:
-                    s[model_task.name] = self.Entry(model_task, app=self.app)
-                except ValueError:
-                    pass
-        return s
+            return {entry.name: entry for entry in self._to_entries(model_tasks)}
 
-    def schedule_changed(self) -> bool:
+    def reload_schedule(self) -> None:
+        self._read_changes_at = utcnow()
+        self._loaded_until = self._read_changes_at + self.schedule_window
+        with SessionLocal.begin() as session:
+            # read before the tasks, changes in between are applied twice
+            self._last_change_id = periodic_task_change_log_repo.get_last_id(
+                db=session
+            )
+            if change := periodic_tasks_change_repo.get(db=session):
+                self._last_timestamp = change.last_update
+        self._schedule = {}
+        self._task_names = {}
+        self._heap = None
+        for entry in self.all_as_schedule().values():
+            self._add_entry(entry)
+
+    def apply_changes(self) -> bool:
+        """Patch the schedule with the rows changed since the last seen change.
+
+        Only the changed tasks, and the tasks using a changed schedule, are
+        read back from the database.  Return whether the schedule was changed.
+        """
+        read_at = utcnow()
+        if self._read_changes_at < read_at - CHANGE_LOG_RETENTION:
+            # unseen changes may have been pruned, fall back to a full read
+            info("DatabaseScheduler: Change log expired, reloading schedule.")
+            self.reload_schedule()
+            return True
         with SessionLocal.begin() as session:
+            changes = periodic_task_change_log_repo.get_since(
+                self._last_change_id, db=session
+            )
+            if not changes:
+                return False
+            task_ids = set()
+            schedule_ids: Dict[str, Set[int]] = defaultdict(set)
+            for change in changes:
+                if change.table == self.Model.__tablename__:
+                    task_ids.add(change.object_id)
+                else:
+                    schedule_ids[change.table].add(change.object_id)
+                    schedules.schedule_cache.invalidate(change.table, change.object_id)
+            task_ids |= periodic_task_repo.get_ids_by_schedules(
+                schedule_ids, db=session
+            )
+            model_tasks = periodic_task_repo.get_enabled(
+                ids=task_ids, partitions=self._partitions(), db=session
+            )
+            entries = self._to_entries(model_tasks)
+        self._last_change_id = changes[-1].id
+        self._read_changes_at = read_at
+
+        debug("DatabaseScheduler: Reloading %d changed tasks", len(task_ids))
+        for task_id in task_ids:
+            self._remove_entry(task_id)
+        for entry in entries:
+            self._add_entry(entry)
+        return True
+
+    def _to_entries(self, model_tasks: List[PeriodicTask]) -> List[ModelEntry]:
+        entries = []
+        for model_task in model_tasks:
+            try:
+                entries.append(
+                    self.Entry(model_task, app=self.app, timing=self.timing)
+                )
+            except ValueError:
+                pass
+        return entries
+
+    def slide_window(self) -> None:
+        """Evict the entries due after the window, load the ones entering it.
+
+        Entries are only evicted once their ``next_run_at`` is written, so the
+        range query of a later slide finds them again.
+        """
+        if self._initial_read:
+            return
+        now = utcnow()
+        if self._loaded_until - now > self.schedule_window * 3 / 4:
+            return
+        until = now + self.schedule_window
+        evicted = [
+            entry.model.id
+            for entry in self._schedule.values()
+            if entry.name not in self._dirty
+            and (next_run_at := entry.next_run_at()) is not None
+            and next_run_at > until
+        ]
+        for task_id in evicted:
+            self._remove_entry(task_id)
+
+        with SessionLocal.begin() as session:
+            model_tasks = periodic_task_repo.get_enabled(
+                since=self._loaded_until,
+                until=until,
+                partitions=self._partitions(),
+                db=session,
+            )
+            entries = self._to_entries(
+                [task for task in model_tasks if task.id not in self._task_names]
+            )
+        self._loaded_until = until
+        for entry in entries:
+            self._add_entry(entry)
+        debug(
+            "DatabaseScheduler: Window slid to %s, %d evicted, %d loaded",
+            until,
+            len(evicted),
+            len(entries),
+        )
+
+    def _partitions(self) -> Optional[Tuple[int, Set[int]]]:
+        if self.partitions is None:
+            return None
+        return self.partitions.count, self.partitions.owned
+
+    def _heartbeat(self) -> Optional[Tuple[Set[int], Set[int]]]:
+        """Renew the leases, return the acquired and the dropped partitions."""
+        assert self.partitions is not None
+        now = monotonic()
+        ttl = self.partitions.ttl.total_seconds()
+        self._next_heartbeat = now + ttl / 3
+        try:
+            changes = self.partitions.heartbeat()
+        except Exception as exc:
+            logger.exception("Lease heartbeat failed: %r", exc)
+            if now - self._leases_renewed_at < ttl:
+                return None
+            # the leases may have expired, another instance may own them now
+            dropped, self.partitions.owned = self.partitions.owned, set()
+            return set(), dropped
+        self._leases_renewed_at = now
+        return changes
+
+    def rebalance(self) -> None:
+        """Hand the dropped partitions over and load the acquired ones."""
+        if self.partitions is None or monotonic() < self._next_heartbeat:
+            return
+        if (changes := self._heartbeat()) is None:
+            return
+        acquired, dropped = changes
+        if dropped:
+            # the next owner carries on from the saved run state
+            self.sync()
+            self._remove_partitions(dropped)
+            try:
+                self.partitions.release(dropped)
+            except Exception as exc:
+                # they expire anyway
+                logger.warning("Failed to release partitions: %r", exc)
+        if acquired:
+            with SessionLocal.begin() as session:
+                model_tasks = periodic_task_repo.get_enabled(
+                    until=self._loaded_until,
+                    partitions=(self.partitions.count, acquired),
+                    db=session,
+                )
+                entries = self._to_entries(model_tasks)
+            for entry in entries:
+                self._add_entry(entry)
+
+    def _remove_partitions(self, partitions: Set[int]) -> None:
+        assert self.partitions is not None
+        for task_id in [
+            task_id
+            for task_id in self._task_names
+            if self.partitions.partition_of(task_id) in partitions
+        ]:
+            self._remove_entry(task_id)
+
+    @property
+    def standby(self) -> bool:
+        return self.leader is not None and not self.leader.is_leader
+
+    def elect(self) -> None:
+        """Renew the leader lease, or try to take it over while standing by."""
+        if self.leader is None or monotonic() < self._next_heartbeat:
+            return
+        now = monotonic()
+        ttl = self.leader.ttl.total_seconds()
+        was_leader = self.leader.is_leader
+        try:
+            is_leader = self.leader.heartbeat()
+        except Exception as exc:
+            logger.exception("Leader lease heartbeat failed: %r", exc)
+            is_leader = was_leader and now - self._leases_renewed_at < ttl
+            if not is_leader:
+                # another instance may have taken the lease over
+                self.leader.token = None
+        else:
+            self._leases_renewed_at = now
+        self._next_heartbeat = now + (
+            ttl / 3 if is_leader else min(ttl / 3, STANDBY_POLL_INTERVAL)
+        )
+        if is_leader and not was_leader:
+            self.take_over()
+        elif was_leader and not is_leader:
+            self.stand_by()
+
+    def take_over(self) -> None:
+        """Carry on from the run state saved by the previous leader.
+
+        Only the run state is read, the schedule itself is kept up to date by
+        the standby.
+        """
+        info("DatabaseScheduler: Taking over as the leader.")
+        with SessionLocal.begin() as session:
+            run_states = periodic_task_repo.get_run_states(
+                self._task_names, db=session
+            )
+        for state in run_states:
+            if (name := self._task_names.get(state["id"])) is None:
+                continue
+            entry = self._schedule[name]
+            model = entry.model
+            if state["last_run_at"] is not None:
+                model.last_run_at = entry.last_run_at = state["last_run_at"]
+            model.total_run_count = entry.total_run_count = state["total_run_count"]
+            model.next_run_at = state["next_run_at"]
+        self._dirty = {
+            name
+            for name, entry in self._schedule.items()
+            if entry.next_run_at_changed()
+        }
+        self._heap = None
+
+    def stand_by(self) -> None:
+        """Stop firing, the unsaved run state belongs to a stale term."""
+        info("DatabaseScheduler: Standing by.")
+        self._dirty = set()
+        self._disabling = {}
+        if self._journal is not None:
+            self._journal.rewrite([])
+
+    def _add_entry(self, entry: ModelEntry) -> None:
+        if self.partitions is not None and not self.partitions.owns(entry.model.id):
+            return
+        if entry.model.id in self._disabling:
+            # fired, the database doesn't know yet
+            return
+        if entry.one_off_done:
+            self._retire(entry)
+            return
+        self._schedule[entry.name] = entry
+        self._task_names[entry.model.id] = entry.name
+        if entry.next_run_at_changed():
+            # NULL after a change, or not written yet
+            self._dirty.add(entry.name)
+        if self._heap is not None:
+            self._push_entry(entry)
+
+    def _remove_entry(self, task_id: int) -> None:
+        if (name := self._task_names.pop(task_id, None)) is not None:
+            self._schedule.pop(name, None)
+            if self._heap is not None:
+                self._heap.remove(name)
+
+    def _retire(self, entry: ModelEntry) -> None:
+        """Drop a fired one off task now, queue disabling it for the next sync."""
+        # No reset total_run_count, unlike django-celery-count
+        entry.model.enabled = False
+        self._disabling[entry.model.id] = entry.run_state()
+        self._dirty.discard(entry.name)
+        self._remove_entry(entry.model.id)
+
+    def _push_entry(self, entry: ModelEntry) -> None:
+        assert self._heap is not None
+        is_due, next_call_delay = self.is_due(entry)
+        self._heap.push(entry.name, self._when(entry, 0 if is_due else next_call_delay))
+
+    def populate_heap(self, *args: Any, **kwargs: Any) -> None:
+        self._heap = self.engine()
+        for entry in self.schedule.values():
+            self._push_entry(entry)
+
+    def _tick(self) -> float:
+        """Run one iteration of the engine, like ``Scheduler.tick``.
+
+        Only the entry at the top is looked at, and only once its time has
+        come.  Changes to the schedule update the heap in place, so the other
+        entries keep their computed times.
+        """
+        if self._heap is None:
+            self.populate_heap()
+        assert self._heap is not None
+        event = self._heap.peek()
+        if event is None:
+            return self.max_interval
+        when, name = event
+        remaining = when - utcnow().timestamp()
+        if remaining > 0:
+            return min(remaining, self.max_interval)
+
+        entry = self._schedule[name]
+        is_due, next_time_to_run = self.is_due(entry)
+        if is_due:
+            self.metrics.dispatch_drift.observe(-remaining)
+            next_entry = self.reserve(entry)
+            # the publisher thread has its own producers
+            producer = None if self.publisher is not None else self.producer
+            self.apply_entry(entry, producer=producer)
+            if next_entry.one_off_done:
+                self._retire(next_entry)
+            else:
+                self._heap.push(name, self._when(next_entry, next_time_to_run))
+            return 0
+        self._heap.push(name, self._when(entry, next_time_to_run))
+        adjusted_next_time_to_run = self.adjust(next_time_to_run)
+        return min(adjusted_next_time_to_run or self.max_interval, self.max_interval)
+
+    def tick(self, *args: Any, **kwargs: Any) -> float:
+        start = time.perf_counter()
+        self.refresh_schedule()
+        self.rebalance()
+        self.elect()
+        self.slide_window()
+        if self.publisher is not None:
+            # the dropped runs are recorded already, publish them late
+            self.publisher.requeue_dropped()
+        interval = self.max_interval if self.standby else self._tick()
+        if self.partitions is not None or self.leader is not None:
+            # wake up in time to renew the leases
+            interval = min(interval, max(self._next_heartbeat - monotonic(), 0))
+        self.metrics.tick_duration.observe(time.perf_counter() - start)
+        if interval:
+            self.metrics.due_entries.observe(self._fired)
+            self._fired = 0
+        if self.notifier is None or not interval or interval <= 0:
+            return interval
+        if self._notified:
+            # a notified change is waiting for the rate limit
+            next_check = self._last_change_check + self.change_check_interval
+            return max(min(interval, next_check - monotonic()), 0)
+        # Sleep here instead of in beat, to wake up as soon as a change arrives
+        if self.notifier.wait(interval):
+            debug("DatabaseScheduler: Change notified.")
+            self._notified = True
+        return 0
+
+    def apply_async(
+        self,
+        entry: ModelEntry,
+        producer: Any = None,
+        advance: bool = True,
+        **kwargs: Any,
+    ) -> Any:
+        if self.publisher is None:
+            return super().apply_async(entry, producer, advance, **kwargs)
+        entry = self.reserve(entry) if advance else entry
+        try:
+            self.publisher.submit(
+                entry.name,
+                entry.task,
+                _evaluate_entry_args(entry.args),
+                _evaluate_entry_kwargs(entry.kwargs),
+                entry.options,
+            )
+        finally:
+            self._tasks_since_sync += 1
+            if self.should_sync():
+                self._do_sync()
+
+    def close(self) -> None:
+        if self.publisher is not None:
+            # publish what is queued before the run state is synced
+            self.publisher.close()
+        super().close()
+        if self.notifier is not None:
+            self.notifier.close()
+        if self.partitions is not None:
+            self.partitions.close()
+        if self.leader is not None:
+            self.leader.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        event.remove(engine, "before_cursor_execute", self._count_statement)
+        event.remove(engine, "begin", self._count_transaction)
+
+    def schedule_changed(self) -> bool:
+        self._last_change_check = monotonic()
+        self.change_checks += 1
+        with (
+            self.metrics.schedule_changed_duration.time(),
+            SessionLocal.begin() as session,
+        ):
             last = self._last_timestamp
             ts = periodic_tasks_change_repo.get(db=session).last_update
             try:
@@ -272,42 +1021,202 @@ class DatabaseScheduler(Scheduler):
                 self._last_timestamp = ts
             return False
 
+    def is_due(self, entry: ModelEntry) -> schedules.schedstate:
+        last_run_at = entry.last_run_at
+        state = entry.is_due()
+        if entry.last_run_at is not last_run_at:
+            # a misfire was skipped
+            self._dirty.add(entry.name)
+        return state
+
     def reserve(self, entry: ModelEntry) -> ModelEntry:
-        new_entry: ModelEntry = next(entry)  # TODO 移除 __next__
+        self.dispatch_rate.add()
+        self.metrics.dispatched.inc()
+        self._fired += 1
+        # the same entry, advanced
+        new_entry: ModelEntry = next(entry)
         # Need to store entry by name, because the entry may change
         # in the mean time.
         self._dirty.add(new_entry.name)
+        if self._journal is not None:
+            self._journal.append(new_entry.run_state())
         return new_entry
 
+    def replay_journal(self) -> None:
+        """Write the run states journaled before a crash or restart."""
+        if self._journal is None:
+            return
+        if (run_states := self._journal.read()) and not self.standby:
+            info("DatabaseScheduler: Replaying %d journaled runs", len(run_states))
+            try:
+                with SessionLocal.begin() as session:
+                    if self.leader is not None:
+                        self.leader.fence(session)
+                    periodic_task_repo.update_run_states(run_states, db=session)
+            except LeaseLost as exc:
+                warning("DatabaseScheduler: %s, journal discarded.", exc)
+        self._journal.rewrite([])
+
+    def should_sync(self) -> bool:
+        # Scheduler's, on the clock of src.utils.timezone
+        return (
+            self._last_sync is None
+            or monotonic() - self._last_sync > self.sync_every
+            or bool(
+                self.sync_every_tasks
+                and self._tasks_since_sync >= self.sync_every_tasks
+            )
+        )
+
+    def _do_sync(self) -> None:
+        try:
+            debug("beat: Synchronizing schedule...")
+            self.sync()
+        finally:
+            self._last_sync = monotonic()
+            self._tasks_since_sync = 0
+
     def sync(self) -> None:
+        if self.standby:
+            # the leader writes the run state
+            self._dirty = set()
+            self._disabling = {}
+            return
         if logger.isEnabledFor(logging.DEBUG):
+            debug(
+                "Dispatched %.1f tasks/s over the last minute, peak %d/s",
+                self.dispatch_rate.rate(),
+                self.dispatch_rate.peak(),
+            )
             debug("Writing entries...")
-        _tried = set()
+        dirty, self._dirty = self._dirty, set()
+        disabling, self._disabling = self._disabling, {}
         _failed = set()
-        # TODO Improve exception handling. Refer to:
-        # https://sourcegraph.com/github.com/celery/django-celery-beat/-/blob/django_celery_beat/schedulers.py#L295
+        run_states = list(disabling.values())
+        for name in dirty:
+            if (entry := self._schedule.get(name)) is None:
+                _failed.add(name)
+            else:
+                run_states.append(entry.run_state())
+        self.metrics.sync_batch_size.observe(len(run_states))
+        started = time.perf_counter()
+        lost: Set[int] = set()
         try:
-            while self._dirty:
-                name = self._dirty.pop()
-                try:
-                    self.schedule[name].save()
-                    _tried.add(name)
-                except KeyError:
-                    _failed.add(name)
+            # All the dirty entries in one transaction
+            with SessionLocal.begin() as session:
+                if self.leader is not None:
+                    # rejected, and rolled back, once the lease is lost
+                    self.leader.fence(session)
+                if self.partitions is not None:
+                    # the leases stay locked until the commit, like the leader's
+                    partition_of = self.partitions.partition_of
+                    written = {partition_of(state["id"]) for state in run_states}
+                    held = self.partitions.fence(written, session)
+                    lost = written - held
+                    run_states = [
+                        state
+                        for state in run_states
+                        if partition_of(state["id"]) in held
+                    ]
+                    disabling = {
+                        task_id: state
+                        for task_id, state in disabling.items()
+                        if partition_of(task_id) in held
+                    }
+                for start in range(0, len(run_states), self.sync_batch_size):
+                    end = start + self.sync_batch_size
+                    periodic_task_repo.update_run_states(
+                        run_states[start:end], db=session
+                    )
+                if disabling:
+                    self._disable(disabling, session)
+        except LeaseLost as exc:
+            warning("DatabaseScheduler: %s, run state discarded.", exc)
+            self.stand_by()
+            return
+        except Exception as exc:
+            _failed = dirty
+            self._disabling.update(disabling)
+            self.metrics.sync_failures.inc()
+            logger.exception("Database error while sync: %r", exc)
         finally:
-            # retry later, only for the failed ones
-            self._dirty |= _failed
+            self.metrics.sync_duration.observe(time.perf_counter() - started)
+        if lost:
+            assert self.partitions is not None
+            # another instance may own them now, and loaded their run state
+            warning("DatabaseScheduler: Partitions %s lost, run state discarded.", lost)
+            _failed -= {
+                name
+                for name in _failed
+                if (entry := self._schedule.get(name)) is not None
+                and self.partitions.partition_of(entry.model.id) in lost
+            }
+            self._remove_partitions(lost)
+        # retry later, only for the failed ones
+        self._dirty |= _failed
+        if self._journal is not None and (dirty or disabling or self._dirty):
+            # the fired one off tasks too, they are out of the schedule
+            self._journal.rewrite(
+                [
+                    *self._disabling.values(),
+                    *(
+                        self._schedule[name].run_state()
+                        for name in self._dirty
+                        if name in self._schedule
+                    ),
+                ]
+            )
+        self.prune_changes()
+        self.prune_runs()
+
+    def _disable(self, disabling: Dict[int, Dict[str, Any]], session: Session) -> None:
+        """Disable the fired one off tasks, logged like a change from the API."""
+        debug("DatabaseScheduler: Disabling %d one off tasks", len(disabling))
+        periodic_task_repo.disable(disabling, db=session)
+        periodic_tasks_change_repo.update_or_create(db=session)
+        # The log rows are a core insert, which doesn't autoflush: lock the
+        # PeriodicTasksChange row first, their ids are allocated in commit
+        # order under it like in db_listen.log_changed.
+        session.flush()
+        periodic_task_change_log_repo.log(
+            self.Model.__tablename__, disabling, CHANGE_ACTIONS.UPDATE, db=session
+        )
+        session.info[SCHEDULE_CHANGED] = True
+
+    def prune_changes(self) -> None:
+        with SessionLocal.begin() as session:
+            periodic_task_change_log_repo.delete_before(
+                utcnow() - CHANGE_LOG_RETENTION, db=session
+            )
+
+    def prune_runs(self) -> None:
+        """Delete the runs past the retention and the rollups out of their
+        window, at most once per interval.
+        """
+        if self.run_history_retention is None or monotonic() < self._next_runs_prune:
+            return
+        self._next_runs_prune = monotonic() + RUN_HISTORY_PRUNE_INTERVAL
+        with SessionLocal.begin() as session:
+            deleted = periodic_task_run_repo.delete_before(
+                utcnow() - self.run_history_retention, db=session
+            )
+            rollups = prune_rollups(db=session)
+        debug(
+            "DatabaseScheduler: Pruned %d runs from the history, %d rollups",
+            deleted,
+            rollups,
+        )
 
     def update_from_dict(self, mapping: Dict[str, Dict[str, Any]]) -> None:
-        s = {}
         for name, entry_fields in mapping.items():
             try:
-                entry = self.Entry.from_entry(name, app=self.app, **entry_fields)
+                entry = self.Entry.from_entry(
+                    name, app=self.app, timing=self.timing, **entry_fields
+                )
                 if entry.model.enabled:
-                    s[name] = entry
+                    self._add_entry(entry)
             except Exception as exc:
                 logger.exception(ADD_ENTRY_ERROR, name, exc, entry_fields)
-        self.schedule.update(s)
 
     def install_default_entries(self, data: ScheduleData) -> None:
         # "data" is not accessed, maybe for compatibility
@@ -323,34 +1232,49 @@ class DatabaseScheduler(Scheduler):
             )
         self.update_from_dict(entries)
 
-    def schedules_equal(self, *args: List[str], **kwargs: Dict[str, Any]) -> bool:
-        if self._heap_invalidated:
-            self._heap_invalidated = False
-            return False
-        return super(DatabaseScheduler, self).schedules_equal(*args, **kwargs)
-
     @property
     def schedule(self) -> ScheduleData:
-        initial = update = False
+        # No I/O after the initial read, external changes are applied by
+        # refresh_schedule() once per tick.
         if self._initial_read:
             debug("DatabaseScheduler: initial read")
-            initial = update = True
             self._initial_read = False
-        elif self.schedule_changed():
-            info("DatabaseScheduler: Schedule changed.")
-            update = True
-
-        if update:
             self.sync()
-            self._schedule = self.all_as_schedule()
-            # the schedule changed, invalidate the heap in Scheduler.tick
-            if not initial:
-                self._heap = []
-                self._heap_invalidated = True
-            if logger.isEnabledFor(logging.DEBUG):
-                debug(
-                    "Current schedule:\n%s",
-                    "\n".join(repr(entry) for entry in self._schedule.values()),
-                )
+            if self.partitions is not None:
+                self._heartbeat()
+            self.elect()
+            if self.notifier is not None:
+                # before the read, the changes committed after it are notified
+                self.notifier.listen()
+            self.replay_journal()
+            self.reload_schedule()
+            self._debug_schedule()
         # FIXME type hints schedule
         return self._schedule
+
+    def refresh_schedule(self) -> None:
+        """Apply the external changes to the schedule.
+
+        The database is checked at most once per ``change_check_interval``,
+        and only after a notification when a notifier is configured.
+        """
+        if self._initial_read:
+            # the whole schedule is read on first access anyway
+            return
+        if self.notifier is not None and not self._notified:
+            return
+        if monotonic() - self._last_change_check < self.change_check_interval:
+            return
+        self._notified = False
+        if self.schedule_changed():
+            info("DatabaseScheduler: Schedule changed.")
+            self.sync()
+            if self.apply_changes():
+                self._debug_schedule()
+
+    def _debug_schedule(self) -> None:
+        if logger.isEnabledFor(logging.DEBUG):
+            debug(
+                "Current schedule:\n%s",
+                "\n".join(repr(entry) for entry in self._schedule.values()),
+            )
@@ -1,7 +1,24 @@
 """Timezone aware Cron schedule Implementation."""
-from datetime import datetime, timedelta
-from typing import Any, Callable, Optional
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from zoneinfo import ZoneInfo
 
+import numpy as np
 import pytz
 from celery import Celery
 from celery.schedules import (  # noqa: F401
@@ -12,13 +29,46 @@ from celery.schedules import (  # noqa: F401
     schedule,
     solar,
 )
+from celery.schedules import (
+    SOLAR_INVALID_EVENT,
+    SOLAR_INVALID_LATITUDE,
+    SOLAR_INVALID_LONGITUDE,
+)
 from celery.utils.time import maybe_make_aware
 
+from .libs.solar import DAY, RISING, SETTING, TRANSIT, event_times
 from .utils import NEVER_CHECK_TIMEOUT
+from .utils.timezone import utcnow
+
+# A spec matching no date within this many years never matches
+MAX_CRON_YEARS = 400
+
+
+def _bits(values: Iterable[int]) -> int:
+    mask = 0
+    for value in values:
+        mask |= 1 << value
+    return mask
+
+
+def _next_bit(mask: int, start: int) -> int:
+    """Lowest set bit of ``mask`` at or above ``start``, -1 if none."""
+    mask >>= start
+    if not mask:
+        return -1
+    return start + (mask & -mask).bit_length() - 1
 
 
 class tz_crontab(crontab):
-    """Timezone Aware Crontab."""
+    """Timezone Aware Crontab.
+
+    The spec is compiled to bitmasks, the next fire time is found by walking
+    forward in local wall time and converted with ``zoneinfo``, so DST
+    transitions are accounted for: a skipped wall time fires at the
+    transition, a repeated one at its first occurrence.  The last computed
+    fire time is memoized, until it passes, for all the entries sharing the
+    schedule, and the threads of the API.
+    """
 
     def __init__(
         self,
@@ -44,9 +94,27 @@ class tz_crontab(crontab):
             nowfun=nowfun,
             app=app,
         )
+        self._zone = ZoneInfo(getattr(tz, "zone", None) or "UTC")
+        self._minutes = _bits(self.minute)
+        self._hours = _bits(self.hour)
+        self._days_of_week = _bits(self.day_of_week)
+        self._days_of_month = _bits(self.day_of_month)
+        self._months = _bits(self.month_of_year)
+        # (weekday of the 1st, days in month) -> mask of the matching days
+        self._day_masks: Dict[Tuple[int, int], int] = {}
+        # (after, next fire), the next fire of any time in [after, next fire)
+        self._next_fire: Optional[Tuple[datetime, datetime]] = None
+        # of the memos, the walks run unlocked
+        self._lock = threading.Lock()
+        # seconds of the matching minutes into an hour
+        self._minute_seconds = np.array(sorted(self.minute), dtype=float) * 60
 
     def nowfunc(self) -> datetime:
-        return self.tz.normalize(pytz.utc.localize(datetime.utcnow()))
+        return utcnow().astimezone(self.tz)
+
+    def remaining_estimate(self, last_run_at: datetime) -> timedelta:
+        now = self.now()
+        return self.next_fire(last_run_at, now) - now
 
     def is_due(self, last_run_at: datetime) -> schedstate:
         """Calculate when the next run will take place.
@@ -55,16 +123,148 @@ class tz_crontab(crontab):
         The last_run_at argument needs to be timezone aware.
 
         """
-        # convert last_run_at to the schedule timezone
-        last_run_at = last_run_at.astimezone(self.tz)
+        now = self.now()
+        rem = (self.next_fire(last_run_at, now) - now).total_seconds()
+        if rem > 0:
+            return schedstate(False, rem)
+        return schedstate(True, max((self.next_fire(now) - now).total_seconds(), 0))
+
+    def next_fire(self, last_run_at: datetime, now: datetime = None) -> datetime:
+        """First fire time after the minute of ``last_run_at``, in UTC.
+
+        Like celery's crontab, the rest of the hour of ``last_run_at`` is
+        skipped when ``now`` is another day.
+        """
+        after = last_run_at.astimezone(timezone.utc).replace(second=0, microsecond=0)
+        local = after.astimezone(self._zone).replace(tzinfo=None)
+        if now is not None and now.astimezone(self._zone).date() != local.date():
+            return self._walk(after, local.replace(minute=0) + timedelta(hours=1))
+        with self._lock:
+            memo = self._next_fire
+            if memo is not None and memo[0] <= after < memo[1]:
+                return memo[1]
+        fire = self._walk(after, local + timedelta(minutes=1))
+        with self._lock:
+            memo = self._next_fire
+            if memo is None or after >= memo[0]:
+                self._next_fire = after, fire
+        return fire
+
+    def fire_times(
+        self, after: float, n: int, until: Optional[float] = None
+    ) -> np.ndarray:
+        """Fire times later than the timestamp ``after``, as timestamps.
+
+        All the fire times up to ``until``, then ``n`` more.  The matching
+        minutes of a wall hour are taken at once, unless the UTC offset
+        changes within the hour.
+        """
+        until = after if until is None else until
+        chunks: List[np.ndarray] = []
+        beyond = 0
+        fire = self._fire_after(after)
+        while beyond < n:
+            local = fire.astimezone(self._zone).replace(tzinfo=None)
+            if self._matching_hour(local) and self._fixed_offset(
+                local.replace(minute=0)
+            ):
+                hour = fire.timestamp() - local.minute * 60
+                seconds = self._minute_seconds
+                chunk = hour + seconds[seconds >= local.minute * 60]
+            else:
+                chunk = np.array([fire.timestamp()])
+            chunks.append(chunk)
+            beyond += int(np.count_nonzero(chunk > until))
+            fire = self._fire_after(float(chunk[-1]))
+        times = np.concatenate(chunks)
+        return times[: np.searchsorted(times, until, side="right") + n]
+
+    def _fire_after(self, after: float) -> datetime:
+        """First fire time later than the timestamp ``after``, not memoized."""
+        minute = datetime.fromtimestamp(after, timezone.utc).replace(
+            second=0, microsecond=0
+        )
+        local = minute.astimezone(self._zone).replace(tzinfo=None)
+        return self._walk(minute, local + timedelta(minutes=1))
+
+    def _matching_hour(self, wall: datetime) -> bool:
+        """Whether the spec matches the date and hour of ``wall``.
+
+        Not the case of a fire time in a DST gap, converted to a later hour.
+        """
+        return bool(
+            self._months >> wall.month
+            & self._day_mask(wall.year, wall.month) >> wall.day
+            & self._hours >> wall.hour
+            & 1
+        )
+
+    def _fixed_offset(self, wall: datetime) -> bool:
+        """Whether the whole wall hour starting at ``wall`` has one UTC offset."""
+        offsets = {
+            moment.replace(tzinfo=self._zone, fold=fold).utcoffset()
+            for moment in (wall, wall + timedelta(minutes=59))
+            for fold in (0, 1)
+        }
+        return len(offsets) == 1
+
+    def _walk(self, after: datetime, wall: datetime) -> datetime:
+        """First fire time later than ``after``, from the wall time ``wall``."""
+        while True:
+            wall = self._next_wall_time(wall)
+            for fold in (0, 1):
+                fire = wall.replace(tzinfo=self._zone, fold=fold)
+                fire = fire.astimezone(timezone.utc)
+                if fire > after:
+                    return fire
+            # first occurrence of a repeated wall time, already passed
+            wall += timedelta(minutes=1)
 
-        rem_delta = self.remaining_estimate(last_run_at)
-        rem = max(rem_delta.total_seconds(), 0)
-        due = rem == 0
-        if due:
-            rem_delta = self.remaining_estimate(self.now())
-            rem = max(rem_delta.total_seconds(), 0)
-        return schedstate(due, rem)
+    def _next_wall_time(self, start: datetime) -> datetime:
+        """First matching naive local time at or after ``start``."""
+        year, month, day = start.year, start.month, start.day
+        hour, minute = start.hour, start.minute
+        while year - start.year <= MAX_CRON_YEARS:
+            if (next_month := _next_bit(self._months, month)) < 0:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            next_day = _next_bit(self._day_mask(year, month), day)
+            if next_day < 0:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+            if (next_hour := _next_bit(self._hours, hour)) < 0:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+            if (next_minute := _next_bit(self._minutes, minute)) < 0:
+                hour, minute = hour + 1, 0
+                continue
+            return datetime(year, month, day, hour, next_minute)
+        raise RuntimeError(
+            "unable to rollover, time specification is probably invalid"
+        )
+
+    def _day_mask(self, year: int, month: int) -> int:
+        """Days of ``month`` matching both the day of month and of week."""
+        first_weekday, days = calendar.monthrange(year, month)
+        try:
+            return self._day_masks[first_weekday, days]
+        except KeyError:
+            pass
+        mask = 0
+        for day in range(1, days + 1):
+            # Sunday is 0 in cron, 6 in calendar
+            if self._days_of_week >> (first_weekday + day) % 7 & 1:
+                mask |= 1 << day
+        mask &= self._days_of_month
+        with self._lock:
+            self._day_masks[first_weekday, days] = mask
+        return mask
 
     # Needed to support pickling
     def __repr__(self) -> str:
@@ -141,3 +341,244 @@ class clocked(BaseSchedule):
 
     def __reduce__(self) -> tuple:
         return self.__class__, (self.clocked_time, self.nowfun)
+
+
+class ScheduleCache:
+    """Bounded LRU cache of compiled schedules.
+
+    Keyed by ``(table, id, *content)`` of the schedule row, so all the entries
+    using a row share one schedule object, and an edited row gets a new one.
+    The cached schedules are shared and must not be mutated.  The API uses
+    the cache from the threads of its threadpool, the factory runs unlocked.
+    """
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data: "OrderedDict[tuple, BaseSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, factory: Callable[[], BaseSchedule]) -> BaseSchedule:
+        with self._lock:
+            try:
+                compiled = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return compiled
+        compiled = factory()
+        if self.maxsize > 0:
+            with self._lock:
+                # or the one compiled by another thread in the meantime
+                compiled = self._data.setdefault(key, compiled)
+                self._data.move_to_end(key)
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return compiled
+
+    def invalidate(self, table: str, id: int) -> None:
+        """Drop the schedules compiled from the row ``id`` of ``table``."""
+        with self._lock:
+            for key in [key for key in self._data if key[:2] == (table, id)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+schedule_cache = ScheduleCache()
+
+
+# event -> altitude of the sun's center in degrees, kind; the horizons of
+# celery's ``solar``: the upper limb 34' below the horizon for sunrise and
+# sunset, the center for the twilights
+SOLAR_EVENTS: Dict[str, Tuple[float, int]] = {
+    "dawn_astronomical": (-18, RISING),
+    "dawn_nautical": (-12, RISING),
+    "dawn_civil": (-6, RISING),
+    "sunrise": (-50 / 60, RISING),
+    "solar_noon": (0, TRANSIT),
+    "sunset": (-50 / 60, SETTING),
+    "dusk_civil": (-6, SETTING),
+    "dusk_nautical": (-12, SETTING),
+    "dusk_astronomical": (-18, SETTING),
+}
+
+SolarKey = Tuple[str, float, float]
+
+
+class _SolarEvents(NamedTuple):
+    first_day: int
+    end_day: int
+    # sorted Unix timestamps of the events within [first_day, end_day)
+    times: np.ndarray
+
+
+class SolarEventTable:
+    """Event times of the solar schedules, computed ahead for ``days`` days.
+
+    Schedules ``register`` their ``(event, lat, lon)``.  The times of all the
+    keys missing or running out are computed together, one vectorized pass
+    over keys and days, so looking the next event up is a binary search.
+    The table is filled under a lock, the events of a key are replaced at
+    once, so the threads of the API look them up unlocked.
+    """
+
+    def __init__(self, days: int = 32) -> None:
+        self.days = days
+        self.fills = 0
+        self._events: Dict[SolarKey, _SolarEvents] = {}
+        self._pending: Set[SolarKey] = set()
+        self._lock = threading.Lock()
+
+    def register(self, event: str, lat: float, lon: float) -> SolarKey:
+        key = (event, lat, lon)
+        with self._lock:
+            if key not in self._events:
+                self._pending.add(key)
+        return key
+
+    def next_event(self, key: SolarKey, after: float) -> Tuple[Optional[float], float]:
+        """First event of ``key`` after the timestamp ``after``.
+
+        Return its timestamp, None if the event doesn't happen until the end
+        of the computed days, and that end.
+        """
+        day = int(after // DAY)
+        events = self._events.get(key)
+        if events is None or not events.first_day < day < events.end_day - 1:
+            with self._lock:
+                # unless filled by another thread in the meantime
+                events = self._events.get(key)
+                if events is None or not events.first_day < day < events.end_day - 1:
+                    self._fill(day - 1, {key})
+                    events = self._events[key]
+        index = np.searchsorted(events.times, after, side="right")
+        end = float(events.end_day * DAY)
+        if index == len(events.times):
+            return None, end
+        return float(events.times[index]), end
+
+    def fill(self, first_day: int, keys: Iterable[SolarKey] = ()) -> None:
+        """Compute ``keys``, the pending ones and the ones running out."""
+        with self._lock:
+            self._fill(first_day, keys)
+
+    def _fill(self, first_day: int, keys: Iterable[SolarKey]) -> None:
+        batch: List[SolarKey] = list(
+            set(keys)
+            | self._pending
+            | {
+                key
+                for key, events in self._events.items()
+                if events.end_day - 1 <= first_day + 1
+            }
+        )
+        self._pending.clear()
+        if not batch:
+            return
+        altitudes, kinds = zip(*(SOLAR_EVENTS[event] for event, _, _ in batch))
+        times = event_times(
+            [lat for _, lat, _ in batch],
+            [lon for _, _, lon in batch],
+            altitudes,
+            kinds,
+            first_day,
+            self.days,
+        )
+        end_day = first_day + self.days
+        for key, row in zip(batch, times):
+            row = row[~np.isnan(row)]
+            row.sort()
+            self._events[key] = _SolarEvents(first_day, end_day, row)
+        self.fills += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._events) + len(self._pending)
+
+
+solar_event_table = SolarEventTable()
+
+
+class precomputed_solar(solar):
+    """Solar schedule looking its events up in a ``SolarEventTable``.
+
+    Nothing is calculated per tick and ephem is not needed.  Where the event
+    doesn't happen, e.g. the sunrise during a polar night, it's checked
+    again at the end of the computed days.
+    """
+
+    def __init__(
+        self,
+        event: str,
+        lat: Union[float, Decimal],
+        lon: Union[float, Decimal],
+        table: Optional[SolarEventTable] = None,
+        **kwargs: Any,
+    ) -> None:
+        if event not in SOLAR_EVENTS:
+            raise ValueError(
+                SOLAR_INVALID_EVENT.format(
+                    event=event, all_events=", ".join(sorted(SOLAR_EVENTS))
+                )
+            )
+        if lat < -90 or lat > 90:
+            raise ValueError(SOLAR_INVALID_LATITUDE.format(lat=lat))
+        if lon < -180 or lon > 180:
+            raise ValueError(SOLAR_INVALID_LONGITUDE.format(lon=lon))
+        self.event = event
+        self.lat = lat
+        self.lon = lon
+        BaseSchedule.__init__(self, **kwargs)
+        self.table = table or solar_event_table
+        self.key = self.table.register(event, float(lat), float(lon))
+
+    def next_event(self, after: datetime) -> datetime:
+        """The next event after ``after``, or when to check again."""
+        when, end = self.table.next_event(self.key, after.timestamp())
+        return datetime.fromtimestamp(end if when is None else when, timezone.utc)
+
+    def remaining_estimate(self, last_run_at: datetime) -> timedelta:
+        last_run_at = self.maybe_make_aware(last_run_at)
+        return self.next_event(last_run_at) - self.now()
+
+    def fire_times(
+        self, after: float, n: int, until: Optional[float] = None
+    ) -> np.ndarray:
+        """Event times later than the timestamp ``after``, as timestamps.
+
+        All the events up to ``until``, then ``n`` more, fewer if the event
+        doesn't happen for a year, e.g. at the poles.
+        """
+        until = after if until is None else until
+        times: List[float] = []
+        beyond = 0
+        while beyond < n:
+            when, end = self.table.next_event(self.key, after)
+            if when is None:
+                if end > until + 366 * DAY:
+                    break
+                after = end
+                continue
+            times.append(when)
+            beyond += when > until
+            after = when
+        return np.array(times)
+
+    def is_due(self, last_run_at: datetime) -> schedstate:
+        now = self.now()
+        next_event = self.next_event(self.maybe_make_aware(last_run_at))
+        if next_event > now:
+            return schedstate(False, (next_event - now).total_seconds())
+        return schedstate(True, (self.next_event(now) - now).total_seconds())
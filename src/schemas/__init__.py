@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, Json, PositiveInt, root_validator, validator
 
@@ -180,6 +180,7 @@ class PeriodicTaskBase(BaseModel):
     expire_seconds: Optional[PositiveInt] = None
     one_off: bool = False
     start_time: Optional[datetime] = None
+    jitter: Optional[int] = Field(None, ge=0)
     enabled: bool = True
     description: str = ""
 
@@ -210,6 +211,7 @@ class PeriodicTaskUpdate(PeriodicTaskBase):
 class PeriodicTaskInDBBase(PeriodicTaskBase):
     id: int
     last_run_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
     total_run_count: int = 0
     date_changed: datetime = Field(default_factory=utcnow)
 
@@ -223,3 +225,86 @@ class PeriodicTask(PeriodicTaskInDBBase):
 
 class PeriodicTaskInDB(PeriodicTaskInDBBase):
     pass
+
+
+class PeriodicTaskRun(BaseModel):
+    id: int
+    periodic_task_id: int
+    task_id: str
+    worker: Optional[str]
+    state: str
+    published_at: Optional[datetime]
+    started_at: datetime
+    finished_at: datetime
+    # seconds
+    runtime: float
+
+
+StatsWindow = Literal["hour", "day", "week"]
+
+
+class RunStats(BaseModel):
+    runs: int
+    successes: int
+    failures: int
+    success_rate: Optional[float]
+    # seconds, the quantiles within a bucket of their histogram
+    runtime_mean: Optional[float]
+    runtime_p50: Optional[float]
+    runtime_p95: Optional[float]
+    runtime_p99: Optional[float]
+    # seconds from the publish by beat to the start
+    lag_mean: Optional[float]
+    lag_p50: Optional[float]
+    lag_p95: Optional[float]
+    lag_p99: Optional[float]
+
+
+class PeriodicTaskStats(RunStats):
+    id: int
+
+
+class PeriodicTaskWindowStats(BaseModel):
+    id: int
+    hour: RunStats
+    day: RunStats
+    week: RunStats
+
+
+# fire times computed by one upcoming runs request
+MAX_UPCOMING_RUNS = 5_000_000
+
+
+class UpcomingRuns(BaseModel):
+    id: int
+    runs: list[datetime]
+
+
+class UpcomingRunsQuery(BaseModel):
+    ids: list[int] = Field(..., min_items=1)
+    n: int = Field(10, ge=1, le=1000)
+    # only the runs up to then
+    until: Optional[datetime] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_size(cls, values: dict) -> dict:
+        if len(values["ids"]) * values["n"] > MAX_UPCOMING_RUNS:
+            raise ValueError(f"At most {MAX_UPCOMING_RUNS} runs, lower n")
+        return values
+
+
+MAX_FORECAST_BUCKETS = 100_000
+
+ForecastBy = Literal["queue", "task"]
+
+
+class Forecast(BaseModel):
+    start: datetime
+    bucket: timedelta
+    # fires per bucket, from start on
+    counts: list[int]
+    peak: int
+    peak_at: Optional[datetime]
+    by: Optional[ForecastBy]
+    # the counts per queue, "" for none, or per task name
+    breakdown: Optional[dict[str, list[int]]]
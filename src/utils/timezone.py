@@ -1,6 +1,32 @@
+import time
 from datetime import datetime, timezone
 
 
+class Clock:
+    """Source of the current time, replaced by a fake one in simulations."""
+
+    def now(self) -> datetime:
+        return datetime.utcnow().replace(tzinfo=timezone.utc)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+_clock = Clock()
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Install ``clock``, returns the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
 def utcnow() -> datetime:
     """Timezone Aware utcnow."""
-    return datetime.utcnow().replace(tzinfo=timezone.utc)
+    return _clock.now()
+
+
+def monotonic() -> float:
+    """Monotonic seconds, for the deadlines of the scheduler."""
+    return _clock.monotonic()